@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from PyQt5.QtCore import QCoreApplication, QTimer
+
+# Paths given on the command line are relative to where we were started,
+# tools and profiles are relative to the application directory
+startDirectory = os.getcwd()
+os.chdir(os.path.dirname(os.path.realpath(sys.argv[0])))
+
+from asyncRunner import newEventLoop
+from encodeFarm import EncodeAgent
+from encodePipeline import createPipeline, loadOptions, loadProfile
+from jobState import STATE_NAMES
+from progressAggregator import UPDATE_RATE, ProgressAggregator
+
+# Seconds to wait for the encoders to stop before exiting anyway
+STOP_TIMEOUT = 10
+
+
+def writeEvent(event, **fields):
+	fields['event'] = event
+	fields['time'] = round(time.time(), 3)
+	sys.stdout.write(json.dumps(fields) + '\n')
+	sys.stdout.flush()
+
+
+def findProfiles():
+	if not os.path.isdir('./profiles'):
+		return []
+
+	return sorted(profile[:-4] for profile in os.listdir('./profiles')
+				  if profile.endswith('.ini'))
+
+
+def applyOverrides(config, args):
+	if args.jobs is not None:
+		config['Main']['ConcurrentJobs'] = str(args.jobs)
+	if args.audio_jobs is not None:
+		config['Main']['AudioConcurrency'] = str(args.audio_jobs)
+	if args.checksums is not None:
+		config['Main']['Checksums'] = args.checksums
+	if args.runner is not None:
+		config['Main']['Runner'] = args.runner
+	if args.workers is not None:
+		config['Main']['Workers'] = str(args.workers)
+	if args.segments is not None:
+		config['Main']['VideoSegments'] = str(args.segments)
+	if args.pin:
+		config['Main']['PinToNodes'] = 'True'
+	if args.listen is not None:
+		config['Main']['FarmListen'] = args.listen
+	if args.token is not None:
+		config['Main']['FarmToken'] = args.token
+
+	return config
+
+
+class BatchEncoder:
+	def __init__(self, app, files, outputDir, encodeConfig, optionsConfig):
+		self.app = app
+		self.stopDeadline = None
+
+		self.stopTimer = QTimer()
+		self.stopTimer.timeout.connect(self.waitForStop)
+
+		self.pipeline = createPipeline(encodeConfig, optionsConfig, outputDir)
+		self.pipeline.jobStarted.connect(self.jobStarted)
+		self.pipeline.jobFinished.connect(self.jobFinished)
+		self.pipeline.logMessage.connect(self.jobLogMessage)
+		self.pipeline.allFinished.connect(self.allJobsFinished)
+
+		self.progress = ProgressAggregator(optionsConfig.getint(
+			'Main', 'ProgressRate', fallback=UPDATE_RATE))
+		self.pipeline.progressUpdated.connect(self.progress.updateProgress)
+		self.pipeline.statsUpdated.connect(self.progress.updateStats)
+		self.progress.progressUpdated.connect(self.jobProgressUpdate)
+		self.progress.statsUpdated.connect(self.jobStatsUpdate)
+
+		for inputFile in files:
+			self.pipeline.addFile(inputFile)
+
+	def start(self):
+		writeEvent('batch', files=len(self.pipeline.jobs()),
+				   concurrency=self.pipeline.maxConcurrent())
+		self.progress.start()
+		self.pipeline.start()
+
+	def jobStarted(self, job):
+		writeEvent('started', job=job.jobId, file=job.inputFile)
+
+	def jobLogMessage(self, job, text):
+		writeEvent('log', job=None if job is None else job.jobId,
+				   message=text)
+
+	def jobProgressUpdate(self, texts):
+		for job, text in texts.items():
+			writeEvent('progress', job=job.jobId, message=text)
+
+	def jobStatsUpdate(self, stats):
+		for job, event in stats.items():
+			writeEvent('stats', job=job.jobId, fraction=event.fraction(),
+					   eta=event.estimatedEta(), frame=event.frame,
+					   totalFrames=event.totalFrames, fps=event.fps,
+					   bitrate=event.bitrate)
+
+	def jobFinished(self, job):
+		self.progress.discard(job)
+		writeEvent('finished', job=job.jobId, file=job.inputFile,
+				   state=STATE_NAMES[job.state], output=job.encodedFile)
+
+	def allJobsFinished(self):
+		finished = len(self.pipeline.finishedJobs())
+		failed = len(self.pipeline.jobs()) - finished
+		writeEvent('done', finished=finished, failed=failed)
+
+		self.progress.stop()
+		if self.stopDeadline is None:
+			self.app.exit(1 if failed else 0)
+
+	def stop(self, *args):
+		if self.stopDeadline is not None:
+			return
+
+		writeEvent('stopping')
+		self.stopDeadline = time.monotonic() + STOP_TIMEOUT
+		self.pipeline.stop()
+
+		# Exiting straight away would leave the encoders running behind us
+		self.stopTimer.start(100)
+		self.waitForStop()
+
+	def waitForStop(self):
+		if self.pipeline.isRunning() and time.monotonic() < self.stopDeadline:
+			return
+
+		self.stopTimer.stop()
+		self.progress.stop()
+		self.app.exit(130)
+
+
+def agentEvent(job, event, text):
+	if event == 'started':
+		writeEvent('started', job=job.jobId, file=job.inputFile)
+	elif event in ('log', 'progress'):
+		writeEvent(event, job=None if job is None else job.jobId,
+				   message=text)
+
+
+def runAgent(args):
+	if not os.path.exists(os.path.normpath('./temp')):
+		os.makedirs(os.path.normpath('./temp'))
+
+	token = args.token
+	if token is None:
+		token = loadOptions().get('Main', 'FarmToken', fallback='')
+
+	agent = EncodeAgent(args.connect, args.name, args.slots, token, agentEvent)
+
+	loop = newEventLoop()
+	asyncio.set_event_loop(loop)
+	try:
+		loop.run_until_complete(agent.run())
+	except KeyboardInterrupt:
+		writeEvent('stopping')
+		return 130
+	finally:
+		loop.close()
+
+	return 0
+
+
+def parseArguments():
+	parser = argparse.ArgumentParser(
+		description='GXS x264 Frontend - headless batch encoding')
+	commands = parser.add_subparsers(dest='command')
+
+	encodeParser = commands.add_parser(
+		'encode', help='encode files with a profile')
+	encodeParser.add_argument('--profile', required=True,
+							  help='name of a profile in ./profiles')
+	encodeParser.add_argument('--out', required=True,
+							  help='output directory')
+	encodeParser.add_argument('--jobs', type=int,
+							  help='files encoded at the same time, '
+								   '0 to plan it from the hardware')
+	encodeParser.add_argument('--audio-jobs', type=int,
+							  help='audio streams encoded at the same time')
+	encodeParser.add_argument('--checksums',
+							  help='comma separated sidecar digests, '
+								   'e.g. crc32,md5,sha256')
+	encodeParser.add_argument('--runner', choices=['qprocess', 'asyncio'],
+							  help='drive the tools through QProcess signals '
+								   'or asyncio coroutines')
+	encodeParser.add_argument('--workers', type=int,
+							  help='worker processes the encodes are '
+								   'spread over')
+	encodeParser.add_argument('--segments', type=int,
+							  help='x264 processes each video is split over')
+	encodeParser.add_argument('--pin', action='store_true',
+							  help='keep each encode on one NUMA node')
+	encodeParser.add_argument('--listen',
+							  help='HOST:PORT to hand the files to farm agents '
+								   'instead of encoding them here')
+	encodeParser.add_argument('--token', help='shared secret of the farm')
+	encodeParser.add_argument('files', nargs='+')
+
+	agentParser = commands.add_parser(
+		'agent', help='encode jobs handed out by a farm coordinator')
+	agentParser.add_argument('--connect', required=True,
+							 help='HOST:PORT of the coordinator')
+	agentParser.add_argument('--name', default=socket.gethostname(),
+							 help='name shown by the coordinator')
+	agentParser.add_argument('--slots', type=int, default=1,
+							 help='files encoded at the same time')
+	agentParser.add_argument('--token', help='shared secret of the farm')
+
+	commands.add_parser('profiles', help='list the available profiles')
+
+	return parser, parser.parse_args()
+
+
+def main():
+	parser, args = parseArguments()
+
+	if args.command == 'profiles':
+		for profile in findProfiles():
+			print(profile)
+		return 0
+	elif args.command == 'agent':
+		return runAgent(args)
+	elif args.command != 'encode':
+		parser.print_help()
+		return 2
+
+	if args.profile not in findProfiles():
+		writeEvent('error', message='profile not found: ' + args.profile)
+		return 2
+
+	outputDir = os.path.join(startDirectory, args.out)
+	if not os.path.isdir(outputDir):
+		writeEvent('error', message='output directory not found: ' + outputDir)
+		return 2
+
+	files = [os.path.join(startDirectory, f) for f in args.files]
+
+	if not os.path.exists(os.path.normpath('./temp')):
+		os.makedirs(os.path.normpath('./temp'))
+
+	app = QCoreApplication(sys.argv)
+
+	batch = BatchEncoder(app, files, outputDir, loadProfile(args.profile),
+						 applyOverrides(loadOptions(), args))
+	signal.signal(signal.SIGINT, batch.stop)
+
+	# Python only runs signal handlers between bytecodes, so wake up
+	# regularly while Qt's event loop is blocking
+	signalTimer = QTimer()
+	signalTimer.timeout.connect(lambda: None)
+	signalTimer.start(250)
+
+	QTimer.singleShot(0, batch.start)
+	return app.exec_()
+
+
+if __name__ == '__main__':
+	multiprocessing.freeze_support()
+	sys.exit(main())
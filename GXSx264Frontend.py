@@ -1,27 +1,29 @@
 import configparser
 import ctypes
-import datetime
-import glob
+import multiprocessing
 import os
-import psutil
-import queue
 import subprocess
 import sys
-import zlib
 
 import qdarkstyle
-from PyQt5.QtCore import Qt, QSize, pyqtSignal, QProcess, QCoreApplication
+from PyQt5.QtCore import Qt, QSize, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (QWidget, QApplication, QDesktopWidget, QGroupBox,
 							 QGridLayout, QLabel, QLineEdit, QPushButton, QComboBox, QFileDialog,
-							 QMessageBox)
+							 QMessageBox, QListView)
 
 os.chdir(os.path.dirname(os.path.realpath(sys.argv[0])))
 
 ctypes.WinDLL('./tools/MediaInfo.dll')
 from MediaInfoDLL3 import *
 
+from encodePipeline import createPipeline, loadOptions, loadProfile
 from fileManagement import FileManagement
+from jobState import JobState
+from logModel import LOG_LINES, JobLogFilter, LogModel, openLogFile
+from myListWidget import PROGRESS_ROLE
+from progressAggregator import UPDATE_RATE, ProgressAggregator
+from progressParser import BatchProgress
 from Settings import SettingsDialog
 from Options import OptionsDialog
 
@@ -71,6 +73,7 @@ class MainWindow(QWidget, FileManagement):
 
 		self.setFileAdd()
 		self.setMediaInfoText()
+		self.setLogView()
 		self.setFileRemove()
 
 		self.fileList.clicked.connect(self.updateMediaInfoGroupBox)
@@ -99,8 +102,6 @@ class MainWindow(QWidget, FileManagement):
 		self.startEncodeButton.setStyleSheet('border-radius: 2px;')
 		self.startEncodeButton.clicked.connect(self.readyToEncode)
 
-		self.processQueue = queue.Queue()
-
 		self.encodeProgressLabel = QLabel()
 		self.encodeProgressLabel.setVisible(False)
 
@@ -134,11 +135,62 @@ class MainWindow(QWidget, FileManagement):
 		self.stopEncodeButton.setVisible(False)
 		self.stopEncodeButton.clicked.connect(self.stopEncode)
 
-		self.process = QProcess()
-		self.audioStreamProcess = QProcess()
-		self.ffmpegEncodeProcess = QProcess()
-		self.neroAacEncodeProcess = QProcess()
-		self.mkvMergeProcess = QProcess()
+		self.pipeline = None
+
+	def setLogView(self):
+		config = configparser.ConfigParser()
+		config.read(os.path.normpath('./data/options.ini'))
+
+		self.logModel = LogModel(
+			config.getint('Main', 'LogLines', fallback=LOG_LINES),
+			openLogFile())
+		self.logModel.rowsInserted.connect(self.followLog)
+
+		self.logFilter = JobLogFilter()
+		self.logFilter.setSourceModel(self.logModel)
+
+		# Uniform rows let the view lay out only what is visible
+		self.logView = QListView()
+		self.logView.setModel(self.logModel)
+		self.logView.setUniformItemSizes(True)
+		self.logView.setWordWrap(False)
+		self.logView.setVisible(False)
+
+		self.logJobComboBox = QComboBox()
+		self.logJobComboBox.addItem('All files', None)
+		self.logJobComboBox.currentIndexChanged.connect(self.filterLog)
+		self.logJobComboBox.setVisible(False)
+
+	def showLog(self):
+		self.mediaInfoGroupBox.setTitle('Output Log')
+		self.mediaInfoText.setVisible(False)
+		self.logView.setVisible(True)
+		self.logJobComboBox.setVisible(True)
+
+	def showMediaInfo(self):
+		self.mediaInfoGroupBox.setTitle('MediaInfo')
+		self.logView.setVisible(False)
+		self.logJobComboBox.setVisible(False)
+		self.mediaInfoText.setVisible(True)
+
+	def filterLog(self, index):
+		jobId = self.logJobComboBox.itemData(index)
+
+		# Unfiltered the view reads the ring buffer directly, the proxy's
+		# bookkeeping is only paid while a single file is shown
+		if jobId is None:
+			self.logView.setModel(self.logModel)
+		else:
+			self.logFilter.setJobId(jobId)
+			self.logView.setModel(self.logFilter)
+
+		self.logView.scrollToBottom()
+
+	def followLog(self):
+		# Keeps the newest line in view unless the user has scrolled up
+		scrollBar = self.logView.verticalScrollBar()
+		if scrollBar.value() == scrollBar.maximum():
+			self.logView.scrollToBottom()
 
 	def openOutputDirectory(self):
 		if self.outputLineEdit.text() == '':
@@ -202,15 +254,8 @@ class MainWindow(QWidget, FileManagement):
 	"""
 
 	def readyToEncode(self):
-		self.halt = False
 		missingFieldDialog = QMessageBox(self)
 
-		self.process = QProcess()
-		self.audioStreamProcess = QProcess()
-		self.ffmpegEncodeProcess = QProcess()
-		self.neroAacEncodeProcess = QProcess()
-		self.mkvMergeProcess = QProcess()
-
 		if self.fileList.count() == 0:
 			missingFieldDialog.setWindowTitle('Missing Input')
 			missingFieldDialog.setText('Please import video files to encode.')
@@ -228,16 +273,17 @@ class MainWindow(QWidget, FileManagement):
 			if not os.path.isfile(self.fileList.item(index).data(1001)):
 				if flag:
 					flag = False
+					self.showMediaInfo()
 					self.mediaInfoText.setPlainText('Error - files not found:')
 
 				self.mediaInfoText.append(
 					self.fileList.item(index).data(1001))
-			else:
-				self.mediaInfoGroupBox.setTitle('Output Log')
 
 		if not flag:
 			return None
 
+		self.showLog()
+
 		self.fileList.setAcceptDrops(False)
 		self.fileList.setDragEnabled(False)
 		self.fileList.clicked.disconnect()
@@ -262,381 +308,122 @@ class MainWindow(QWidget, FileManagement):
 		config.read(os.path.normpath('./data/options.ini'))
 
 		if config.getboolean('Main', 'Shutdown'):
-			self.mediaInfoText.setPlainText(
+			self.appendLog(
 				'Shutdown on Completion is Enabled.  To Disable, Go to Options')
-		else:
-			self.mediaInfoText.clear()
 		self.updateOptions()
 
 		self.startEncode()
 
 	def startEncode(self):
-		files = glob.glob(os.path.normpath('./temp/*'))
-		for f in files:
-			os.remove(f)
+		optionsConfig = loadOptions()
 
-		profileName = self.profileComboBox.currentText()
+		self.pipeline = createPipeline(
+			loadProfile(self.profileComboBox.currentText()), optionsConfig,
+			self.outputLineEdit.text())
+		self.pipeline.logMessage.connect(self.jobLogMessage)
+		self.pipeline.jobStarted.connect(self.jobStarted)
+		self.pipeline.jobFinished.connect(self.jobFinished)
+		self.pipeline.allFinished.connect(self.allJobsFinished)
 
-		self.encodeConfig = configparser.ConfigParser()
-		self.encodeConfig.read(os.path.normpath(
-			'./profiles/' + profileName + '.ini'))
-
-		cmdOutput = self.encodeConfig.get('Misc', 'CommandLineOutput')
-		cmdOutput += ' ' + self.encodeConfig.get('Misc', 'CustomCmdLine')
-		self.curInputFile = 1
-		self.totalInputFiles = 0
+		self.logJobComboBox.setCurrentIndex(0)
+		while self.logJobComboBox.count() > 1:
+			self.logJobComboBox.removeItem(1)
 
 		for index in range(self.fileList.count()):
-			completeCmdOutput = (os.path.normpath('./tools/' + cmdOutput) +
-								 ' --quiet --output ' +
-								 '"' + os.path.normpath('./temp/Output.mkv') + '" ' + '"' +
-								 os.path.normpath(self.fileList.item(index).data(1001) + '"'))
-
-			self.processQueue.put(completeCmdOutput)
-			print(completeCmdOutput)
-			print()
-
-			self.totalInputFiles += 1
-
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Encoding file ' + str(self.curInputFile) + '/' +
-								  str(self.totalInputFiles) + '  -  ' +
-								  self.fileList.item(self.curInputFile - 1).text() + '...')
-
-		self.process.finished.connect(self.finishedCurrentVideoEncode)
-		self.process.readyReadStandardError.connect(self.progressUpdate)
-
-		self.process.start(self.processQueue.get())
-		self.currentProcess = psutil.Process(self.process.processId())
-
-	def progressUpdate(self):
-		# print(self.process.readAllStandardError())
-		curProgress = (bytes(self.process.readAllStandardError()).
-					   decode().strip().split('\r'))
-
-		# print(curProgress[len(curProgress) - 1])
-		self.encodeProgressLabel.setText(curProgress[len(curProgress) - 1])
-
-	def finishedCurrentVideoEncode(self):
-		if self.halt:
-			return -1
-
-		now = datetime.datetime.now()
-		if self.process.exitCode() == -1:
-			self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Invalid Custom Command Line Input')
-
-			self.mediaInfoText.append('\n[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Stopping Encode')
-			self.finishEncode()
-		else:
-			self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Video Encode Complete')
-			self.encodeAudioStreams()
-
-	def encodeAudioStreams(self):
-		if self.halt:
-			return -1
-
-		now = datetime.datetime.now()
-		if self.encodeConfig.getboolean('Misc', 'audiosource'):
-			self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Using Source Audio')
-			self.startMergeProcess()
+			self.fileList.item(index).setData(PROGRESS_ROLE, None)
+			job = self.pipeline.addFile(self.fileList.item(index).data(1001),
+										self.fileList.item(index).text())
+			self.logJobComboBox.addItem(
+				'File ' + str(job.jobId) + '  -  ' + job.displayName, job.jobId)
+
+		self.totalInputFiles = len(self.pipeline.jobs())
+		self.batchProgress = BatchProgress(self.totalInputFiles)
+		# Newest progress text of each unfinished job
+		self.jobTexts = {}
+
+		# The tools print far more often than the window needs repainting
+		self.progress = ProgressAggregator(optionsConfig.getint(
+			'Main', 'ProgressRate', fallback=UPDATE_RATE))
+		self.pipeline.progressUpdated.connect(self.progress.updateProgress)
+		self.pipeline.statsUpdated.connect(self.progress.updateStats)
+		self.progress.progressUpdated.connect(self.jobProgressUpdate)
+		self.progress.statsUpdated.connect(self.jobStatsUpdate)
+		self.progress.start()
+
+		self.pipeline.start()
+
+	def appendLog(self, text, jobId=None):
+		self.logModel.append(jobId, text)
+
+	def jobLogMessage(self, job, text):
+		if job is None:
+			self.appendLog(text)
 			return None
 
-		print('start identify')
-		self.encodeProgressLabel.setText('Analyzing audio streams...')
-
-		self.audioStreamProcess.finished.connect(self.startFfmEncode)
-		self.audioStreamProcess.readyReadStandardOutput.connect(
-			self.processTracks)
-
-		self.ffmpegQueue = queue.Queue()
-		self.neroAacQueue = queue.Queue()
-		self.numAudioTracks = 1
-		self.totalAudioTracks = 0
-
-		mkvMergeCmd = ''
-		if self.encodeConfig.get('System', 'architecture') == 32:
-			mkvMergeCmd += os.path.normpath('./tools/' + 'mkvmerge32.exe ')
-		else:
-			mkvMergeCmd += os.path.normpath('./tools/' + 'mkvmerge64.exe ')
-
-		print(mkvMergeCmd + ' --identify "' +
-			  self.fileList.item(self.curInputFile - 1).data(1001) + '"')
-		self.audioStreamProcess.start(mkvMergeCmd + ' --identify "' +
-									  self.fileList.item(self.curInputFile - 1).data(1001) + '"')
-		self.currentProcess = psutil.Process(
-			self.audioStreamProcess.processId())
-
-	def processTracks(self):
-		print('processing tracks')
-		output = (bytes(self.audioStreamProcess.readAllStandardOutput()).
-				  decode().strip().split('\r\n'))
-		print(output)
-
-		for line in output:
-			line = line.split()
-
-			print(line)
-			if len(line) != 0 and line[0] == 'Track':
-				if line[3] == 'audio':
-					self.totalAudioTracks += 1
-
-					ffmpegCmd = (os.path.normpath('./tools/ffmpeg.exe') +
-								 ' -i "' + os.path.normpath(self.fileList.item(
-						self.curInputFile - 1).data(1001)) +
-								 '" -map 0:' + line[2][:-1] + ' -f wav "' +
-								 os.path.normpath('./temp/OutputAudio' +
-												  str(self.totalAudioTracks) + '.wav') + '"')
-
-					neroAacCmd = (
-						os.path.normpath('./tools/' + 'neroAacEnc.exe') +
-						' -ignorelength -q ' +
-						self.encodeConfig.get('Misc', 'audioquality') +
-						' -if "' + os.path.normpath('./temp/OutputAudio' +
-													str(self.totalAudioTracks) + '.wav') + '" -of "' +
-						os.path.normpath('./temp/OutputAudio' +
-										 str(self.totalAudioTracks) + '.aac') + '"')
-
-					print(ffmpegCmd)
-					print(neroAacCmd)
-					self.ffmpegQueue.put(ffmpegCmd)
-					self.neroAacQueue.put(neroAacCmd)
-
-		print('Broke Loop')
-
-	def startFfmEncode(self):
-		if self.halt:
-			return -1
-
-		self.audioStreamProcess.close()
-		self.audioStreamProcess = QProcess()
-
-		print('Start ffmpeg + nero encode')
-		self.encodeProgressLabel.setText('Encoding audio stream ' +
-										 str(self.numAudioTracks) + '/' + str(self.totalAudioTracks) + '...')
-
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Encoding Audio Stream ' + str(self.numAudioTracks) + '/' +
-								  str(self.totalAudioTracks) + '...')
-
-		self.ffmpegEncodeProcess.finished.connect(self.startNeroAacEncode)
+		self.appendLog('File ' + str(job.jobId) + '/' +
+					   str(self.totalInputFiles) + '  -  ' + text, job.jobId)
 
-		self.ffmpegEncodeProcess.start(self.ffmpegQueue.get())
-		self.currentProcess = psutil.Process(
-			self.ffmpegEncodeProcess.processId())
+	def jobItem(self, job):
+		# Jobs are numbered in the order of the file list
+		return self.fileList.item(job.jobId - 1)
 
-	def startNeroAacEncode(self):
-		if self.halt:
-			return -1
-
-		self.ffmpegEncodeProcess.close()
-		self.ffmpegEncodeProcess = QProcess()
-
-		self.neroAacEncodeProcess.finished.connect(self.encodeNextAudioStream)
-
-		self.numAudioTracks += 1
-		self.neroAacEncodeProcess.start(self.neroAacQueue.get())
-		self.currentProcess = psutil.Process(
-			self.neroAacEncodeProcess.processId())
-
-	def encodeNextAudioStream(self):
-		print("In Audio Stream")
-		if self.halt:
-			return -1
-
-		self.neroAacEncodeProcess.close()
-		self.neroAacEncodeProcess = QProcess()
-
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Finished Encoding Audio Stream')
-
-		print('audiotrack ' + str(self.numAudioTracks))
-		print('totalaudiotrack ' + str(self.totalAudioTracks))
-		if self.numAudioTracks <= self.totalAudioTracks:
-			print("Starting audio stream")
-
-			self.ffmpegEncodeProcess.close()
-			self.ffmpegEncodeProcess = QProcess()
+	def jobStarted(self, job):
+		self.batchProgress.jobStarted(job.jobId)
+		self.jobItem(job).setData(PROGRESS_ROLE, 0.0)
 
-			self.startFfmEncode()
-		else:
-			print("to merge process")
-			self.startMergeProcess()
-
-	def startMergeProcess(self):
-		print("In merge process")
-		if self.halt:
-			return -1
-
-		MI = MediaInfo()
-		MI.Open(self.fileList.item(self.curInputFile - 1).data(1001))
-		MI.Inform()
-
-		mkvMergeCmd = ''
-		if self.encodeConfig.get('System', 'architecture') == 32:
-			mkvMergeCmd += os.path.normpath('./tools/' + 'mkvmerge32.exe ')
-		else:
-			mkvMergeCmd += os.path.normpath('./tools/' + 'mkvmerge64.exe ')
-
-		mkvMergeCmd += ('-o "' + os.path.normpath(self.outputLineEdit.text() +
-												  '/' + self.fileList.item(self.curInputFile - 1).text()[:-4] +
-												  '[Encoded].mkv"'))
-
-		self.encodedFile = (os.path.normpath(self.outputLineEdit.text() +
-											 '/' + self.fileList.item(self.curInputFile - 1).text()[:-4] +
-											 '[Encoded].mkv'))
-		print(self.encodedFile)
+	def jobProgressUpdate(self, texts):
+		# One tick's texts, {job: text}, only has the jobs that printed
+		# something since the last one
+		self.jobTexts.update(texts)
 
-		if not MI.Get(Stream.Video, 0, "Language") == '':
-			mkvMergeCmd += (' --language "0:' +
-							MI.Get(Stream.Video, 0, "Language") + '"')
-
-		mkvMergeCmd += (' "' + os.path.normpath('./temp/Output.mkv') + '" ')
-		if self.encodeConfig.getboolean('Misc', 'audiosource'):
-			mkvMergeCmd += ('-D "' + os.path.normpath(
-				self.fileList.item(self.curInputFile - 1).data(1001)) + '"')
+		jobs = sorted(self.jobTexts, key=lambda job: job.jobId)
+		if len(jobs) > 1:
+			text = '  '.join('[' + str(job.jobId) + '] ' + self.jobTexts[job]
+							 for job in jobs)
 		else:
-			for i in range(self.totalAudioTracks):
-				mkvMergeCmd += ('--no-chapters ')
-
-				if not MI.Get(Stream.Audio, i, "Language") == '':
-					mkvMergeCmd += ('--language "0:' +
-									MI.Get(Stream.Audio, i, "Language") + '" ')
+			text = self.jobTexts[jobs[0]]
 
-				mkvMergeCmd += ('--track-name "0:AAC LC ' +
-								self.encodeConfig.get('Misc', 'audioquality') + '" "'
-								+ os.path.normpath('./temp/OutputAudio' + str(i + 1) +
-												   '.aac" '))
-			# MI.Get(Stream.Audio, i, "Title") + '" "' + os.path.normpath(
-			# 	'./temp/OutputAudio' + str(i+1) + '.aac" '))
+		self.encodeProgressLabel.setText(
+			text + '  |  ' + self.batchProgress.describe())
 
-			mkvMergeCmd += ('-D -A "' + os.path.normpath(
-				self.fileList.item(self.curInputFile - 1).data(1001)) + '"')
+	def jobStatsUpdate(self, stats):
+		# One tick's stats, {job: ProgressEvent}
+		for job, event in stats.items():
+			fraction = event.fraction()
+			if fraction is None:
+				continue
 
-		self.encodeProgressLabel.setText('Merging files.')
+			self.batchProgress.update(job.jobId, fraction)
+			self.jobItem(job).setData(PROGRESS_ROLE, fraction)
 
-		print(mkvMergeCmd)
+	def jobFinished(self, job):
+		self.progress.discard(job)
+		self.jobTexts.pop(job, None)
+		self.batchProgress.jobFinished(job.jobId)
+		self.jobItem(job).setData(
+			PROGRESS_ROLE, 1.0 if job.state == JobState.Finished else None)
 
-		MI.Close()
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Merging Files...')
+		self.encodeProgressLabel.setText(
+			str(len(self.pipeline.finishedJobs())) + '/' +
+			str(self.totalInputFiles) + ' files encoded  |  ' +
+			self.batchProgress.describe())
 
-		self.mkvMergeProcess.finished.connect(self.startCRCProcess)
+	def allJobsFinished(self):
+		if self.pipeline.failedJobs():
+			self.appendLog(str(len(self.pipeline.failedJobs())) +
+						   ' file(s) failed to encode')
 
-		print("Starting merge process")
-		self.mkvMergeProcess.start(mkvMergeCmd)
-		self.currentProcess = psutil.Process(self.mkvMergeProcess.processId())
+		self.appendLog('Encoding Complete')
 
-	def startCRCProcess(self):
-		print("In crc process")
-		if self.halt:
-			return -1
-
-		self.mkvMergeProcess.close()
-		self.mkvMergeProcess = QProcess()
-		self.pauseEncodeButton.setVisible(False)
-		self.stopEncodeButton.setVisible(False)
-
-		self.encodeProgressLabel.setText('Generating CRC...')
-
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Generating CRC...')
-
-		print("Starting crc process")
-		prev = 0
-		for eachLine in open(self.encodedFile, "rb"):
-			prev = zlib.crc32(eachLine, prev)
-			QCoreApplication.processEvents()
-
-		crc = "%X" % (prev & 0xFFFFFFFF)
-		print(crc)
-		os.rename(self.encodedFile, self.encodedFile[0:-13] + '[' + crc + ']' +
-				  '.mkv')
-		self.pauseEncodeButton.setVisible(True)
-		self.stopEncodeButton.setVisible(True)
-		self.startNextEncode()
-
-	def startNextEncode(self):
-		self.process.close()
-		self.audioStreamProcess.close()
-		self.ffmpegEncodeProcess.close()
-		self.neroAacEncodeProcess.close()
-		self.mkvMergeProcess.close()
-
-		now = datetime.datetime.now()
-		if not self.processQueue.empty():
-			files = glob.glob(os.path.normpath('./temp/*'))
-			for f in files:
-				os.remove(f)
-
-			self.curInputFile += 1
-			self.mediaInfoText.append('')
-			self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Encoding file ' + str(self.curInputFile) + '/' +
-									  str(self.totalInputFiles) + '  -  ' +
-									  self.fileList.item(self.curInputFile - 1).text())
-
-			if not os.path.isfile(os.path.normpath(
-					self.fileList.item(self.curInputFile - 1).data(1001))):
-				self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-										  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-										  ']  Error - file not found: ' +
-										  self.fileList.item(self.curInputFile - 1).data(1001))
-				self.processQueue.get()
-				self.startNextEncode()
-			else:
-				self.process = QProcess()
-				self.process.finished.connect(self.finishedCurrentVideoEncode)
-				self.process.readyReadStandardError.connect(self.progressUpdate)
-
-				self.audioStreamProcess = QProcess()
-				self.ffmpegEncodeProcess = QProcess()
-				self.neroAacEncodeProcess = QProcess()
-				self.mkvMergeProcess = QProcess()
-
-				self.process.start(self.processQueue.get())
-				self.currentProcess = psutil.Process(
-					self.process.processId())
-		else:
-			self.mediaInfoText.append('\n[' + str(now.date()) + ' ' +
-									  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-									  ']  Encoding Complete')
-
-			self.finishEncode()
+		self.finishEncode()
 
 	def finishEncode(self, halt=False):
 		print("finished encode")
-		files = glob.glob(os.path.normpath('./temp/*'))
-		for f in files:
-			os.remove(f)
-
-		self.process.close()
-		self.audioStreamProcess.close()
-		self.ffmpegEncodeProcess.close()
-		self.neroAacEncodeProcess.close()
-		self.mkvMergeProcess.close()
-
+		self.progress.stop()
 		self.fileList.setAcceptDrops(True)
 		self.fileList.setDragEnabled(True)
 		self.fileList.clicked.connect(self.displayMediaInfo)
+		self.fileList.clicked.connect(self.updateMediaInfoGroupBox)
 
 		self.addFileButton.setEnabled(True)
 		self.removeFileButton.setEnabled(True)
@@ -662,32 +449,26 @@ class MainWindow(QWidget, FileManagement):
 			subprocess.call(["shutdown", "-f", "-s", "-t", "60"])
 
 	def updateMediaInfoGroupBox(self):
-		self.mediaInfoGroupBox.setTitle('MediaInfo')
+		self.showMediaInfo()
 
 	"""
 	Kill override for Encoding Process
 	"""
 
 	def pauseEncode(self):
-		self.currentProcess.suspend()
+		self.pipeline.pause()
 
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Process Paused ')
+		self.appendLog('Process Paused ')
 
 		self.resumeEncodeButton.setVisible(True)
 		self.pauseEncodeButton.setVisible(False)
 
 	def resumeEncode(self):
-		self.currentProcess.resume()
+		self.pipeline.resume()
 		self.resumeEncodeButton.setVisible(False)
 		self.pauseEncodeButton.setVisible(True)
 
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Process Resumed ')
+		self.appendLog('Process Resumed ')
 
 	def stopEncode(self):
 		exitDialog = QMessageBox(self)
@@ -704,21 +485,9 @@ class MainWindow(QWidget, FileManagement):
 		if (exitDialog.exec_() == QMessageBox.No):
 			return -1
 
-		now = datetime.datetime.now()
-		self.mediaInfoText.append('[' + str(now.date()) + ' ' +
-								  str(now.hour) + ':' + str(now.minute) + ':' + str(now.second) +
-								  ']  Process Stopped ')
-
-		while not self.processQueue.empty():
-			self.processQueue.get()
+		self.appendLog('Process Stopped ')
 
-		self.halt = True
-
-		self.process.close()
-		self.audioStreamProcess.close()
-		self.ffmpegEncodeProcess.close()
-		self.neroAacEncodeProcess.close()
-		self.mkvMergeProcess.close()
+		self.pipeline.stop()
 
 		self.finishEncode(True)
 
@@ -751,13 +520,9 @@ class MainWindow(QWidget, FileManagement):
 			self.profileComboBox.findText(selected))
 
 	def closeEvent(self, event):
-		if (self.process.state() == QProcess.NotRunning and
-					self.audioStreamProcess.state() == QProcess.NotRunning and
-					self.audioStreamProcess.state() == QProcess.NotRunning and
-					self.ffmpegEncodeProcess.state() == QProcess.NotRunning and
-					self.neroAacEncodeProcess.state() == QProcess.NotRunning and
-					self.mkvMergeProcess.state() == QProcess.NotRunning):
+		if self.pipeline is None or not self.pipeline.isRunning():
 
+			self.prefetcher.stop()
 			self.updateOptions()
 
 			event.accept()
@@ -777,6 +542,7 @@ class MainWindow(QWidget, FileManagement):
 
 			if (self.stopEncode() != -1):
 
+				self.prefetcher.stop()
 				self.updateOptions()
 				event.accept()
 			else:
@@ -818,6 +584,8 @@ class MainWindow(QWidget, FileManagement):
 
 		grid2 = QGridLayout()
 		grid2.addWidget(self.mediaInfoText, 0, 0)
+		grid2.addWidget(self.logView, 0, 0)
+		grid2.addWidget(self.logJobComboBox, 1, 0)
 
 		self.mediaInfoGroupBox.setLayout(grid2)
 		grid.addWidget(self.mediaInfoGroupBox, 23, 0, 25, 50)
@@ -853,6 +621,8 @@ class MainWindow(QWidget, FileManagement):
 
 
 if __name__ == '__main__':
+	multiprocessing.freeze_support()
+
 	app = QApplication(sys.argv)
 	app.setStyleSheet(qdarkstyle.load_stylesheet_pyqt5())
 
@@ -52,6 +52,9 @@ class InfoOption:
 
 class FileOptions:
 	Nothing, Recursive, CloseAll, xxNonexx_3, Max = list(range(5))
+	# MediaInfoList recurses into directories by default, flag 1 is
+	# MediaInfo.h's FileOption_NoRecursive
+	NoRecursive = Recursive
 
 
 class MediaInfo:
@@ -254,146 +257,149 @@ class MediaInfoList:
 	# /** @brief A 'new' MediaInfoList interface, return a Handle, don't forget to delete it after using it*/
 	# MEDIAINFO_EXP void*             __stdcall MediaInfoList_New (); /*you must ALWAYS call MediaInfoList_Delete(Handle) in order to free memory*/
 	MediaInfoList_New = MediaInfoDLL_Handler.MediaInfoList_New
-	MediaInfoList_New.argtype = []
+	MediaInfoList_New.argtypes = []
 	MediaInfoList_New.restype = c_void_p
 
 	# /** @brief A 'new' MediaInfoList interface (with a quick init of useful options : "**VERSION**;**APP_NAME**;**APP_VERSION**", but without debug information, use it only if you know what you do), return a Handle, don't forget to delete it after using it*/
 	# MEDIAINFO_EXP void*             __stdcall MediaInfoList_New_Quick (const wchar_t* Files, const wchar_t* Config); /*you must ALWAYS call MediaInfoList_Delete(Handle) in order to free memory*/
 	MediaInfoList_New_Quick = MediaInfoDLL_Handler.MediaInfoList_New_Quick
-	MediaInfoList_New_Quick.argtype = [c_wchar_p, c_wchar_p]
+	MediaInfoList_New_Quick.argtypes = [c_wchar_p, c_wchar_p]
 	MediaInfoList_New_Quick.restype = c_void_p
 
 	# /** @brief Delete a MediaInfoList interface*/
 	# MEDIAINFO_EXP void           __stdcall MediaInfoList_Delete (void* Handle);
 	MediaInfoList_Delete = MediaInfoDLL_Handler.MediaInfoList_Delete
-	MediaInfoList_Delete.argtype = [c_void_p]
+	MediaInfoList_Delete.argtypes = [c_void_p]
+	MediaInfoList_Delete.restype = None
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Open (with a filename)*/
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Open (void* Handle, const wchar_t* Files, const MediaInfo_fileoptions_C Options); /*Default : Options=MediaInfo_FileOption_Nothing*/
 	MediaInfoList_Open = MediaInfoDLL_Handler.MediaInfoList_Open
-	MediaInfoList_Open.argtype = [c_void_p, c_wchar_p, c_void_p]
-	MediaInfoList_Open.restype = c_void_p
+	MediaInfoList_Open.argtypes = [c_void_p, c_wchar_p, c_size_t]
+	MediaInfoList_Open.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Open (with a buffer) */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Open_Buffer (void* Handle, const unsigned char* Begin, size_t Begin_Size, const unsigned char* End, size_t End_Size); /*return Handle*/
 	MediaInfoList_Open_Buffer = MediaInfoDLL_Handler.MediaInfoList_Open_Buffer
-	MediaInfoList_Open_Buffer.argtype = [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p]
-	MediaInfoList_Open_Buffer.restype = c_void_p
+	MediaInfoList_Open_Buffer.argtypes = [c_void_p, c_void_p, c_size_t, c_void_p, c_size_t]
+	MediaInfoList_Open_Buffer.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Save */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Save (void* Handle, size_t FilePos);
 	MediaInfoList_Save = MediaInfoDLL_Handler.MediaInfoList_Save
-	MediaInfoList_Save.argtype = [c_void_p, c_void_p]
-	MediaInfoList_Save.restype = c_void_p
+	MediaInfoList_Save.argtypes = [c_void_p, c_size_t]
+	MediaInfoList_Save.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Close */
 	# MEDIAINFO_EXP void           __stdcall MediaInfoList_Close (void* Handle, size_t FilePos);
 	MediaInfoList_Close = MediaInfoDLL_Handler.MediaInfoList_Close
-	MediaInfoList_Close.argtype = [c_void_p, c_void_p]
+	MediaInfoList_Close.argtypes = [c_void_p, c_size_t]
+	MediaInfoList_Close.restype = None
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Inform */
 	# MEDIAINFO_EXP const wchar_t*    __stdcall MediaInfoList_Inform (void* Handle, size_t FilePos, size_t Reserved); /*Default : Reserved=0*/
 	MediaInfoList_Inform = MediaInfoDLL_Handler.MediaInfoList_Inform
-	MediaInfoList_Inform.argtype = [c_void_p, c_void_p, c_void_p]
+	MediaInfoList_Inform.argtypes = [c_void_p, c_size_t, c_size_t]
 	MediaInfoList_Inform.restype = c_wchar_p
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Get */
 	# MEDIAINFO_EXP const wchar_t*    __stdcall MediaInfoList_GetI (void* Handle, size_t FilePos, MediaInfo_stream_C StreamKind, size_t StreamNumber, size_t Parameter, MediaInfo_info_C InfoKind); /*Default : InfoKind=Info_Text*/
 	MediaInfoList_GetI = MediaInfoDLL_Handler.MediaInfoList_GetI
-	MediaInfoList_GetI.argtype = [c_void_p, c_void_p, c_void_p, c_void_p, c_void_p, c_void_p]
+	MediaInfoList_GetI.argtypes = [c_void_p, c_size_t, c_size_t, c_size_t, c_size_t, c_size_t]
 	MediaInfoList_GetI.restype = c_wchar_p
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Get */
 	# MEDIAINFO_EXP const wchar_t*    __stdcall MediaInfoList_Get (void* Handle, size_t FilePos, MediaInfo_stream_C StreamKind, size_t StreamNumber, const wchar_t* Parameter, MediaInfo_info_C InfoKind, MediaInfo_info_C SearchKind); /*Default : InfoKind=Info_Text, SearchKind=Info_Name*/
 	MediaInfoList_Get = MediaInfoDLL_Handler.MediaInfoList_Get
-	MediaInfoList_Get.argtype = [c_void_p, c_void_p, c_void_p, c_void_p, c_wchar_p, c_void_p, c_void_p]
+	MediaInfoList_Get.argtypes = [c_void_p, c_size_t, c_size_t, c_size_t, c_wchar_p, c_size_t, c_size_t]
 	MediaInfoList_Get.restype = c_wchar_p
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Set */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_SetI (void* Handle, const wchar_t* ToSet, size_t FilePos, MediaInfo_stream_C StreamKind, size_t StreamNumber, size_t Parameter, const wchar_t* OldParameter);
 	MediaInfoList_SetI = MediaInfoDLL_Handler.MediaInfoList_SetI
-	MediaInfoList_SetI.argtype = [c_void_p, c_wchar_p, c_void_p, c_void_p, c_void_p, c_void_p, c_wchar_p]
-	MediaInfoList_SetI.restype = c_void_p
+	MediaInfoList_SetI.argtypes = [c_void_p, c_wchar_p, c_size_t, c_size_t, c_size_t, c_size_t, c_wchar_p]
+	MediaInfoList_SetI.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Set */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Set (void* Handle, const wchar_t* ToSet, size_t FilePos, MediaInfo_stream_C StreamKind, size_t StreamNumber, const wchar_t* Parameter, const wchar_t* OldParameter);
 	MediaInfoList_Set = MediaInfoDLL_Handler.MediaInfoList_Set
-	MediaInfoList_Set.argtype = [c_void_p, c_wchar_p, c_void_p, c_void_p, c_void_p, c_wchar_p, c_wchar_p]
-	MediaInfoList_Set.restype = c_void_p
+	MediaInfoList_Set.argtypes = [c_void_p, c_wchar_p, c_size_t, c_size_t, c_size_t, c_wchar_p, c_wchar_p]
+	MediaInfoList_Set.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Option */
 	# MEDIAINFO_EXP const wchar_t*    __stdcall MediaInfoList_Option (void* Handle, const wchar_t* Option, const wchar_t* Value);
 	MediaInfoList_Option = MediaInfoDLL_Handler.MediaInfoList_Option
-	MediaInfoList_Option.argtype = [c_void_p, c_wchar_p, c_wchar_p]
+	MediaInfoList_Option.argtypes = [c_void_p, c_wchar_p, c_wchar_p]
 	MediaInfoList_Option.restype = c_wchar_p
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::State_Get */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_State_Get (void* Handle);
 	MediaInfoList_State_Get = MediaInfoDLL_Handler.MediaInfoList_State_Get
-	MediaInfoList_State_Get.argtype = [c_void_p]
-	MediaInfoList_State_Get.restype = c_void_p
+	MediaInfoList_State_Get.argtypes = [c_void_p]
+	MediaInfoList_State_Get.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Count_Get */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Count_Get (void* Handle, size_t FilePos, MediaInfo_stream_C StreamKind, size_t StreamNumber); /*Default : StreamNumber=-1*/
 	MediaInfoList_Count_Get = MediaInfoDLL_Handler.MediaInfoList_Count_Get
-	MediaInfoList_Count_Get.argtype = [c_void_p, c_void_p, c_void_p, c_void_p]
-	MediaInfoList_Count_Get.restype = c_void_p
+	MediaInfoList_Count_Get.argtypes = [c_void_p, c_size_t, c_size_t, c_size_t]
+	MediaInfoList_Count_Get.restype = c_size_t
 
 	# /** @brief Wrapper for MediaInfoListLib::MediaInfoList::Count_Get */
 	# MEDIAINFO_EXP size_t           __stdcall MediaInfoList_Count_Get_Files (void* Handle);
 	MediaInfoList_Count_Get_Files = MediaInfoDLL_Handler.MediaInfoList_Count_Get_Files
-	MediaInfoList_Count_Get_Files.argtype = [c_void_p]
-	MediaInfoList_Count_Get_Files.restype = c_void_p
+	MediaInfoList_Count_Get_Files.argtypes = [c_void_p]
+	MediaInfoList_Count_Get_Files.restype = c_size_t
 
 	Handle = c_void_p(0)
 
 	# Handling
 	def __init__(self):
-		self.Handle = MediaInfoList_New()
+		self.Handle = self.MediaInfoList_New()
+		self.MediaInfoList_Option(self.Handle, "CharSet", "UTF-8")
 
 	def __del__(self):
-		MediaInfoList_Delete(self.Handle)
+		self.MediaInfoList_Delete(self.Handle)
 
 	def Open(self, Files, Options=FileOptions.Nothing):
-		return MediaInfoList_Open(self.Handle, Files, Options)
+		return self.MediaInfoList_Open(self.Handle, Files, Options)
 
 	def Open_Buffer(self, Begin, Begin_Size, End=None, End_Size=0):
-		return MediaInfoList_Open_Buffer(self.Handle, Begin, Begin_Size, End, End_Size)
+		return self.MediaInfoList_Open_Buffer(self.Handle, Begin, Begin_Size, End, End_Size)
 
 	def Save(self, FilePos):
-		return MediaInfoList_Save(self.Handle, FilePos)
+		return self.MediaInfoList_Save(self.Handle, FilePos)
 
-	def Close(self, FilePos):
-		MediaInfoList_Close(self.Handle, FilePos)
+	def Close(self, FilePos=-1):
+		self.MediaInfoList_Close(self.Handle, FilePos)
 
 	# General information
 	def Inform(self, FilePos, Reserved=0):
-		return MediaInfoList_Inform(self.Handle, FilePos, Reserved)
+		return self.MediaInfoList_Inform(self.Handle, FilePos, Reserved)
 
 	def GetI(self, FilePos, StreamKind, StreamNumber, Parameter, InfoKind=Info.Text):
-		return MediaInfoList_GetI(self.Handle, FilePos, StreamKind, StreamNumber, Parameter, InfoKind)
+		return self.MediaInfoList_GetI(self.Handle, FilePos, StreamKind, StreamNumber, Parameter, InfoKind)
 
 	def Get(self, FilePos, StreamKind, StreamNumber, Parameter, InfoKind=Info.Text, SearchKind=Info.Name):
-		return MediaInfoList_Get(self.Handle, FilePos, StreamKind, StreamNumber, (Parameter), InfoKind, SearchKind)
+		return self.MediaInfoList_Get(self.Handle, FilePos, StreamKind, StreamNumber, Parameter, InfoKind, SearchKind)
 
 	def SetI(self, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter=""):
-		return MediaInfoList_SetI(self, Handle, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter)
+		return self.MediaInfoList_SetI(self.Handle, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter)
 
 	def Set(self, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter=""):
-		return MediaInfoList_Set(self.Handle, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter)
+		return self.MediaInfoList_Set(self.Handle, ToSet, FilePos, StreamKind, StreamNumber, Parameter, OldParameter)
 
 	# Options
 	def Option(self, Option, Value=""):
-		return MediaInfoList_Option(self.Handle, Option, Value)
+		return self.MediaInfoList_Option(self.Handle, Option, Value)
 
 	def Option_Static(self, Option, Value=""):
-		return MediaInfoList_Option(None, Option, Value)
+		return self.MediaInfoList_Option(None, Option, Value)
 
 	def State_Get(self):
-		return MediaInfoList_State_Get(self.Handle)
+		return self.MediaInfoList_State_Get(self.Handle)
 
-	def Count_Get(self, FilePos, StreamKind, StreamNumber):
-		return MediaInfoList_Count_Get(self.Handle, FilePos, StreamKind, StreamNumber=-1)
+	def Count_Get(self, FilePos, StreamKind, StreamNumber=-1):
+		return self.MediaInfoList_Count_Get(self.Handle, FilePos, StreamKind, StreamNumber)
 
 	def Count_Get_Files(self):
-		return MediaInfoList_Count_Get_Files(self.Handle)
+		return self.MediaInfoList_Count_Get_Files(self.Handle)
@@ -5,7 +5,10 @@ import subprocess
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (QGridLayout, QDialog, QCheckBox, QLabel,
-							 QPushButton)
+							 QPushButton, QSpinBox)
+
+from checksums import (ALGORITHMS, ALGORITHM_NAMES, ALGORITHM_ORDER,
+					   parseAlgorithms)
 
 
 class OptionsDialog:
@@ -27,6 +30,100 @@ class OptionsDialog:
 		self.outputDirectoryCheckBox = QCheckBox(
 			'Use the previous output directory')
 
+		self.pipeAudioCheckBox = QCheckBox(
+			'Pipe audio from ffmpeg into neroAacEnc')
+		self.pipeAudioCheckBox.setToolTip(
+			"Streams decoded audio straight into the AAC encoder instead of\n\
+			writing a temporary WAV file for every audio stream.\n\n\
+			Default: enabled")
+		self.pipeAudioCheckBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.inlineCRCCheckBox = QCheckBox(
+			'Generate the CRC while merging')
+		self.inlineCRCCheckBox.setToolTip(
+			"Hashes the output while mkvmerge writes it, so the finished file\n\
+			does not have to be read a second time.\n\n\
+			Default: disabled")
+		self.inlineCRCCheckBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.asyncRunnerCheckBox = QCheckBox(
+			'Run the encoding tools with asyncio')
+		self.asyncRunnerCheckBox.setToolTip(
+			"Drives x264, ffmpeg, neroAacEnc and mkvmerge from coroutines in a\n\
+			background thread instead of the QProcess signal chain.\n\n\
+			Default: disabled")
+		self.asyncRunnerCheckBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.concurrentJobsLabel = QLabel('Simultaneous encodes')
+		self.concurrentJobsSpinBox = QSpinBox()
+		self.concurrentJobsSpinBox.setMinimum(0)
+		self.concurrentJobsSpinBox.setMaximum(64)
+		self.concurrentJobsSpinBox.setSpecialValueText('Auto')
+		self.concurrentJobsSpinBox.setToolTip(
+			"Number of files encoded at the same time.  Auto picks it from the\n\
+			CPU cores, NUMA nodes, free memory and the profile's settings.\n\
+			Either way, x264's --threads is shared out between the encodes.\n\n\
+			Default: 1")
+		self.concurrentJobsSpinBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.workersLabel = QLabel('Worker processes')
+		self.workersSpinBox = QSpinBox()
+		self.workersSpinBox.setMinimum(1)
+		self.workersSpinBox.setMaximum(64)
+		self.workersSpinBox.setToolTip(
+			"Splits the simultaneous encodes over this many processes, each\n\
+			running its files from start to finish with the asyncio runner.\n\
+			1 keeps everything in the frontend's process.\n\n\
+			Default: 1")
+		self.workersSpinBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.videoSegmentsLabel = QLabel('Video segments per file')
+		self.videoSegmentsSpinBox = QSpinBox()
+		self.videoSegmentsSpinBox.setMinimum(1)
+		self.videoSegmentsSpinBox.setMaximum(64)
+		self.videoSegmentsSpinBox.setToolTip(
+			"Splits the video at source keyframes and encodes the pieces with\n\
+			parallel x264 processes, which are joined before merging.\n\
+			Pieces are at least 30 seconds long.\n\n\
+			Default: 1")
+		self.videoSegmentsSpinBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.pinToNodesCheckBox = QCheckBox('Pin encodes to NUMA nodes')
+		self.pinToNodesCheckBox.setToolTip(
+			"Keeps each file's tools on the CPUs of one NUMA node, spreading\n\
+			simultaneous encodes evenly over the nodes.\n\
+			Has no effect on machines with a single node.\n\n\
+			Default: Off")
+		self.pinToNodesCheckBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.audioConcurrencyLabel = QLabel('Simultaneous audio streams')
+		self.audioConcurrencySpinBox = QSpinBox()
+		self.audioConcurrencySpinBox.setMinimum(1)
+		self.audioConcurrencySpinBox.setMaximum(16)
+		self.audioConcurrencySpinBox.setToolTip(
+			"Number of audio streams of a file encoded at the same time.\n\n\
+			Default: 2")
+		self.audioConcurrencySpinBox.setStyleSheet(
+			'QToolTip {padding: -1px; opacity: 255}')
+
+		self.checksumLabel = QLabel('Checksum files')
+		self.checksumCheckBoxes = {}
+		for name in ALGORITHM_ORDER:
+			checkBox = QCheckBox(ALGORITHM_NAMES[name])
+			if name not in ALGORITHMS:
+				checkBox.setEnabled(False)
+				checkBox.setToolTip('Requires the ' +
+									('xxhash' if name == 'xxh64' else name) +
+									' package')
+			self.checksumCheckBoxes[name] = checkBox
+
 		self.abortShutdownButton = QPushButton('Abort Shutdown')
 		self.abortShutdownButton.clicked.connect(self.cancelShutdown)
 
@@ -42,18 +139,36 @@ class OptionsDialog:
 		grid.addWidget(self.shutdownCheckBox, 0, 0)
 		grid.addWidget(self.profileCheckBox, 1, 0)
 		grid.addWidget(self.outputDirectoryCheckBox, 2, 0)
-		grid.addWidget(emptyCell, 3, 0)
+		grid.addWidget(self.pipeAudioCheckBox, 3, 0)
+		grid.addWidget(self.inlineCRCCheckBox, 4, 0)
+		grid.addWidget(self.concurrentJobsLabel, 5, 0)
+		grid.addWidget(self.concurrentJobsSpinBox, 5, 2, 1, 2)
+		grid.addWidget(self.audioConcurrencyLabel, 6, 0)
+		grid.addWidget(self.audioConcurrencySpinBox, 6, 2, 1, 2)
+		grid.addWidget(self.checksumLabel, 7, 0)
+
+		checksumGrid = QGridLayout()
+		for index, name in enumerate(ALGORITHM_ORDER):
+			checksumGrid.addWidget(self.checksumCheckBoxes[name], 0, index)
+		grid.addLayout(checksumGrid, 8, 0, 1, 4)
+		grid.addWidget(self.asyncRunnerCheckBox, 9, 0)
+		grid.addWidget(self.workersLabel, 10, 0)
+		grid.addWidget(self.workersSpinBox, 10, 2, 1, 2)
+		grid.addWidget(self.videoSegmentsLabel, 11, 0)
+		grid.addWidget(self.videoSegmentsSpinBox, 11, 2, 1, 2)
+		grid.addWidget(self.pinToNodesCheckBox, 12, 0)
+		grid.addWidget(emptyCell, 13, 0)
 
-		grid.addWidget(self.abortShutdownButton, 4, 0)
-		grid.addWidget(self.okButton, 4, 2)
-		grid.addWidget(self.cancelButton, 4, 3)
+		grid.addWidget(self.abortShutdownButton, 14, 0)
+		grid.addWidget(self.okButton, 14, 2)
+		grid.addWidget(self.cancelButton, 14, 3)
 
 		self.optionsWindow = QDialog(self.mainWindow,
 									 Qt.WindowCloseButtonHint)
 		self.optionsWindow.setWindowIcon(QIcon(os.path.normpath(
 			'./Icons/transparent.png')))
 		self.optionsWindow.setWindowTitle('Options')
-		self.optionsWindow.setMinimumSize(400, 170)
+		self.optionsWindow.setMinimumSize(460, 440)
 
 		self.optionsWindow.setFixedSize(self.optionsWindow.size())
 		self.optionsWindow.setLayout(grid)
@@ -73,6 +188,31 @@ class OptionsDialog:
 		self.outputDirectoryCheckBox.setChecked(
 			config.getboolean('Main', 'RememberOutput'))
 
+		self.pipeAudioCheckBox.setChecked(
+			config.getboolean('Main', 'PipeAudio', fallback=True))
+
+		self.inlineCRCCheckBox.setChecked(
+			config.getboolean('Main', 'InlineCRC', fallback=False))
+
+		self.concurrentJobsSpinBox.setValue(
+			config.getint('Main', 'ConcurrentJobs', fallback=1))
+		self.audioConcurrencySpinBox.setValue(
+			config.getint('Main', 'AudioConcurrency', fallback=2))
+
+		self.asyncRunnerCheckBox.setChecked(
+			config.get('Main', 'Runner', fallback='qprocess') == 'asyncio')
+		self.workersSpinBox.setValue(
+			config.getint('Main', 'Workers', fallback=1))
+		self.videoSegmentsSpinBox.setValue(
+			config.getint('Main', 'VideoSegments', fallback=1))
+		self.pinToNodesCheckBox.setChecked(
+			config.getboolean('Main', 'PinToNodes', fallback=False))
+
+		checksums = parseAlgorithms(config.get('Main', 'Checksums',
+											   fallback=''))
+		for name, checkBox in self.checksumCheckBoxes.items():
+			checkBox.setChecked(name in checksums)
+
 	def cancelShutdown(self):
 		subprocess.call(["shutdown", "-a"])
 
@@ -85,6 +225,21 @@ class OptionsDialog:
 			self.profileCheckBox.isChecked())
 		config['Main']['RememberOutput'] = str(
 			self.outputDirectoryCheckBox.isChecked())
+		config['Main']['PipeAudio'] = str(self.pipeAudioCheckBox.isChecked())
+		config['Main']['InlineCRC'] = str(self.inlineCRCCheckBox.isChecked())
+		config['Main']['ConcurrentJobs'] = str(
+			self.concurrentJobsSpinBox.value())
+		config['Main']['AudioConcurrency'] = str(
+			self.audioConcurrencySpinBox.value())
+		config['Main']['Checksums'] = ','.join(
+			name for name in ALGORITHM_ORDER
+			if self.checksumCheckBoxes[name].isChecked())
+		config['Main']['Runner'] = (
+			'asyncio' if self.asyncRunnerCheckBox.isChecked() else 'qprocess')
+		config['Main']['Workers'] = str(self.workersSpinBox.value())
+		config['Main']['VideoSegments'] = str(
+			self.videoSegmentsSpinBox.value())
+		config['Main']['PinToNodes'] = str(self.pinToNodesCheckBox.isChecked())
 
 		with open('./data/options.ini', 'w') as configfile:
 			config.write(configfile)
@@ -107,5 +262,30 @@ class OptionsDialog:
 		config['Main']['RememberOutput'] = 'False'
 		config['Main']['PreviousOutput'] = ''
 
+		config['Main']['PipeAudio'] = 'True'
+		config['Main']['InlineCRC'] = 'False'
+		config['Main']['ConcurrentJobs'] = '1'
+		config['Main']['AudioConcurrency'] = '2'
+		config['Main']['Checksums'] = ''
+		config['Main']['Runner'] = 'qprocess'
+		config['Main']['ToolTimeout'] = '0'
+		config['Main']['Workers'] = '1'
+		config['Main']['VideoSegments'] = '1'
+		config['Main']['ThreadsPerJob'] = '0'
+		config['Main']['LookaheadThreads'] = '0'
+		config['Main']['PinToNodes'] = 'False'
+		config['Main']['ProgressRate'] = '10'
+		config['Main']['LogLines'] = '10000'
+		config['Main']['PrefetchThreads'] = '4'
+		config['Main']['VideoPriority'] = 'below normal'
+		config['Main']['VideoIoPriority'] = 'low'
+		config['Main']['AudioPriority'] = 'normal'
+		config['Main']['AudioIoPriority'] = 'normal'
+		config['Main']['MergePriority'] = 'normal'
+		config['Main']['MergeIoPriority'] = 'normal'
+		config['Main']['FarmListen'] = ''
+		config['Main']['FarmToken'] = ''
+		config['Main']['FarmTimeout'] = '30'
+
 		with open('./data/options.ini', 'w') as configfile:
 			config.write(configfile)
@@ -0,0 +1,523 @@
+import asyncio
+import os
+
+from asyncRunner import ToolError, ToolRunner
+from checksums import (ALGORITHM_NAMES, computeChecksums, parseAlgorithms,
+					   writeSidecars)
+from crcEngine import BLOCK_SIZE, formatRate
+from encodePlanner import createPinning, pinJob, pinningMessage, planBatch
+from encodeCommands import (appendCommand, crcFileName, encodedFileName,
+							ffmpegAudioCommand, identifyCommand,
+							keyframeProbeCommand, mergeCommand, neroAacCommand,
+							parseAudioTracks, segmentVideoCommand,
+							uniqueDisplayName, videoCommand)
+from jobState import JobState
+from jobWorkspace import JobWorkspace
+from mediaInfoModel import MediaFile
+from mediaProbe import readMediaInfo
+from processPriority import stagePriorities
+from progressParser import ProgressReader, VideoProgress
+from videoSegments import parseKeyframeTimes, planSegments, segmentFileName
+
+
+async def runTogether(*coroutines):
+	# Like gather, but a failing branch cancels the others so no tool is
+	# left running behind an error
+	tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+
+	try:
+		await asyncio.gather(*tasks)
+	except BaseException:
+		for task in tasks:
+			task.cancel()
+		await asyncio.wait(tasks)
+		raise
+
+
+class AsyncEncodeJob:
+	"""
+	The coroutine version of EncodeJob.  It has the same attributes, so front
+	ends can show either kind of job, and reports through
+	report(job, event, text) with the events 'log' and 'progress', and
+	'stats' with the video's ProgressEvent as a dict.
+	"""
+
+	def __init__(self, jobId, inputFile, displayName, outputDir, encodeConfig,
+				 optionsConfig, runner, report):
+		self.jobId = jobId
+		self.inputFile = inputFile
+		self.displayName = displayName
+		self.outputDir = outputDir
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.runner = runner
+		self.report = report
+
+		self.state = JobState.Waiting
+		self.cancelled = False
+		self.videoDone = False
+		self.encodedFile = ''
+		self.checksumAlgorithms = parseAlgorithms(
+			optionsConfig.get('Main', 'Checksums', fallback=''))
+		self.digests = {}
+		self.sidecars = []
+		self.totalAudioTracks = 0
+		self.threads = None
+		self.lookaheadThreads = None
+		self.cpus = None
+		self.media = MediaFile()
+		self.videoProgress = None
+		self.audioProgress = {}
+		self.workspace = JobWorkspace(inputFile)
+
+	"""
+	Helpers
+	"""
+
+	def log(self, text):
+		self.report(self, 'log', text)
+
+	def progress(self, text):
+		self.report(self, 'progress', text)
+
+	def tempPath(self, name):
+		return self.workspace.path(name)
+
+	def videoDuration(self):
+		return self.media.durationSeconds()
+
+	def isRunning(self):
+		return self.state in (JobState.Running, JobState.Paused)
+
+	"""
+	Encoding stages
+	"""
+
+	async def run(self):
+		self.state = JobState.Running
+
+		if not os.path.isfile(os.path.normpath(self.inputFile)):
+			self.log('Error - file not found: ' + self.inputFile)
+			self.finish(JobState.Failed)
+			return self
+
+		self.log('Encoding file  -  ' + self.displayName + '...')
+
+		try:
+			# Read once for the progress, segments and merge, MediaInfo
+			# blocks while parsing
+			loop = asyncio.get_event_loop()
+			self.media = await loop.run_in_executor(None, readMediaInfo,
+													self.inputFile)
+			self.videoProgress = VideoProgress(self.media.frameCount() or None)
+
+			self.workspace.create()
+			if self.workspace.reused:
+				self.log('Reusing workspace ' + self.workspace.directory)
+
+				if (self.workspace.isDone('video') and
+						os.path.isfile(self.tempPath('Output.mkv'))):
+					self.log('Video already encoded, skipping to audio')
+					self.videoDone = True
+
+			# The audio branch only reads the source, so it runs alongside x264
+			await runTogether(self.encodeVideo(), self.encodeAudioStreams())
+			await self.merge()
+			await self.generateChecksums()
+		except ToolError as e:
+			self.log('Error - ' + str(e))
+			self.finish(JobState.Failed)
+		except OSError as e:
+			self.log('Error - ' + str(e))
+			self.finish(JobState.Failed)
+		except asyncio.CancelledError:
+			self.finish(JobState.Stopped)
+			raise
+		except Exception as e:
+			# Anything else would leave the job Running and never reported
+			# as finished.  Kept after CancelledError, which is an Exception
+			# before Python 3.8
+			self.log('Error - ' + (str(e) or e.__class__.__name__))
+			self.finish(JobState.Failed)
+		else:
+			self.log('Encode Complete  -  ' + self.displayName)
+			self.finish(JobState.Finished)
+
+		return self
+
+	async def encodeVideo(self):
+		if self.videoDone:
+			return None
+
+		segments = self.optionsConfig.getint('Main', 'VideoSegments',
+											 fallback=1)
+		knownFrames = bool(self.media.frameCount() and self.media.frameRate())
+		if segments > 1 and not knownFrames:
+			self.log('Unknown frame count, encoding the video in one piece')
+
+		if segments > 1 and knownFrames:
+			await self.encodeVideoSegments(segments)
+		else:
+			reader = ProgressReader('x264', self.media.frameCount() or None)
+
+			def progress(line):
+				self.videoOutput(reader, 'video', line)
+
+			await self.runner.run(
+				videoCommand(self.encodeConfig, self.inputFile,
+							 self.tempPath('Output.mkv'), self.threads,
+							 self.lookaheadThreads),
+				'video', onOutput=progress, cpus=self.cpus, log=self.log)
+
+		self.log('Video Encode Complete')
+		self.workspace.markDone('video')
+		self.videoDone = True
+
+		if self.audioProgress:
+			self.progress('Waiting for audio streams...')
+
+	def videoOutput(self, reader, key, line):
+		event = reader.parseLine(line)
+
+		if event is not None:
+			event = self.videoProgress.update(key, event)
+			self.progress(event.describe())
+			self.report(self, 'stats', event.toDict())
+		elif key == 'video':
+			self.progress(line)
+
+	async def encodeVideoSegments(self, segments):
+		self.progress('Finding keyframes...')
+
+		# Without keyframes the segments are simply of equal length
+		probeLines = []
+		try:
+			await self.runner.run(keyframeProbeCommand(self.inputFile),
+								  'probe', onOutput=probeLines.append,
+								  cpus=self.cpus, log=self.log)
+		except ToolError as e:
+			self.log('Could not find keyframes: ' + str(e))
+			probeLines = []
+
+		plan = planSegments(self.media.frameCount(), self.media.frameRate(),
+							segments, parseKeyframeTimes(probeLines))
+		self.log('Encoding video in ' + str(len(plan)) + ' segments  -  ' +
+				 ', '.join(str(start) + '+' + str(frames)
+						   for start, frames in plan))
+
+		# Without a plan the profile's threads are shared by the segments
+		threads = self.threads
+		if threads is None:
+			threads = max(1, self.encodeConfig.getint(
+				'System', 'Threads', fallback=1) // len(plan))
+
+		async def encodeSegment(number, start, frames):
+			# Named after the frame range, a different split starts over
+			marker = 'segment-' + str(start) + '-' + str(frames)
+			if self.workspace.isDone(marker):
+				self.log('Segment ' + str(number) + ' already encoded')
+				self.videoProgress.finish(number, frames)
+				return None
+
+			reader = ProgressReader('x264', frames)
+
+			def progress(line):
+				self.videoOutput(reader, number, line)
+
+			await self.runner.run(segmentVideoCommand(
+				self.encodeConfig, self.inputFile,
+				self.tempPath(segmentFileName(number)), start, frames,
+				threads, self.lookaheadThreads), 'video', onOutput=progress,
+				cpus=self.cpus, log=self.log)
+
+			self.videoProgress.finish(number, frames)
+			self.workspace.markDone(marker)
+
+		await runTogether(*[encodeSegment(number + 1, start, frames)
+							for number, (start, frames) in enumerate(plan)])
+
+		self.progress('Joining video segments...')
+		self.log('Joining ' + str(len(plan)) + ' video segments...')
+
+		# mkvmerge returns 1 for warnings and 2 for errors
+		await self.runner.run(appendCommand(
+			self.encodeConfig,
+			[self.tempPath(segmentFileName(number))
+			 for number in range(1, len(plan) + 1)],
+			self.tempPath('Output.mkv')), 'merge', maxExitCode=1,
+			cpus=self.cpus, log=self.log)
+
+	async def encodeAudioStreams(self):
+		if self.encodeConfig.getboolean('Misc', 'audiosource'):
+			self.log('Using Source Audio')
+			return None
+
+		self.log('Analyzing audio streams...')
+
+		output = await self.runner.run(
+			identifyCommand(self.encodeConfig, self.inputFile), 'identify',
+			captureOutput=True, cpus=self.cpus, log=self.log)
+		trackIds = parseAudioTracks(output)
+
+		self.totalAudioTracks = len(trackIds)
+		if not trackIds:
+			return None
+
+		self.log('Found ' + str(self.totalAudioTracks) + ' audio stream(s)')
+
+		limit = asyncio.Semaphore(max(1, self.optionsConfig.getint(
+			'Main', 'AudioConcurrency', fallback=2)))
+		pipeAudio = self.optionsConfig.getboolean('Main', 'PipeAudio',
+												  fallback=True)
+
+		await runTogether(*[
+			self.encodeAudioStream(limit, number + 1, trackId, pipeAudio)
+			for number, trackId in enumerate(trackIds)])
+
+	async def encodeAudioStream(self, limit, number, trackId, pipeAudio):
+		async with limit:
+			self.log('Encoding Audio Stream ' + str(number) + '/' +
+					 str(self.totalAudioTracks) + '...')
+
+			wavFile = None
+			if not pipeAudio:
+				wavFile = self.tempPath('OutputAudio' + str(number) + '.wav')
+			aacFile = self.tempPath('OutputAudio' + str(number) + '.aac')
+
+			ffmpegCmd = ffmpegAudioCommand(self.inputFile, trackId, wavFile)
+			neroAacCmd = neroAacCommand(self.encodeConfig, aacFile, wavFile)
+
+			ffmpegReader = ProgressReader('ffmpeg',
+										  duration=self.videoDuration())
+			neroAacReader = ProgressReader('neroAacEnc',
+										   duration=self.videoDuration())
+
+			def audioProgress(line):
+				event = ffmpegReader.parseLine(line)
+				self.audioProgressUpdate(
+					number, line if event is None else event.describe())
+
+			def neroAacProgress(line):
+				event = neroAacReader.parseLine(line)
+				if event is not None:
+					self.audioProgressUpdate(number, event.describe())
+
+			try:
+				if pipeAudio:
+					await self.runner.runPiped(ffmpegCmd, neroAacCmd, 'audio',
+											   onOutput=audioProgress,
+											   cpus=self.cpus, log=self.log)
+				else:
+					await self.runner.run(ffmpegCmd, 'audio',
+										  onOutput=audioProgress,
+										  cpus=self.cpus, log=self.log)
+					audioProgress('Encoding AAC')
+					await self.runner.run(neroAacCmd, 'audio',
+										  onOutput=neroAacProgress,
+										  cpus=self.cpus, log=self.log)
+			finally:
+				self.audioProgress.pop(number, None)
+
+			self.log('Finished Encoding Audio Stream ' + str(number))
+
+	def audioProgressUpdate(self, number, text):
+		self.audioProgress[number] = text
+
+		if self.videoDone:
+			self.progress('  |  '.join(
+				'A' + str(n) + ': ' + self.audioProgress[n]
+				for n in sorted(self.audioProgress)))
+
+	async def merge(self):
+		videoLanguage = self.media.videoLanguage()
+		audioLanguages = self.media.audioLanguages(self.totalAudioTracks)
+
+		self.encodedFile = encodedFileName(self.outputDir, self.displayName)
+
+		audioFiles = [self.tempPath('OutputAudio' + str(i + 1) + '.aac')
+					  for i in range(self.totalAudioTracks)]
+		mkvMergeCmd = mergeCommand(self.encodeConfig, self.inputFile,
+								   self.tempPath('Output.mkv'), audioFiles,
+								   self.encodedFile, videoLanguage,
+								   audioLanguages)
+
+		self.progress('Merging files.')
+		self.log('Merging Files...')
+
+		# mkvmerge returns 1 for warnings and 2 for errors
+		await self.runner.run(mkvMergeCmd, 'merge', maxExitCode=1,
+							  cpus=self.cpus, log=self.log)
+
+	async def generateChecksums(self):
+		# The filename CRC and any sidecar digests share a single read
+		algorithms = ['crc32'] + [name for name in self.checksumAlgorithms
+								  if name != 'crc32']
+
+		names = ', '.join(ALGORITHM_NAMES[name] for name in algorithms)
+		self.progress('Generating ' + names + '...')
+		self.log('Generating ' + names + '...')
+
+		def checksumProgress(done, total, bytesPerSec):
+			loop.call_soon_threadsafe(
+				self.progress, 'Generating checksums... ' +
+				str(done * 100 // max(total, 1)) + '%  ' +
+				formatRate(bytesPerSec))
+
+		loop = asyncio.get_event_loop()
+		self.digests = await loop.run_in_executor(
+			None, computeChecksums, self.encodedFile, algorithms,
+			BLOCK_SIZE, checksumProgress, self.isCancelled)
+		if self.digests is None:
+			raise asyncio.CancelledError()
+
+		renamedFile = crcFileName(self.encodedFile, self.digests['crc32'])
+		os.rename(self.encodedFile, renamedFile)
+		self.encodedFile = renamedFile
+
+		selected = dict((name, self.digests[name])
+						for name in self.checksumAlgorithms)
+		self.sidecars = writeSidecars(self.encodedFile, selected)
+		for sidecar in self.sidecars:
+			self.log('Wrote ' + os.path.basename(sidecar))
+
+	def isCancelled(self):
+		return self.cancelled
+
+	def finish(self, state):
+		# Lets a checksum thread still reading the output stop early
+		self.cancelled = True
+		self.state = state
+
+		if state == JobState.Finished:
+			self.workspace.cleanup()
+		elif self.workspace.exists():
+			self.log('Keeping workspace ' + self.workspace.directory)
+
+
+class AsyncEncodeBatch:
+	"""
+	Runs a batch of AsyncEncodeJobs on the current event loop, at most
+	ConcurrentJobs at a time.  report(job, event, text) additionally gets
+	'started' and 'finished' events.  pause, resume and stop must be called
+	from the loop's thread.
+	"""
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, report):
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.outputDir = outputDir
+		self.report = report
+
+		self.maxConcurrent = max(1, optionsConfig.getint(
+			'Main', 'ConcurrentJobs', fallback=1))
+		timeout = optionsConfig.getint('Main', 'ToolTimeout', fallback=0)
+
+		self.runner = ToolRunner(timeout=timeout or None,
+								 priorities=stagePriorities(optionsConfig))
+		self.pinning = createPinning(optionsConfig)
+		self.jobs = []
+		self.tasks = []
+		self.paused = False
+		self.stopped = False
+
+	def addFile(self, inputFile, displayName=None, jobId=None):
+		if displayName is None:
+			displayName = os.path.basename(inputFile)
+		displayName = uniqueDisplayName(displayName, self.jobs)
+		if jobId is None:
+			jobId = len(self.jobs) + 1
+
+		job = AsyncEncodeJob(jobId, inputFile, displayName,
+							 self.outputDir, self.encodeConfig,
+							 self.optionsConfig, self.runner, self.report)
+		self.jobs.append(job)
+		return job
+
+	async def run(self):
+		loop = asyncio.get_event_loop()
+
+		# MediaInfo blocks while reading the frame sizes
+		try:
+			plan = await loop.run_in_executor(
+				None, planBatch, self.encodeConfig, self.optionsConfig,
+				self.jobs)
+		except Exception as e:
+			# None of the jobs ran, the batch ends like one where all failed
+			self.report(None, 'log', 'Error - could not plan the batch: ' +
+						(str(e) or e.__class__.__name__))
+			for job in self.jobs:
+				if job.state == JobState.Waiting:
+					job.state = JobState.Failed
+			return None
+
+		# Stopped while planning, there are no tasks to cancel yet
+		if self.stopped:
+			return None
+
+		self.maxConcurrent = plan.jobs
+		self.report(None, 'log', plan.describe())
+
+		message = pinningMessage(self.optionsConfig, self.pinning)
+		if message is not None:
+			self.report(None, 'log', message)
+
+		limit = asyncio.Semaphore(self.maxConcurrent)
+
+		self.tasks = [asyncio.ensure_future(self.runJob(limit, job))
+					  for job in self.jobs]
+		await asyncio.wait(self.tasks)
+
+	async def runJob(self, limit, job):
+		async with limit:
+			await self.runner.resumedEvent().wait()
+
+			# Stopped while waiting for its turn
+			if job.cancelled:
+				return None
+
+			self.report(job, 'started', '')
+			pinJob(self.pinning, job)
+			try:
+				await job.run()
+			finally:
+				if self.pinning is not None:
+					self.pinning.release(job.jobId)
+			self.report(job, 'finished', '')
+
+	def runningJobs(self):
+		return [job for job in self.jobs if job.isRunning()]
+
+	def finishedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Finished]
+
+	def failedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Failed]
+
+	"""
+	Batch control
+	"""
+
+	def pause(self):
+		self.paused = True
+		self.runner.pause()
+
+		for job in self.runningJobs():
+			job.state = JobState.Paused
+
+	def resume(self):
+		self.paused = False
+		self.runner.unpause()
+
+		for job in self.runningJobs():
+			job.state = JobState.Running
+
+	def stop(self):
+		self.stopped = True
+
+		for job in self.jobs:
+			job.cancelled = True
+			if job.state == JobState.Waiting:
+				job.state = JobState.Stopped
+
+		for task in self.tasks:
+			task.cancel()
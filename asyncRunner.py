@@ -0,0 +1,233 @@
+"""
+Asyncio subprocess runner.  A tool invocation is a coroutine that finishes
+with the tool, so a job is written as a sequence of awaits instead of a
+chain of QProcess.finished slots.  The runner only uses the running event
+loop, so it works in a plain asyncio.run() loop as well as in a Qt
+integrated loop such as qasync.
+"""
+
+import asyncio
+import codecs
+import os
+import re
+import subprocess
+import sys
+
+import psutil
+
+from encodeCommands import splitCommand
+from encodePlanner import setAffinity
+from processPriority import setPriority
+
+
+def newEventLoop():
+	# Subprocesses need the proactor loop on Windows, which only became the
+	# default in Python 3.8
+	if sys.platform == 'win32':
+		return asyncio.ProactorEventLoop()
+
+	return asyncio.new_event_loop()
+
+
+class ToolError(Exception):
+	def __init__(self, name, exitCode):
+		super().__init__(name + ' failed with exit code ' + str(exitCode))
+
+		self.name = name
+		self.exitCode = exitCode
+
+
+class ToolRunner:
+	def __init__(self, limits=None, timeout=None, priorities=None):
+		# kind -> maximum number of tools of that kind running at once
+		self.limits = dict(limits or {})
+		# kind -> (priority, I/O priority) the tools are started with
+		self.priorities = dict(priorities or {})
+		self.semaphores = {}
+		self.timeout = timeout
+
+		self.processes = set()
+		self.paused = False
+		self.resumed = None
+
+	def semaphore(self, kind):
+		if kind not in self.semaphores:
+			self.semaphores[kind] = asyncio.Semaphore(
+				self.limits.get(kind, 1024))
+
+		return self.semaphores[kind]
+
+	def resumedEvent(self):
+		# Created lazily so it belongs to the loop the runner is used from
+		if self.resumed is None:
+			self.resumed = asyncio.Event()
+			if not self.paused:
+				self.resumed.set()
+
+		return self.resumed
+
+	"""
+	Running tools
+	"""
+
+	async def run(self, cmd, kind='tool', onOutput=None, captureOutput=False,
+				  maxExitCode=0, timeout=None, cpus=None, log=None):
+		async with self.semaphore(kind):
+			await self.resumedEvent().wait()
+
+			process = await self.startProcess(cmd, stdout=(
+				subprocess.PIPE if captureOutput else subprocess.DEVNULL),
+				cpus=cpus, kind=kind, log=log)
+			output = await self.waitProcess(process, onOutput, timeout)
+
+		self.checkExitCode(cmd, process, maxExitCode)
+		return output
+
+	async def runPiped(self, producerCmd, consumerCmd, kind='tool',
+					   onOutput=None, timeout=None, cpus=None, log=None):
+		# The producer's stdout is handed to the consumer's stdin as an OS
+		# pipe, so the data never passes through Python
+		async with self.semaphore(kind):
+			await self.resumedEvent().wait()
+
+			readFd, writeFd = os.pipe()
+			try:
+				consumer = await self.startProcess(
+					consumerCmd, stdin=readFd, stdout=subprocess.DEVNULL,
+					cpus=cpus, kind=kind, log=log)
+				try:
+					producer = await self.startProcess(
+						producerCmd, stdout=writeFd, cpus=cpus, kind=kind,
+						log=log)
+				except BaseException:
+					await self.killProcess(consumer)
+					raise
+			finally:
+				os.close(readFd)
+				os.close(writeFd)
+
+			await asyncio.gather(
+				self.waitProcess(producer, onOutput, timeout),
+				self.waitProcess(consumer, None, timeout))
+
+		self.checkExitCode(producerCmd, producer)
+		self.checkExitCode(consumerCmd, consumer)
+
+	async def startProcess(self, cmd, stdin=subprocess.DEVNULL,
+						   stdout=subprocess.DEVNULL, cpus=None, kind='tool',
+						   log=None):
+		# Through the job's log, stdout is the CLI's event stream
+		if log is not None:
+			log(cmd)
+
+		process = await asyncio.create_subprocess_exec(
+			*splitCommand(cmd), stdin=stdin, stdout=stdout,
+			stderr=subprocess.PIPE)
+
+		if cpus:
+			setAffinity(process.pid, cpus)
+		setPriority(process.pid, self.priorities.get(kind))
+
+		self.processes.add(process)
+		if self.paused:
+			self.suspend(process)
+
+		return process
+
+	async def waitProcess(self, process, onOutput=None, timeout=None):
+		if timeout is None:
+			timeout = self.timeout
+
+		try:
+			output = await asyncio.wait_for(
+				self.communicate(process, onOutput), timeout)
+		except BaseException:
+			# Timed out or cancelled, don't leave the tool running
+			await self.killProcess(process)
+			raise
+		finally:
+			self.processes.discard(process)
+
+		return output
+
+	async def communicate(self, process, onOutput):
+		tasks = [self.readLines(process.stderr, onOutput)]
+		if process.stdout is not None:
+			tasks.append(process.stdout.read())
+
+		results = await asyncio.gather(*tasks)
+		await process.wait()
+
+		if process.stdout is not None:
+			return results[1].decode(errors='ignore')
+
+		return ''
+
+	async def readLines(self, stream, onOutput):
+		# Progress lines end in \r, log lines in \n
+		decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+		pending = ''
+
+		while True:
+			data = await stream.read(4096)
+			if not data:
+				break
+
+			lines = re.split('[\r\n]', pending + decoder.decode(data))
+			pending = lines.pop()
+
+			if onOutput is not None:
+				for line in lines:
+					if line.strip():
+						onOutput(line.strip())
+
+		if onOutput is not None and pending.strip():
+			onOutput(pending.strip())
+
+	async def killProcess(self, process):
+		self.processes.discard(process)
+
+		if process.returncode is None:
+			try:
+				self.resume(process)
+				process.kill()
+			except (ProcessLookupError, psutil.NoSuchProcess):
+				pass
+
+			await process.wait()
+
+	def checkExitCode(self, cmd, process, maxExitCode=0):
+		if process.returncode < 0 or process.returncode > maxExitCode:
+			name = os.path.basename(splitCommand(cmd)[0])
+			raise ToolError(name, process.returncode)
+
+	"""
+	Runner control, call from the loop's thread
+	"""
+
+	def suspend(self, process):
+		try:
+			psutil.Process(process.pid).suspend()
+		except psutil.NoSuchProcess:
+			pass
+
+	def resume(self, process):
+		try:
+			psutil.Process(process.pid).resume()
+		except psutil.NoSuchProcess:
+			pass
+
+	def pause(self):
+		self.paused = True
+		self.resumedEvent().clear()
+
+		for process in self.processes:
+			self.suspend(process)
+
+	def unpause(self):
+		self.paused = False
+
+		for process in self.processes:
+			self.resume(process)
+
+		self.resumedEvent().set()
@@ -0,0 +1,241 @@
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+from progressParser import ProgressReader
+
+
+class TrackState:
+	Waiting, Extracting, Encoding, Finished, Failed = list(range(5))
+
+
+class AudioTrackEncoder(QObject):
+	logMessage = pyqtSignal(object, str)
+	progressUpdated = pyqtSignal(object, str)
+	trackFinished = pyqtSignal(object)
+
+	def __init__(self, number, ffmpegCmd, neroAacCmd, piped=False,
+				 duration=None, parent=None):
+		super().__init__(parent)
+
+		self.number = number
+		self.ffmpegCmd = ffmpegCmd
+		self.neroAacCmd = neroAacCmd
+		self.piped = piped
+
+		# duration is the source's, in seconds, for the audio progress
+		self.ffmpegReader = ProgressReader('ffmpeg', duration=duration)
+		self.neroAacReader = ProgressReader('neroAacEnc', duration=duration)
+
+		self.state = TrackState.Waiting
+		self.halt = False
+		self.pipedRunning = 0
+
+		self.ffmpegEncodeProcess = QProcess()
+		self.neroAacEncodeProcess = QProcess()
+
+	def processes(self):
+		return [self.ffmpegEncodeProcess, self.neroAacEncodeProcess]
+
+	def isRunning(self):
+		return self.state in (TrackState.Extracting, TrackState.Encoding)
+
+	def start(self, startProcess):
+		self.startProcess = startProcess
+
+		if self.piped:
+			self.startPipedEncode()
+			return None
+
+		self.state = TrackState.Extracting
+
+		self.ffmpegEncodeProcess.finished.connect(self.startNeroAacEncode)
+		self.ffmpegEncodeProcess.readyReadStandardError.connect(
+			self.progressUpdate)
+
+		self.startProcess(self.ffmpegEncodeProcess, self.ffmpegCmd, 'audio')
+
+	def startPipedEncode(self):
+		# ffmpeg writes PCM to its stdout, which Qt connects to neroAacEnc's
+		# stdin, so no intermediate WAV file touches the disk
+		self.state = TrackState.Encoding
+
+		self.ffmpegEncodeProcess.setStandardOutputProcess(
+			self.neroAacEncodeProcess)
+		self.ffmpegEncodeProcess.readyReadStandardError.connect(
+			self.progressUpdate)
+
+		# The track is done once both ends have exited, each reports in
+		# through its finished signal rather than the GUI thread waiting
+		self.pipedRunning = 2
+		self.ffmpegEncodeProcess.finished.connect(self.finishedPipedEncode)
+		self.neroAacEncodeProcess.finished.connect(self.finishedPipedEncode)
+
+		self.startProcess(self.neroAacEncodeProcess, self.neroAacCmd, 'audio')
+		self.startProcess(self.ffmpegEncodeProcess, self.ffmpegCmd, 'audio')
+
+	def progressUpdate(self):
+		self.readProgress(self.ffmpegReader, self.ffmpegEncodeProcess)
+
+	def neroAacProgressUpdate(self):
+		self.readProgress(self.neroAacReader, self.neroAacEncodeProcess)
+
+	def readProgress(self, reader, process):
+		event = reader.feed(bytes(process.readAllStandardError()))
+
+		if event is not None:
+			self.progressUpdated.emit(self, event.describe())
+		elif reader.lastLine:
+			self.progressUpdated.emit(self, reader.lastLine)
+
+	def startNeroAacEncode(self):
+		if self.halt:
+			return -1
+
+		exitCode = self.ffmpegEncodeProcess.exitCode()
+		if (self.ffmpegEncodeProcess.exitStatus() != QProcess.NormalExit or
+				exitCode != 0):
+			self.logMessage.emit(self, 'ffmpeg failed with exit code ' +
+								 str(exitCode))
+			self.finish(TrackState.Failed)
+			return None
+
+		self.ffmpegEncodeProcess.close()
+		self.state = TrackState.Encoding
+		self.progressUpdated.emit(self, 'Encoding AAC')
+
+		self.neroAacEncodeProcess.readyReadStandardError.connect(
+			self.neroAacProgressUpdate)
+		self.neroAacEncodeProcess.finished.connect(self.finishedNeroAacEncode)
+		self.startProcess(self.neroAacEncodeProcess, self.neroAacCmd, 'audio')
+
+	def finishedNeroAacEncode(self):
+		if self.halt:
+			return -1
+
+		exitCode = self.neroAacEncodeProcess.exitCode()
+		if (self.neroAacEncodeProcess.exitStatus() != QProcess.NormalExit or
+				exitCode != 0):
+			self.logMessage.emit(self, 'neroAacEnc failed with exit code ' +
+								 str(exitCode))
+			self.finish(TrackState.Failed)
+		else:
+			self.finish(TrackState.Finished)
+
+	def finishedPipedEncode(self):
+		if self.halt:
+			return -1
+
+		self.pipedRunning -= 1
+		if self.pipedRunning > 0:
+			return None
+
+		for name, process in (('ffmpeg', self.ffmpegEncodeProcess),
+							  ('neroAacEnc', self.neroAacEncodeProcess)):
+			if (process.exitStatus() != QProcess.NormalExit or
+					process.exitCode() != 0):
+				self.logMessage.emit(self, name + ' failed with exit code ' +
+									 str(process.exitCode()))
+				self.finish(TrackState.Failed)
+				return None
+
+		self.finish(TrackState.Finished)
+
+	def finish(self, state):
+		self.halt = True
+		self.ffmpegEncodeProcess.close()
+		self.neroAacEncodeProcess.close()
+		self.state = state
+		self.trackFinished.emit(self)
+
+	def stop(self):
+		self.halt = True
+		self.ffmpegEncodeProcess.close()
+		self.neroAacEncodeProcess.close()
+
+
+class AudioEncodePool(QObject):
+	logMessage = pyqtSignal(str)
+	progressUpdated = pyqtSignal(str)
+	allFinished = pyqtSignal(int)
+
+	def __init__(self, startProcess, maxConcurrent=1, parent=None):
+		super().__init__(parent)
+
+		self.startProcess = startProcess
+		self.maxConcurrent = max(1, maxConcurrent)
+		self.tracks = []
+		self.pendingTracks = []
+		self.trackProgress = {}
+		self.halted = False
+
+	def addTrack(self, number, ffmpegCmd, neroAacCmd, piped=False,
+				 duration=None):
+		track = AudioTrackEncoder(number, ffmpegCmd, neroAacCmd, piped,
+								  duration)
+		track.logMessage.connect(self.trackLogMessage)
+		track.progressUpdated.connect(self.trackProgressUpdate)
+		track.trackFinished.connect(self.trackDone)
+
+		self.tracks.append(track)
+		self.pendingTracks.append(track)
+
+	def start(self):
+		self.halted = False
+		self.startNextTracks()
+
+	def startNextTracks(self):
+		if self.halted:
+			return None
+
+		while (self.pendingTracks and
+			   len(self.runningTracks()) < self.maxConcurrent):
+			track = self.pendingTracks.pop(0)
+			self.logMessage.emit('Encoding Audio Stream ' + str(track.number) +
+								 '/' + str(len(self.tracks)) + '...')
+			track.start(self.startProcess)
+
+	def trackLogMessage(self, track, text):
+		self.logMessage.emit('Audio Stream ' + str(track.number) + '  -  ' +
+							 text)
+
+	def trackProgressUpdate(self, track, text):
+		self.trackProgress[track.number] = text
+
+		self.progressUpdated.emit('  |  '.join(
+			'A' + str(number) + ': ' + self.trackProgress[number]
+			for number in sorted(self.trackProgress)))
+
+	def trackDone(self, track):
+		self.trackProgress.pop(track.number, None)
+
+		if track.state == TrackState.Finished:
+			self.logMessage.emit('Finished Encoding Audio Stream ' +
+								 str(track.number))
+
+		if self.halted:
+			return None
+
+		if self.pendingTracks:
+			self.startNextTracks()
+		elif not self.runningTracks():
+			self.allFinished.emit(len(self.failedTracks()))
+
+	def runningTracks(self):
+		return [track for track in self.tracks if track.isRunning()]
+
+	def failedTracks(self):
+		return [track for track in self.tracks
+				if track.state == TrackState.Failed]
+
+	def processes(self):
+		processes = []
+		for track in self.tracks:
+			processes += track.processes()
+
+		return processes
+
+	def stop(self):
+		self.halted = True
+		self.pendingTracks = []
+
+		for track in self.tracks:
+			track.stop()
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+import zlib
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from crcEngine import BLOCK_SIZE
+
+try:
+	import xxhash
+except ImportError:
+	xxhash = None
+
+try:
+	import blake3
+except ImportError:
+	blake3 = None
+
+
+class CRC32Hash:
+	def __init__(self):
+		self.crc = 0
+
+	def update(self, data):
+		self.crc = zlib.crc32(data, self.crc)
+
+	def hexdigest(self):
+		return "%08X" % (self.crc & 0xFFFFFFFF)
+
+
+"""
+Supported digests: name -> (hash factory, sidecar extension)
+"""
+
+ALGORITHMS = {
+	'crc32': (CRC32Hash, '.sfv'),
+	'md5': (hashlib.md5, '.md5'),
+	'sha256': (hashlib.sha256, '.sha256'),
+}
+
+if xxhash is not None:
+	ALGORITHMS['xxh64'] = (xxhash.xxh64, '.xxh64')
+
+if blake3 is not None:
+	ALGORITHMS['blake3'] = (blake3.blake3, '.b3')
+
+QUEUE_DEPTH = 4
+
+ALGORITHM_ORDER = ['crc32', 'md5', 'sha256', 'xxh64', 'blake3']
+
+ALGORITHM_NAMES = {
+	'crc32': 'CRC32',
+	'md5': 'MD5',
+	'sha256': 'SHA-256',
+	'xxh64': 'xxHash64',
+	'blake3': 'BLAKE3',
+}
+
+
+def parseAlgorithms(text):
+	names = [name.strip().lower() for name in text.split(',')]
+	return [name for name in names if name in ALGORITHMS]
+
+
+def writeSidecars(fileName, digests):
+	baseName = os.path.basename(fileName)
+	sidecars = []
+
+	for name, digest in sorted(digests.items()):
+		sidecar = fileName + ALGORITHMS[name][1]
+
+		with open(sidecar, 'w', encoding='utf-8') as f:
+			if name == 'crc32':
+				f.write(baseName + ' ' + digest + '\n')
+			else:
+				f.write(digest.lower() + ' *' + baseName + '\n')
+
+		sidecars.append(sidecar)
+
+	return sidecars
+
+
+def computeChecksums(fileName, algorithms, blockSize=BLOCK_SIZE,
+					 progress=None, isCancelled=None):
+	hashes = dict((name, ALGORITHMS[name][0]()) for name in algorithms)
+
+	# Every block is read once and the same bytes object is handed to one
+	# thread per digest.  hashlib and zlib release the GIL while hashing
+	# large buffers, so the digests run in parallel.
+	queues = []
+	threads = []
+	errors = []
+	if len(hashes) > 1:
+		for digest in hashes.values():
+			blocks = queue.Queue(QUEUE_DEPTH)
+			thread = threading.Thread(target=hashBlocks,
+									  args=(digest, blocks, errors))
+			thread.daemon = True
+			thread.start()
+
+			queues.append(blocks)
+			threads.append(thread)
+
+	try:
+		total = os.path.getsize(fileName)
+		done = 0
+
+		startTime = time.monotonic()
+		lastReport = startTime
+
+		with open(fileName, 'rb', buffering=0) as f:
+			while not errors and (isCancelled is None or not isCancelled()):
+				data = f.read(blockSize)
+				if not data:
+					break
+
+				if queues:
+					for blocks in queues:
+						blocks.put(data)
+				else:
+					for digest in hashes.values():
+						digest.update(data)
+
+				done += len(data)
+
+				now = time.monotonic()
+				if progress is not None and now - lastReport >= 0.25:
+					lastReport = now
+					progress(done, total, done / max(now - startTime, 1e-6))
+	finally:
+		for blocks in queues:
+			blocks.put(None)
+		for thread in threads:
+			thread.join()
+
+	# A digest thread's error fails the whole run like a read error would
+	if errors:
+		raise errors[0]
+
+	if isCancelled is not None and isCancelled():
+		return None
+
+	if progress is not None:
+		elapsed = max(time.monotonic() - startTime, 1e-6)
+		progress(done, total, done / elapsed)
+
+	return dict((name, digest.hexdigest()) for name, digest in hashes.items())
+
+
+def hashBlocks(digest, blocks, errors):
+	failed = False
+
+	while True:
+		data = blocks.get()
+		if data is None:
+			break
+
+		# After an error the queue is still drained, so the reader never
+		# blocks on it
+		if failed:
+			continue
+
+		try:
+			digest.update(data)
+		except Exception as e:
+			errors.append(e)
+			failed = True
+
+
+class ChecksumWorker(QThread):
+	# Byte counts pass 2 GiB, a plain int signal argument is a C int
+	progressUpdated = pyqtSignal('qint64', 'qint64', float)
+	checksumsFinished = pyqtSignal(dict)
+	checksumsFailed = pyqtSignal(str)
+
+	def __init__(self, fileName, algorithms, blockSize=BLOCK_SIZE,
+				 parent=None):
+		super().__init__(parent)
+
+		self.fileName = fileName
+		self.algorithms = algorithms
+		self.blockSize = blockSize
+
+	def run(self):
+		try:
+			digests = computeChecksums(self.fileName, self.algorithms,
+									   self.blockSize,
+									   self.progressUpdated.emit,
+									   self.isInterruptionRequested)
+		except Exception as e:
+			# Anything escaping run() would end the thread without either
+			# signal and leave the job waiting forever
+			self.checksumsFailed.emit(str(e) or e.__class__.__name__)
+			return None
+
+		if digests is not None:
+			self.checksumsFinished.emit(digests)
+
+	def stop(self):
+		self.requestInterruption()
+		self.wait()
@@ -0,0 +1,304 @@
+import os
+import time
+import zlib
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def formatRate(bytesPerSec):
+	return str(round(bytesPerSec / (1024 * 1024), 1)) + ' MB/s'
+
+
+class CRCWorker(QThread):
+	# Byte counts pass 2 GiB, a plain int signal argument is a C int
+	progressUpdated = pyqtSignal('qint64', 'qint64', float)
+	crcFinished = pyqtSignal(str)
+	crcFailed = pyqtSignal(str)
+
+	def __init__(self, fileName, blockSize=BLOCK_SIZE, parent=None):
+		super().__init__(parent)
+
+		self.fileName = fileName
+		self.blockSize = blockSize
+
+	def run(self):
+		try:
+			total = os.path.getsize(self.fileName)
+			crc = 0
+			done = 0
+
+			# zlib.crc32 releases the GIL on large buffers, so hashing a
+			# reused block keeps the GUI thread responsive
+			buffer = bytearray(self.blockSize)
+			view = memoryview(buffer)
+
+			startTime = time.monotonic()
+			lastReport = startTime
+
+			with open(self.fileName, 'rb', buffering=0) as f:
+				while not self.isInterruptionRequested():
+					size = f.readinto(buffer)
+					if not size:
+						break
+
+					crc = zlib.crc32(view[:size], crc)
+					done += size
+
+					now = time.monotonic()
+					if now - lastReport >= 0.25:
+						lastReport = now
+						self.progressUpdated.emit(done, total,
+												  done / max(now - startTime, 1e-6))
+
+			if self.isInterruptionRequested():
+				return None
+
+			elapsed = max(time.monotonic() - startTime, 1e-6)
+			self.progressUpdated.emit(done, total, done / elapsed)
+			self.crcFinished.emit("%08X" % (crc & 0xFFFFFFFF))
+		except Exception as e:
+			# Anything escaping run() would end the thread without either
+			# signal and leave the job waiting forever
+			self.crcFailed.emit(str(e) or e.__class__.__name__)
+
+	def stop(self):
+		self.requestInterruption()
+		self.wait()
+
+
+"""
+CRC32 concatenation, ported from zlib's crc32_combine: returns the CRC of
+A + B given crc(A), crc(B) and len(B)
+"""
+
+
+def gf2MatrixTimes(mat, vec):
+	total = 0
+	i = 0
+	while vec:
+		if vec & 1:
+			total ^= mat[i]
+		vec >>= 1
+		i += 1
+
+	return total
+
+
+def gf2MatrixSquare(mat):
+	return [gf2MatrixTimes(mat, mat[n]) for n in range(32)]
+
+
+def crc32Combine(crc1, crc2, len2):
+	if len2 <= 0:
+		return crc1
+
+	odd = [0xEDB88320] + [1 << n for n in range(31)]
+	even = gf2MatrixSquare(odd)
+	odd = gf2MatrixSquare(even)
+
+	while True:
+		even = gf2MatrixSquare(odd)
+		if len2 & 1:
+			crc1 = gf2MatrixTimes(even, crc1)
+		len2 >>= 1
+		if not len2:
+			break
+
+		odd = gf2MatrixSquare(even)
+		if len2 & 1:
+			crc1 = gf2MatrixTimes(odd, crc1)
+		len2 >>= 1
+		if not len2:
+			break
+
+	return crc1 ^ crc2
+
+
+"""
+Minimal EBML walking, enough to find where the first Matroska cluster starts
+"""
+
+EBML_ID = 0x1A45DFA3
+SEGMENT_ID = 0x18538067
+CLUSTER_ID = 0x1F43B675
+
+
+def readVint(data, pos, keepMarker=False):
+	if pos >= len(data):
+		return None, pos
+
+	first = data[pos]
+	if first == 0:
+		raise ValueError('invalid EBML variable size integer')
+
+	length = 1
+	mask = 0x80
+	while not first & mask:
+		mask >>= 1
+		length += 1
+
+	if pos + length > len(data):
+		return None, pos
+
+	if keepMarker:
+		value = first
+	else:
+		value = first & (mask - 1)
+
+	for byte in data[pos + 1:pos + length]:
+		value = (value << 8) | byte
+
+	if not keepMarker and value == (1 << (7 * length)) - 1:
+		value = -1
+
+	return value, pos + length
+
+
+def findFirstCluster(data):
+	"""
+	Returns the offset of the first top level Cluster, None if more data is
+	needed, or -1 if the data is not laid out as expected
+	"""
+	try:
+		elementId, pos = readVint(data, 0, True)
+		size, pos = readVint(data, pos)
+		if elementId is None or size is None:
+			return None
+		if elementId != EBML_ID or size < 0:
+			return -1
+
+		elementId, pos = readVint(data, pos + size, True)
+		size, pos = readVint(data, pos)
+		if elementId is None or size is None:
+			return None
+		if elementId != SEGMENT_ID:
+			return -1
+
+		while True:
+			start = pos
+			elementId, pos = readVint(data, pos, True)
+			size, pos = readVint(data, pos)
+			if elementId is None or size is None:
+				return None
+			if elementId == CLUSTER_ID:
+				return start
+			if size < 0:
+				return -1
+
+			pos += size
+	except ValueError:
+		return -1
+
+
+class TailCRCWorker(CRCWorker):
+	"""
+	Hashes a Matroska file while mkvmerge is still writing it.
+
+	mkvmerge writes clusters sequentially and never touches them again, but
+	when it finishes it seeks back and patches the segment size, seek head
+	and duration in front of the first cluster.  Everything from the first
+	cluster onwards is therefore hashed as it appears, and only the header
+	is read again at the end and joined on with crc32Combine.
+
+	expectedSize, roughly the size of mkvmerge's inputs, is the progress
+	total until the file grows past it.
+	"""
+
+	HEADER_LIMIT = 64 * 1024 * 1024
+
+	def __init__(self, fileName, blockSize=BLOCK_SIZE, expectedSize=0,
+				 parent=None):
+		super().__init__(fileName, blockSize, parent)
+
+		self.expectedSize = expectedSize
+		self.writerDone = False
+
+	def writerFinished(self):
+		self.writerDone = True
+
+	def run(self):
+		try:
+			while not os.path.isfile(self.fileName):
+				if self.isInterruptionRequested():
+					return None
+				if self.writerDone:
+					self.crcFailed.emit('output file was not created')
+					return None
+				self.msleep(100)
+
+			crc = 0
+			done = 0
+			header = b''
+			clusterStart = -1
+
+			startTime = time.monotonic()
+			lastReport = startTime
+
+			with open(self.fileName, 'rb') as f:
+				while not self.isInterruptionRequested():
+					# Read the flag before reading, so data written just
+					# before mkvmerge exited is not missed
+					writerDone = self.writerDone
+					data = f.read(self.blockSize)
+
+					if not data:
+						if writerDone:
+							break
+						self.msleep(100)
+						continue
+
+					if clusterStart < 0:
+						header += data
+						index = findFirstCluster(header)
+
+						if index is not None and index >= 0:
+							clusterStart = index
+							data = header[index:]
+						elif index == -1 or len(header) > self.HEADER_LIMIT:
+							break
+						else:
+							continue
+
+					crc = zlib.crc32(data, crc)
+					done += len(data)
+
+					now = time.monotonic()
+					if now - lastReport >= 0.25:
+						lastReport = now
+						written = clusterStart + done
+						total = max(os.fstat(f.fileno()).st_size,
+									self.expectedSize, written)
+						self.progressUpdated.emit(
+							written, total, done / max(now - startTime, 1e-6))
+
+			if self.isInterruptionRequested():
+				return None
+
+			if clusterStart < 0:
+				# Not a layout we understand, hash the finished file instead
+				while not self.writerDone:
+					if self.isInterruptionRequested():
+						return None
+					self.msleep(100)
+
+				super().run()
+				return None
+
+			with open(self.fileName, 'rb') as f:
+				header = f.read(clusterStart)
+				f.seek(0, os.SEEK_END)
+				total = f.tell()
+
+			if len(header) != clusterStart or clusterStart + done != total:
+				self.crcFailed.emit('output file changed size while hashing')
+				return None
+
+			crc = crc32Combine(zlib.crc32(header), crc, done)
+
+			elapsed = max(time.monotonic() - startTime, 1e-6)
+			self.progressUpdated.emit(total, total, total / elapsed)
+			self.crcFinished.emit("%08X" % (crc & 0xFFFFFFFF))
+		except Exception as e:
+			self.crcFailed.emit(str(e) or e.__class__.__name__)
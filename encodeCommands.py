@@ -0,0 +1,202 @@
+"""
+Command line builders for the encoding tools.  Nothing in here touches Qt
+or MediaInfo, so the pipeline's commands can be built and checked without
+a display or the tools being installed.
+"""
+
+import os
+import re
+
+
+def toolPath(name):
+	return os.path.normpath('./tools/' + name)
+
+
+def splitCommand(cmd):
+	# Same rules as QProcess.start(command): whitespace separates arguments
+	# outside of double quotes, and three quotes in a row are a literal quote
+	args = []
+	arg = ''
+	quoteCount = 0
+	inQuote = False
+	hasArg = False
+
+	for char in cmd:
+		if char == '"':
+			quoteCount += 1
+			if quoteCount == 3:
+				quoteCount = 0
+				arg += char
+			continue
+
+		if quoteCount:
+			if quoteCount == 1:
+				inQuote = not inQuote
+			quoteCount = 0
+			hasArg = True
+
+		if not inQuote and char.isspace():
+			if arg or hasArg:
+				args.append(arg)
+				arg = ''
+				hasArg = False
+		else:
+			arg += char
+
+	if quoteCount == 1:
+		inQuote = not inQuote
+		hasArg = True
+
+	if arg or hasArg:
+		args.append(arg)
+
+	return args
+
+
+def mkvMergePath(encodeConfig):
+	# Compared as text, an odd value picks 64 bit instead of raising
+	architecture = encodeConfig.get('System', 'architecture', fallback='64')
+	if architecture.strip() == '32':
+		return toolPath('mkvmerge32.exe')
+	else:
+		return toolPath('mkvmerge64.exe')
+
+
+def setThreads(cmdOutput, threads, lookaheadThreads=None):
+	# Replaces the --threads value the profile was saved with
+	cmdOutput = re.sub(r'\s--lookahead-threads\s+\S+', '', cmdOutput)
+
+	threads = ' --threads ' + str(threads)
+	if lookaheadThreads is not None:
+		threads += ' --lookahead-threads ' + str(lookaheadThreads)
+
+	if re.search(r'\s--threads\s+\S+', cmdOutput):
+		return re.sub(r'\s--threads\s+\S+', threads, cmdOutput, count=1)
+
+	executable, separator, args = cmdOutput.partition(' ')
+	return executable + threads + separator + args
+
+
+def videoCommand(encodeConfig, inputFile, outputFile, threads=None,
+				 lookaheadThreads=None, extraArgs=''):
+	cmdOutput = encodeConfig.get('Misc', 'CommandLineOutput')
+	if threads is not None:
+		cmdOutput = setThreads(cmdOutput, threads, lookaheadThreads)
+	cmdOutput += ' ' + encodeConfig.get('Misc', 'CustomCmdLine')
+
+	if extraArgs:
+		cmdOutput += ' ' + extraArgs
+
+	return (toolPath(cmdOutput) + ' --quiet --output ' +
+			'"' + outputFile + '" ' + '"' + os.path.normpath(inputFile) + '"')
+
+
+def segmentVideoCommand(encodeConfig, inputFile, outputFile, firstFrame,
+						frames, threads=None, lookaheadThreads=None):
+	# --stitchable keeps the headers of all segments identical, so mkvmerge
+	# can append them without re-encoding
+	return videoCommand(encodeConfig, inputFile, outputFile, threads,
+						lookaheadThreads, '--seek ' + str(firstFrame) + ' --frames ' +
+						str(frames) + ' --stitchable')
+
+
+def keyframeProbeCommand(inputFile):
+	# Only decodes the keyframes, showinfo prints one line with pts_time each
+	return (toolPath('ffmpeg.exe') + ' -hide_banner -skip_frame nokey -i "' +
+			os.path.normpath(inputFile) + '" -map 0:v:0 -vf showinfo ' +
+			'-an -f null -')
+
+
+def appendCommand(encodeConfig, inputFiles, outputFile):
+	return (mkvMergePath(encodeConfig) + ' -o "' + outputFile + '" ' +
+			' + '.join('"' + inputFile + '"' for inputFile in inputFiles))
+
+
+def identifyCommand(encodeConfig, inputFile):
+	return mkvMergePath(encodeConfig) + ' --identify "' + inputFile + '"'
+
+
+def parseAudioTracks(identifyOutput):
+	# mkvmerge --identify prints lines like "Track ID 1: audio (AAC)"
+	trackIds = []
+
+	for line in identifyOutput.splitlines():
+		line = line.split()
+
+		if len(line) > 3 and line[0] == 'Track' and line[3] == 'audio':
+			trackIds.append(line[2][:-1])
+
+	return trackIds
+
+
+def ffmpegAudioCommand(inputFile, trackId, wavFile=None):
+	# Without a WAV file the PCM is written to stdout for piping
+	if wavFile is None:
+		output = '-'
+	else:
+		output = '"' + wavFile + '"'
+
+	return (toolPath('ffmpeg.exe') + ' -i "' + os.path.normpath(inputFile) +
+			'" -map 0:' + trackId + ' -f wav ' + output)
+
+
+def neroAacCommand(encodeConfig, aacFile, wavFile=None):
+	if wavFile is None:
+		source = '-'
+	else:
+		source = '"' + wavFile + '"'
+
+	return (toolPath('neroAacEnc.exe') + ' -ignorelength -q ' +
+			encodeConfig.get('Misc', 'audioquality') +
+			' -if ' + source + ' -of "' + aacFile + '"')
+
+
+def uniqueDisplayName(displayName, jobs):
+	# Files with the same name from different folders would be encoded to
+	# the same output file, later ones get ' (2)', ' (3)'... added
+	takenNames = set(job.displayName.lower() for job in jobs)
+
+	uniqueName = displayName
+	count = 1
+	while uniqueName.lower() in takenNames:
+		count += 1
+		uniqueName = (displayName[:-4] + ' (' + str(count) + ')' +
+					  displayName[-4:])
+
+	return uniqueName
+
+
+def encodedFileName(outputDir, displayName):
+	return os.path.normpath(outputDir + '/' + displayName[:-4] +
+							'[Encoded].mkv')
+
+
+def crcFileName(encodedFile, crc):
+	return encodedFile[0:-13] + '[' + crc + ']' + '.mkv'
+
+
+def mergeCommand(encodeConfig, inputFile, videoFile, audioFiles, outputFile,
+				 videoLanguage='', audioLanguages=()):
+	mkvMergeCmd = mkvMergePath(encodeConfig)
+	mkvMergeCmd += ' -o "' + outputFile + '"'
+
+	if not videoLanguage == '':
+		mkvMergeCmd += (' --language "0:' + videoLanguage + '"')
+
+	mkvMergeCmd += (' "' + videoFile + '" ')
+	if encodeConfig.getboolean('Misc', 'audiosource'):
+		mkvMergeCmd += ('-D "' + os.path.normpath(inputFile) + '"')
+	else:
+		for i, audioFile in enumerate(audioFiles):
+			mkvMergeCmd += ('--no-chapters ')
+
+			if i < len(audioLanguages) and not audioLanguages[i] == '':
+				mkvMergeCmd += ('--language "0:' + audioLanguages[i] + '" ')
+
+			mkvMergeCmd += ('--track-name "0:AAC LC ' +
+							encodeConfig.get('Misc', 'audioquality') + '" "' +
+							audioFile + '" ')
+
+		mkvMergeCmd += ('-D -A "' + os.path.normpath(inputFile) + '"')
+
+	return mkvMergeCmd
@@ -0,0 +1,535 @@
+"""
+Encode farm over TCP.  A coordinator owns the batch and hands jobs to
+headless agents running the same code; every message is one line of JSON.
+
+	agent -> coordinator	hello, heartbeat, event, file (+ raw bytes), result
+	coordinator -> agent	job, pause, resume, cancel, bye
+
+Agents read the source files by the path they are given, so sources have
+to be on storage every agent can reach.  Finished outputs and their
+checksum files are sent back and written to the coordinator's output
+directory.  Agents that stop sending heartbeats are dropped and their jobs
+are handed to the remaining agents.
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import time
+
+from asyncEncode import AsyncEncodeJob
+from asyncRunner import ToolRunner
+from encodeCommands import uniqueDisplayName
+from encodePlanner import createPinning, pinJob, planBatch
+from jobState import JobState
+from processPriority import stagePriorities
+from workerPool import JobStatus, configFromDict, configToDict
+
+HEARTBEAT_INTERVAL = 5
+RECONNECT_DELAY = 5
+TRANSFER_BLOCK = 1024 * 1024
+MAX_ATTEMPTS = 3
+
+
+def parseAddress(address, defaultHost='0.0.0.0'):
+	host, separator, port = address.rpartition(':')
+	if not separator:
+		host, port = defaultHost, address
+
+	return host or defaultHost, int(port)
+
+
+def encodeMessage(message):
+	return (json.dumps(message) + '\n').encode('utf-8')
+
+
+async def readMessage(reader):
+	line = await reader.readline()
+	if not line:
+		return None
+
+	return json.loads(line.decode('utf-8'))
+
+
+class FarmAgent:
+	"""
+	The coordinator's record of a connected agent
+	"""
+
+	def __init__(self, name, slots, writer):
+		self.name = name
+		self.slots = max(1, slots)
+		self.writer = writer
+
+		self.jobs = {}
+		self.lastSeen = time.monotonic()
+		self.connected = True
+
+	def send(self, message):
+		self.writer.write(encodeMessage(message))
+
+
+class Coordinator:
+	"""
+	Has the AsyncEncodeBatch interface, so it can be run by the same
+	pipeline; report(job, event, text) gets job None for farm messages.
+	"""
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, address,
+				 report):
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.outputDir = outputDir
+		self.address = address
+		self.report = report
+
+		self.token = optionsConfig.get('Main', 'FarmToken', fallback='')
+		self.timeout = optionsConfig.getint('Main', 'FarmTimeout',
+											fallback=30)
+
+		self.jobs = []
+		self.pendingJobs = []
+		self.attempts = {}
+		self.agents = {}
+		# Writers of every open connection, agent or not yet
+		self.connections = set()
+		self.paused = False
+		self.stopped = False
+		self.finished = None
+
+	def addFile(self, inputFile, displayName=None, jobId=None):
+		if displayName is None:
+			displayName = os.path.basename(inputFile)
+		displayName = uniqueDisplayName(displayName, self.jobs)
+		if jobId is None:
+			jobId = len(self.jobs) + 1
+
+		job = JobStatus(jobId, os.path.abspath(inputFile), displayName, None)
+		self.jobs.append(job)
+		self.pendingJobs.append(job)
+		return job
+
+	def log(self, job, text):
+		self.report(job, 'log', text)
+
+	@property
+	def maxConcurrent(self):
+		return sum(agent.slots for agent in self.agents.values())
+
+	def runningJobs(self):
+		return [job for job in self.jobs if job.isRunning()]
+
+	def finishedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Finished]
+
+	def failedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Failed]
+
+	"""
+	Serving agents
+	"""
+
+	async def run(self):
+		self.finished = asyncio.Event()
+
+		host, port = parseAddress(self.address)
+		server = await asyncio.start_server(self.handleAgent, host, port)
+		self.log(None, 'Waiting for agents on ' + host + ':' + str(port))
+
+		watchdog = asyncio.ensure_future(self.watchAgents())
+		try:
+			self.checkFinished()
+			await self.finished.wait()
+		finally:
+			watchdog.cancel()
+
+			for agent in list(self.agents.values()):
+				agent.send({'type': 'bye'})
+
+			for writer in list(self.connections):
+				writer.close()
+
+			# The handlers see the closed connections and return before the
+			# loop goes away
+			while self.connections:
+				await asyncio.sleep(0.05)
+
+			server.close()
+			await server.wait_closed()
+
+	async def handleAgent(self, reader, writer):
+		self.connections.add(writer)
+		try:
+			await self.serveAgent(reader, writer)
+		finally:
+			self.connections.discard(writer)
+
+	async def serveAgent(self, reader, writer):
+		try:
+			hello = await asyncio.wait_for(readMessage(reader), self.timeout)
+		except (asyncio.TimeoutError, OSError, ValueError):
+			writer.close()
+			return None
+
+		if (hello is None or hello.get('type') != 'hello' or
+				not hmac.compare_digest(str(hello.get('token', '')),
+										self.token)):
+			writer.close()
+			return None
+
+		name = str(hello.get('agent', 'agent'))
+		while name in self.agents:
+			name += '+'
+
+		agent = FarmAgent(name, int(hello.get('slots', 1)), writer)
+		self.agents[name] = agent
+		self.log(None, 'Agent ' + name + ' connected with ' +
+				 str(agent.slots) + ' slot(s)')
+
+		if self.paused:
+			agent.send({'type': 'pause'})
+		self.dispatch()
+
+		try:
+			while agent.connected:
+				message = await readMessage(reader)
+				if message is None:
+					break
+
+				agent.lastSeen = time.monotonic()
+				await self.handleMessage(agent, message, reader)
+		except (OSError, KeyError, ValueError, asyncio.IncompleteReadError):
+			pass
+		finally:
+			self.dropAgent(agent, 'disconnected')
+
+	async def handleMessage(self, agent, message, reader):
+		job = agent.jobs.get(message.get('job'))
+
+		if message['type'] == 'event' and job is not None:
+			if message['event'] == 'started':
+				job.state = JobState.Running
+			self.report(job, message['event'], message.get('text', ''))
+
+		elif message['type'] == 'file':
+			fileName = await self.receiveFile(agent, message, reader)
+			if job is not None and message.get('output'):
+				job.encodedFile = fileName
+
+		elif message['type'] == 'result' and job is not None:
+			del agent.jobs[job.jobId]
+			job.state = message['state']
+
+			self.report(job, 'finished', '')
+			self.dispatch()
+			self.checkFinished()
+
+	async def receiveFile(self, agent, message, reader):
+		# Only the base name is used, an agent can't write elsewhere
+		fileName = os.path.join(self.outputDir,
+								os.path.basename(message['name']))
+		remaining = int(message['size'])
+
+		try:
+			with open(fileName + '.part', 'wb') as f:
+				while remaining:
+					data = await reader.readexactly(min(remaining,
+														TRANSFER_BLOCK))
+					f.write(data)
+					remaining -= len(data)
+					agent.lastSeen = time.monotonic()
+
+			os.replace(fileName + '.part', fileName)
+		except BaseException:
+			if os.path.isfile(fileName + '.part'):
+				os.remove(fileName + '.part')
+			raise
+
+		return fileName
+
+	async def watchAgents(self):
+		while True:
+			await asyncio.sleep(1)
+
+			now = time.monotonic()
+			for agent in list(self.agents.values()):
+				if now - agent.lastSeen > self.timeout:
+					self.dropAgent(agent, 'timed out')
+
+	def dropAgent(self, agent, reason):
+		if not agent.connected:
+			return None
+
+		agent.connected = False
+		agent.writer.close()
+		del self.agents[agent.name]
+
+		if self.stopped or self.finished.is_set():
+			for job in agent.jobs.values():
+				job.state = JobState.Stopped
+			self.checkFinished()
+			return None
+
+		self.log(None, 'Agent ' + agent.name + ' ' + reason)
+
+		# Jobs of a lost agent go back to the front of the queue
+		for job in sorted(agent.jobs.values(), key=lambda job: job.jobId,
+						  reverse=True):
+			self.attempts[job.jobId] = self.attempts.get(job.jobId, 0) + 1
+
+			if self.attempts[job.jobId] >= MAX_ATTEMPTS:
+				self.log(job, 'Error - lost ' + str(MAX_ATTEMPTS) +
+						 ' agents while encoding, giving up')
+				job.state = JobState.Failed
+				self.report(job, 'finished', '')
+			else:
+				self.log(job, 'Agent ' + agent.name + ' ' + reason +
+						 ', re-dispatching')
+				job.state = JobState.Waiting
+				self.pendingJobs.insert(0, job)
+
+		agent.jobs = {}
+		self.dispatch()
+		self.checkFinished()
+
+	def dispatch(self):
+		if self.paused or self.stopped:
+			return None
+
+		# Fill the emptiest agents first
+		agents = sorted(self.agents.values(),
+						key=lambda agent: len(agent.jobs) - agent.slots)
+
+		for agent in agents:
+			while self.pendingJobs and len(agent.jobs) < agent.slots:
+				job = self.pendingJobs.pop(0)
+				job.workerId = agent.name
+				agent.jobs[job.jobId] = job
+
+				agent.send({'type': 'job', 'job': job.jobId,
+							'file': job.inputFile, 'name': job.displayName,
+							'profile': configToDict(self.encodeConfig),
+							'options': configToDict(self.optionsConfig)})
+
+	def checkFinished(self):
+		if self.finished is None:
+			return None
+
+		if self.stopped or not (self.pendingJobs or any(
+				agent.jobs for agent in self.agents.values())):
+			self.finished.set()
+
+	"""
+	Batch control
+	"""
+
+	def sendAll(self, message):
+		for agent in self.agents.values():
+			agent.send(message)
+
+	def pause(self):
+		self.paused = True
+		self.sendAll({'type': 'pause'})
+
+		for job in self.runningJobs():
+			job.state = JobState.Paused
+
+	def resume(self):
+		self.paused = False
+		self.sendAll({'type': 'resume'})
+
+		for job in self.runningJobs():
+			job.state = JobState.Running
+
+		self.dispatch()
+
+	def stop(self):
+		self.stopped = True
+		self.sendAll({'type': 'cancel'})
+
+		for job in self.jobs:
+			if job.state in (JobState.Waiting, JobState.Running,
+							 JobState.Paused):
+				job.state = JobState.Stopped
+
+		self.pendingJobs = []
+		self.checkFinished()
+
+
+class EncodeAgent:
+	"""
+	Headless worker for a Coordinator.  Encodes into a staging directory,
+	sends the results back and keeps reconnecting until told 'bye'.
+	"""
+
+	def __init__(self, address, name, slots, token='', report=None):
+		self.address = address
+		self.name = name
+		self.slots = max(1, slots)
+		self.token = token
+		self.report = report
+
+		self.outputDir = os.path.normpath('./temp/agent-' + name)
+		self.runner = ToolRunner()
+		self.pinning = None
+		self.tasks = {}
+		self.outgoing = None
+		self.done = False
+
+	def log(self, text):
+		if self.report is not None:
+			self.report(None, 'log', text)
+
+	def send(self, message):
+		self.outgoing.put_nowait(message)
+
+	def jobEvent(self, job, event, text):
+		self.send({'type': 'event', 'job': job.jobId, 'event': event,
+				   'text': text})
+
+		if self.report is not None:
+			self.report(job, event, text)
+
+	async def run(self):
+		if not os.path.isdir(self.outputDir):
+			os.makedirs(self.outputDir)
+
+		host, port = parseAddress(self.address, 'localhost')
+
+		while not self.done:
+			try:
+				reader, writer = await asyncio.open_connection(host, port)
+			except OSError as e:
+				self.log('Could not connect to ' + self.address + ': ' +
+						 str(e))
+			else:
+				self.log('Connected to ' + self.address)
+				await self.serve(reader, writer)
+
+			if not self.done:
+				await asyncio.sleep(RECONNECT_DELAY)
+
+	async def serve(self, reader, writer):
+		self.outgoing = asyncio.Queue()
+		self.send({'type': 'hello', 'agent': self.name, 'slots': self.slots,
+				   'token': self.token})
+
+		sender = asyncio.ensure_future(self.sendMessages(writer))
+		heartbeat = asyncio.ensure_future(self.sendHeartbeats())
+
+		try:
+			while True:
+				message = await readMessage(reader)
+				if message is None:
+					break
+
+				if message['type'] == 'job':
+					self.tasks[message['job']] = asyncio.ensure_future(
+						self.runJob(message))
+				elif message['type'] == 'pause':
+					self.runner.pause()
+				elif message['type'] == 'resume':
+					self.runner.unpause()
+				elif message['type'] == 'cancel':
+					self.cancelJobs()
+				elif message['type'] == 'bye':
+					self.done = True
+					break
+		except (OSError, KeyError, ValueError):
+			pass
+		finally:
+			# The coordinator hands unfinished jobs to other agents
+			self.cancelJobs()
+			heartbeat.cancel()
+			sender.cancel()
+			writer.close()
+
+			self.runner.unpause()
+			self.log('Disconnected from ' + self.address)
+
+	async def sendMessages(self, writer):
+		# Everything goes through here so file data is never interleaved
+		# with other messages
+		while True:
+			message = await self.outgoing.get()
+
+			if isinstance(message, tuple):
+				jobId, fileName, output, sent = message
+				try:
+					await self.sendFile(writer, jobId, fileName, output)
+				except BaseException as e:
+					sent.set_exception(e)
+					raise
+				sent.set_result(None)
+			else:
+				writer.write(encodeMessage(message))
+				await writer.drain()
+
+	async def sendFile(self, writer, jobId, fileName, output):
+		writer.write(encodeMessage({
+			'type': 'file', 'job': jobId, 'output': output,
+			'name': os.path.basename(fileName),
+			'size': os.path.getsize(fileName)}))
+
+		with open(fileName, 'rb') as f:
+			while True:
+				data = f.read(TRANSFER_BLOCK)
+				if not data:
+					break
+
+				writer.write(data)
+				await writer.drain()
+
+	async def sendHeartbeats(self):
+		while True:
+			self.send({'type': 'heartbeat'})
+			await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+	async def runJob(self, message):
+		encodeConfig = configFromDict(message['profile'])
+		optionsConfig = configFromDict(message['options'])
+
+		# Threads are planned for this machine, with the slots as encodes
+		optionsConfig['Main']['ConcurrentJobs'] = str(self.slots)
+
+		job = AsyncEncodeJob(message['job'], message['file'], message['name'],
+							 self.outputDir, encodeConfig, optionsConfig,
+							 self.runner, self.jobEvent)
+
+		try:
+			self.jobEvent(job, 'started', '')
+
+			loop = asyncio.get_event_loop()
+			await loop.run_in_executor(None, planBatch, encodeConfig,
+									   optionsConfig, [job])
+
+			# The coordinator's options decide the agent's pinning and
+			# priorities
+			self.runner.priorities = stagePriorities(optionsConfig)
+			if self.pinning is None:
+				self.pinning = createPinning(optionsConfig)
+			pinJob(self.pinning, job)
+			await job.run()
+
+			if job.state == JobState.Finished:
+				files = [(job.encodedFile, True)]
+				files += [(sidecar, False) for sidecar in job.sidecars]
+
+				for fileName, output in files:
+					sent = asyncio.get_event_loop().create_future()
+					self.send((job.jobId, fileName, output, sent))
+					await sent
+
+					os.remove(fileName)
+
+			self.send({'type': 'result', 'job': job.jobId,
+					   'state': job.state})
+		finally:
+			self.tasks.pop(job.jobId, None)
+			if self.pinning is not None:
+				self.pinning.release(job.jobId)
+
+	def cancelJobs(self):
+		for task in list(self.tasks.values()):
+			task.cancel()
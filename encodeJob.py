@@ -0,0 +1,505 @@
+import os
+import psutil
+
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+from audioEncoder import AudioEncodePool
+from checksums import (ALGORITHM_NAMES, ChecksumWorker, parseAlgorithms,
+					   writeSidecars)
+from crcEngine import TailCRCWorker, formatRate
+from encodeCommands import (crcFileName, encodedFileName, ffmpegAudioCommand,
+							identifyCommand, mergeCommand, neroAacCommand,
+							parseAudioTracks, videoCommand)
+from encodePlanner import setAffinity
+from jobState import JobState
+from jobWorkspace import JobWorkspace
+from mediaInfoModel import MediaFile
+from mediaProbe import readMediaInfo
+from processPriority import setPriority, stagePriorities
+from progressParser import ProgressReader, VideoProgress
+from videoSegmentEncoder import SegmentedVideoEncoder
+
+
+class EncodeJob(QObject):
+	logMessage = pyqtSignal(object, str)
+	progressUpdated = pyqtSignal(object, str)
+	statsUpdated = pyqtSignal(object, object)
+	jobFinished = pyqtSignal(object)
+
+	def __init__(self, jobId, inputFile, displayName, outputDir, encodeConfig,
+				 optionsConfig, parent=None):
+		super().__init__(parent)
+
+		self.jobId = jobId
+		self.inputFile = inputFile
+		self.displayName = displayName
+		self.outputDir = outputDir
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+
+		self.state = JobState.Waiting
+		self.halt = False
+		self.videoDone = False
+		self.audioDone = False
+		self.encodedFile = ''
+		self.audioPool = None
+		self.videoEncoder = None
+		self.crcWorker = None
+		self.checksumWorker = None
+		self.checksumAlgorithms = parseAlgorithms(
+			optionsConfig.get('Main', 'Checksums', fallback=''))
+		self.digests = {}
+		self.renamed = False
+		self.totalAudioTracks = 0
+		self.pipeAudio = optionsConfig.getboolean('Main', 'PipeAudio',
+												  fallback=True)
+		self.threads = None
+		self.lookaheadThreads = None
+		self.cpus = None
+		self.priorities = stagePriorities(optionsConfig)
+		self.media = MediaFile()
+		self.videoProgress = None
+		self.videoReader = None
+		self.workspace = JobWorkspace(inputFile)
+
+		self.process = QProcess()
+		self.audioStreamProcess = QProcess()
+		self.mkvMergeProcess = QProcess()
+
+	"""
+	Helpers
+	"""
+
+	def log(self, text):
+		self.logMessage.emit(self, text)
+
+	def tempPath(self, name):
+		return self.workspace.path(name)
+
+	def videoDuration(self):
+		return self.media.durationSeconds()
+
+	def startProcess(self, process, cmd, kind='tool'):
+		# Through the log, stdout is the CLI's event stream
+		self.log(cmd)
+		process.start(cmd)
+
+		if self.cpus:
+			setAffinity(process.processId(), self.cpus)
+		setPriority(process.processId(), self.priorities.get(kind))
+
+		if self.state == JobState.Paused:
+			psutil.Process(process.processId()).suspend()
+
+	def processes(self):
+		processes = [self.process, self.audioStreamProcess,
+					 self.mkvMergeProcess]
+
+		if self.audioPool is not None:
+			processes += self.audioPool.processes()
+
+		if self.videoEncoder is not None:
+			processes += self.videoEncoder.processes()
+
+		return processes
+
+	def runningProcesses(self):
+		running = []
+		for process in self.processes():
+			if process.state() == QProcess.Running:
+				try:
+					running.append(psutil.Process(process.processId()))
+				except psutil.NoSuchProcess:
+					pass
+
+		return running
+
+	def isRunning(self):
+		return self.state in (JobState.Running, JobState.Paused)
+
+	"""
+	Encoding stages
+	"""
+
+	def start(self):
+		self.state = JobState.Running
+
+		if not os.path.isfile(os.path.normpath(self.inputFile)):
+			self.log('Error - file not found: ' + self.inputFile)
+			self.finish(JobState.Failed)
+			return None
+
+		self.log('Encoding file  -  ' + self.displayName + '...')
+
+		self.videoDone = False
+		self.audioDone = False
+
+		# Read once, the progress, segments and merge all use it
+		self.media = readMediaInfo(self.inputFile)
+		self.videoProgress = VideoProgress(self.media.frameCount() or None)
+
+		self.workspace.create()
+		if self.workspace.reused:
+			self.log('Reusing workspace ' + self.workspace.directory)
+
+			if (self.workspace.isDone('video') and
+					os.path.isfile(self.tempPath('Output.mkv'))):
+				self.log('Video already encoded, skipping to audio')
+				self.videoDone = True
+
+		if not self.videoDone:
+			self.encodeVideo()
+
+		# The audio branch only reads the source, so it runs alongside x264
+		self.encodeAudioStreams()
+
+	def encodeVideo(self):
+		segments = self.optionsConfig.getint('Main', 'VideoSegments',
+											 fallback=1)
+		if segments > 1:
+			if self.media.frameCount() and self.media.frameRate():
+				self.videoEncoder = SegmentedVideoEncoder(
+					self.startProcess, self.workspace, self.encodeConfig,
+					self.inputFile, self.videoProgress, self.media.frameRate(),
+					segments, self.threads, self.lookaheadThreads)
+				self.videoEncoder.logMessage.connect(self.log)
+				self.videoEncoder.progressUpdated.connect(
+					lambda text: self.progressUpdated.emit(self, text))
+				self.videoEncoder.statsUpdated.connect(self.videoStatsUpdate)
+				self.videoEncoder.encodeFinished.connect(
+					self.finishedSegmentedVideoEncode)
+				self.videoEncoder.start()
+				return None
+
+			self.log('Unknown frame count, encoding the video in one piece')
+
+		self.videoReader = ProgressReader('x264',
+										  self.media.frameCount() or None)
+		self.process.finished.connect(self.finishedCurrentVideoEncode)
+		self.process.readyReadStandardError.connect(self.progressUpdate)
+
+		self.startProcess(self.process, videoCommand(
+			self.encodeConfig, self.inputFile, self.tempPath('Output.mkv'),
+			self.threads, self.lookaheadThreads), 'video')
+
+	def startMergeWhenReady(self):
+		if self.halt:
+			return -1
+
+		if self.videoDone and self.audioDone:
+			self.startMergeProcess()
+		elif self.videoDone:
+			self.progressUpdated.emit(self, 'Waiting for audio streams...')
+
+	def progressUpdate(self):
+		event = self.videoReader.feed(
+			bytes(self.process.readAllStandardError()))
+
+		if event is not None:
+			self.videoStatsUpdate(self.videoProgress.update('video', event))
+		elif self.videoReader.lastLine:
+			self.progressUpdated.emit(self, self.videoReader.lastLine)
+
+	def videoStatsUpdate(self, event):
+		self.progressUpdated.emit(self, event.describe())
+		self.statsUpdated.emit(self, event)
+
+	def finishedCurrentVideoEncode(self):
+		if self.halt:
+			return -1
+
+		# Only a clean exit marks the video done, a crashed or failed x264
+		# leaves a truncated Output.mkv that a retry must not reuse
+		exitCode = self.process.exitCode()
+		if (self.process.exitStatus() != QProcess.NormalExit or
+				exitCode != 0):
+			if self.process.exitStatus() != QProcess.NormalExit:
+				self.log('Error - x264 crashed')
+			elif exitCode == -1:
+				self.log('Invalid Custom Command Line Input')
+			else:
+				self.log('Error - x264 failed with exit code ' + str(exitCode))
+			self.finish(JobState.Failed)
+		else:
+			self.videoEncodeComplete()
+
+	def finishedSegmentedVideoEncode(self, success):
+		if self.halt:
+			return -1
+
+		if not success:
+			self.finish(JobState.Failed)
+		else:
+			self.videoEncodeComplete()
+
+	def videoEncodeComplete(self):
+		self.log('Video Encode Complete')
+		self.workspace.markDone('video')
+		self.videoDone = True
+		self.startMergeWhenReady()
+
+	def encodeAudioStreams(self):
+		if self.halt:
+			return -1
+
+		if self.encodeConfig.getboolean('Misc', 'audiosource'):
+			self.log('Using Source Audio')
+			self.audioDone = True
+			self.startMergeWhenReady()
+			return None
+
+		self.log('Analyzing audio streams...')
+
+		self.audioPool = AudioEncodePool(
+			self.startProcess,
+			self.optionsConfig.getint('Main', 'AudioConcurrency', fallback=2))
+		self.audioPool.logMessage.connect(self.log)
+		self.audioPool.progressUpdated.connect(self.audioProgressUpdate)
+		self.audioPool.allFinished.connect(self.finishedAudioEncode)
+		self.totalAudioTracks = 0
+
+		self.audioStreamProcess.finished.connect(self.processTracks)
+		self.startProcess(self.audioStreamProcess,
+						  identifyCommand(self.encodeConfig, self.inputFile),
+						  'identify')
+
+	def processTracks(self):
+		if self.halt:
+			return -1
+
+		output = (bytes(self.audioStreamProcess.readAllStandardOutput()).
+				  decode(errors='ignore'))
+
+		self.audioStreamProcess.close()
+		self.audioStreamProcess = QProcess()
+
+		for trackId in parseAudioTracks(output):
+			self.totalAudioTracks += 1
+
+			wavFile = None
+			if not self.pipeAudio:
+				wavFile = self.tempPath('OutputAudio' +
+										str(self.totalAudioTracks) + '.wav')
+			aacFile = self.tempPath('OutputAudio' +
+									str(self.totalAudioTracks) + '.aac')
+
+			self.audioPool.addTrack(
+				self.totalAudioTracks,
+				ffmpegAudioCommand(self.inputFile, trackId, wavFile),
+				neroAacCommand(self.encodeConfig, aacFile, wavFile),
+				self.pipeAudio, self.videoDuration())
+
+		if self.totalAudioTracks == 0:
+			self.audioDone = True
+			self.startMergeWhenReady()
+			return None
+
+		self.log('Found ' + str(self.totalAudioTracks) + ' audio stream(s)')
+		self.audioPool.start()
+
+	def audioProgressUpdate(self, text):
+		if self.videoDone:
+			self.progressUpdated.emit(self, text)
+
+	def finishedAudioEncode(self, failedTracks):
+		if self.halt:
+			return -1
+
+		if failedTracks:
+			self.log(str(failedTracks) + ' audio stream(s) failed to encode')
+			self.finish(JobState.Failed)
+			return None
+
+		self.audioDone = True
+		self.startMergeWhenReady()
+
+	def startMergeProcess(self):
+		if self.halt:
+			return -1
+
+		videoLanguage = self.media.videoLanguage()
+		audioLanguages = self.media.audioLanguages(self.totalAudioTracks)
+
+		self.encodedFile = encodedFileName(self.outputDir, self.displayName)
+
+		audioFiles = [self.tempPath('OutputAudio' + str(i + 1) + '.aac')
+					  for i in range(self.totalAudioTracks)]
+		mkvMergeCmd = mergeCommand(self.encodeConfig, self.inputFile,
+								   self.tempPath('Output.mkv'), audioFiles,
+								   self.encodedFile, videoLanguage,
+								   audioLanguages)
+
+		self.progressUpdated.emit(self, 'Merging files.')
+		self.log('Merging Files...')
+
+		if self.optionsConfig.getboolean('Main', 'InlineCRC', fallback=False):
+			# A leftover file from an earlier run would be hashed before
+			# mkvmerge truncates it
+			if os.path.isfile(self.encodedFile):
+				os.remove(self.encodedFile)
+
+			mergeInputs = [self.tempPath('Output.mkv')] + audioFiles
+			self.crcWorker = TailCRCWorker(
+				self.encodedFile, expectedSize=sum(
+					os.path.getsize(fileName) for fileName in mergeInputs
+					if os.path.isfile(fileName)))
+			self.crcWorker.progressUpdated.connect(self.crcProgressUpdate)
+			self.crcWorker.crcFinished.connect(self.finishedCRCProcess)
+			self.crcWorker.crcFailed.connect(self.failedCRCProcess)
+			self.crcWorker.start()
+
+		self.mkvMergeProcess.finished.connect(self.startCRCProcess)
+		self.startProcess(self.mkvMergeProcess, mkvMergeCmd, 'merge')
+
+	def startCRCProcess(self):
+		if self.halt:
+			return -1
+
+		exitCode = self.mkvMergeProcess.exitCode()
+		self.mkvMergeProcess.close()
+		self.mkvMergeProcess = QProcess()
+
+		# mkvmerge returns 1 for warnings and 2 for errors
+		if exitCode >= 2:
+			self.log('Error - mkvmerge failed with exit code ' + str(exitCode))
+			self.finish(JobState.Failed)
+			return None
+
+		if self.crcWorker is not None:
+			self.log('Finishing CRC...')
+			self.crcWorker.writerFinished()
+			return None
+
+		# The filename CRC and any sidecar digests share a single read
+		self.startChecksumWorker(['crc32'] + [name for name in
+											  self.checksumAlgorithms if name != 'crc32'])
+
+	def startChecksumWorker(self, algorithms):
+		names = ', '.join(ALGORITHM_NAMES[name] for name in algorithms)
+		self.progressUpdated.emit(self, 'Generating ' + names + '...')
+		self.log('Generating ' + names + '...')
+
+		self.checksumWorker = ChecksumWorker(self.encodedFile, algorithms)
+		self.checksumWorker.progressUpdated.connect(self.crcProgressUpdate)
+		self.checksumWorker.checksumsFinished.connect(self.finishedChecksums)
+		self.checksumWorker.checksumsFailed.connect(self.failedCRCProcess)
+		self.checksumWorker.start()
+
+	def crcProgressUpdate(self, done, total, bytesPerSec):
+		self.progressUpdated.emit(self, 'Generating checksums... ' +
+								  str(done * 100 // max(total, 1)) + '%  ' +
+								  formatRate(bytesPerSec))
+
+	def finishedCRCProcess(self, crc):
+		if self.halt:
+			return -1
+
+		self.digests['crc32'] = crc
+		self.renameEncodedFile()
+
+		extraAlgorithms = [name for name in self.checksumAlgorithms
+						   if name != 'crc32']
+		if extraAlgorithms:
+			self.startChecksumWorker(extraAlgorithms)
+		else:
+			self.finishedChecksums({})
+
+	def finishedChecksums(self, digests):
+		if self.halt:
+			return -1
+
+		self.digests.update(digests)
+		if not self.renamed:
+			self.renameEncodedFile()
+
+		selected = dict((name, self.digests[name])
+						for name in self.checksumAlgorithms)
+		if selected:
+			try:
+				for sidecar in writeSidecars(self.encodedFile, selected):
+					self.log('Wrote ' + os.path.basename(sidecar))
+			except OSError as e:
+				self.log('Error - could not write checksum files: ' + str(e))
+				self.finish(JobState.Failed)
+				return None
+
+		self.log('Encode Complete  -  ' + self.displayName)
+		self.finish(JobState.Finished)
+
+	def renameEncodedFile(self):
+		renamedFile = crcFileName(self.encodedFile, self.digests['crc32'])
+		os.rename(self.encodedFile, renamedFile)
+		self.encodedFile = renamedFile
+		self.renamed = True
+
+	def failedCRCProcess(self, error):
+		if self.halt:
+			return -1
+
+		self.log('Error - could not generate checksums: ' + error)
+		self.finish(JobState.Failed)
+
+	def finish(self, state):
+		# Stops the other branch from chaining further stages while closing
+		self.halt = True
+		self.closeProcesses()
+		self.state = state
+
+		if state == JobState.Finished:
+			self.workspace.cleanup()
+		elif self.workspace.exists():
+			self.log('Keeping workspace ' + self.workspace.directory)
+
+		self.jobFinished.emit(self)
+
+	"""
+	Job control
+	"""
+
+	def closeProcesses(self):
+		if self.audioPool is not None:
+			self.audioPool.stop()
+
+		if self.videoEncoder is not None:
+			self.videoEncoder.stop()
+
+		if self.crcWorker is not None:
+			self.crcWorker.stop()
+
+		if self.checksumWorker is not None:
+			self.checksumWorker.stop()
+
+		self.process.close()
+		self.audioStreamProcess.close()
+		self.mkvMergeProcess.close()
+
+	def pause(self):
+		if self.state != JobState.Running:
+			return None
+
+		for process in self.runningProcesses():
+			process.suspend()
+
+		self.state = JobState.Paused
+
+	def resume(self):
+		if self.state != JobState.Paused:
+			return None
+
+		for process in self.runningProcesses():
+			process.resume()
+
+		self.state = JobState.Running
+
+	def stop(self):
+		self.halt = True
+
+		if self.state == JobState.Paused:
+			for process in self.runningProcesses():
+				process.resume()
+
+		self.closeProcesses()
+		self.state = JobState.Stopped
+
+		if self.workspace.exists():
+			self.log('Keeping workspace ' + self.workspace.directory)
@@ -0,0 +1,398 @@
+import asyncio
+import configparser
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from asyncEncode import AsyncEncodeBatch
+from asyncRunner import newEventLoop
+from encodeCommands import uniqueDisplayName
+from encodeFarm import Coordinator
+from encodeJob import EncodeJob
+from encodePlanner import createPinning, pinJob, pinningMessage, planBatch
+from encodeScheduler import EncodeScheduler
+from jobState import JobState
+from progressParser import ProgressEvent
+from workerPool import WorkerPool
+
+
+def loadProfile(profileName):
+	config = configparser.ConfigParser()
+	config.read(os.path.normpath('./profiles/' + profileName + '.ini'))
+
+	return config
+
+
+def loadOptions():
+	config = configparser.ConfigParser()
+	config.read(os.path.normpath('./data/options.ini'))
+
+	if not config.has_section('Main'):
+		config['Main'] = {}
+
+	return config
+
+
+def createPipeline(encodeConfig, optionsConfig, outputDir):
+	if optionsConfig.get('Main', 'FarmListen', fallback=''):
+		return FarmPipeline(encodeConfig, optionsConfig, outputDir)
+
+	if optionsConfig.getint('Main', 'Workers', fallback=1) > 1:
+		return ProcessPoolPipeline(encodeConfig, optionsConfig, outputDir)
+
+	runner = optionsConfig.get('Main', 'Runner', fallback='qprocess')
+
+	if runner.lower() == 'asyncio':
+		return AsyncEncodePipeline(encodeConfig, optionsConfig, outputDir)
+
+	return EncodePipeline(encodeConfig, optionsConfig, outputDir)
+
+
+class PlanWorker(QThread):
+	"""
+	Runs planBatch, which reads every queued file's MediaInfo, off the GUI
+	thread.  Files already prefetched come from the cache.
+	"""
+
+	planned = pyqtSignal(object)
+	planFailed = pyqtSignal(str)
+
+	def __init__(self, encodeConfig, optionsConfig, jobs, parent=None):
+		super().__init__(parent)
+
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.jobs = jobs
+
+	def run(self):
+		try:
+			plan = planBatch(self.encodeConfig, self.optionsConfig, self.jobs)
+		except Exception as e:
+			# Anything escaping run() would end the thread without either
+			# signal and leave the pipeline planning forever
+			self.planFailed.emit(str(e) or e.__class__.__name__)
+			return None
+
+		self.planned.emit(plan)
+
+
+class EncodePipeline(QObject):
+	"""
+	Owns the jobs of one batch and their scheduler.  Front ends only add
+	files, call start/pause/resume/stop and observe the signals below; all
+	per-file state lives on the EncodeJob objects.
+	"""
+
+	jobStarted = pyqtSignal(object)
+	jobFinished = pyqtSignal(object)
+	logMessage = pyqtSignal(object, str)
+	progressUpdated = pyqtSignal(object, str)
+	statsUpdated = pyqtSignal(object, object)
+	allFinished = pyqtSignal()
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, parent=None):
+		super().__init__(parent)
+
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.outputDir = outputDir
+
+		self.pinning = createPinning(optionsConfig)
+		self.planWorker = None
+		self.planning = False
+
+		self.scheduler = EncodeScheduler(
+			optionsConfig.getint('Main', 'ConcurrentJobs', fallback=1))
+		# Pinned before the scheduler starts the job
+		self.scheduler.jobStarted.connect(self.pinJob)
+		self.scheduler.jobStarted.connect(self.jobStarted)
+		self.scheduler.jobFinished.connect(self.unpinJob)
+		self.scheduler.jobFinished.connect(self.jobFinished)
+		self.scheduler.allFinished.connect(self.allFinished)
+
+	def addFile(self, inputFile, displayName=None):
+		if displayName is None:
+			displayName = os.path.basename(inputFile)
+		displayName = uniqueDisplayName(displayName, self.scheduler.jobs)
+
+		job = EncodeJob(len(self.scheduler.jobs) + 1, inputFile, displayName,
+						self.outputDir, self.encodeConfig, self.optionsConfig)
+		job.logMessage.connect(self.logMessage)
+		job.progressUpdated.connect(self.progressUpdated)
+		job.statsUpdated.connect(self.statsUpdated)
+
+		self.scheduler.addJob(job)
+		return job
+
+	def pinJob(self, job):
+		pinJob(self.pinning, job)
+
+	def unpinJob(self, job):
+		if self.pinning is not None:
+			self.pinning.release(job.jobId)
+
+	def jobs(self):
+		return self.scheduler.jobs
+
+	def runningJobs(self):
+		return self.scheduler.runningJobs()
+
+	def finishedJobs(self):
+		return self.scheduler.finishedJobs()
+
+	def failedJobs(self):
+		return self.scheduler.failedJobs()
+
+	def maxConcurrent(self):
+		return self.scheduler.maxConcurrent
+
+	def isRunning(self):
+		return self.planning or self.scheduler.isRunning()
+
+	"""
+	Batch control
+	"""
+
+	def start(self):
+		# The jobs start once the plan is ready
+		self.planning = True
+		self.planWorker = PlanWorker(self.encodeConfig, self.optionsConfig,
+									 self.scheduler.jobs)
+		self.planWorker.planned.connect(self.startPlanned)
+		self.planWorker.planFailed.connect(self.planningFailed)
+		self.planWorker.start()
+
+	def startPlanned(self, plan):
+		self.planning = False
+
+		# Stopped while planning
+		if self.scheduler.halted:
+			return None
+
+		self.scheduler.maxConcurrent = max(1, plan.jobs)
+		self.logMessage.emit(None, plan.describe())
+
+		message = pinningMessage(self.optionsConfig, self.pinning)
+		if message is not None:
+			self.logMessage.emit(None, message)
+
+		# Paused while planning, resume starts the jobs
+		if self.scheduler.paused:
+			return None
+
+		self.scheduler.start()
+
+	def planningFailed(self, message):
+		self.planning = False
+
+		if self.scheduler.halted:
+			return None
+
+		# None of the jobs ran, the batch ends like one where all failed
+		self.logMessage.emit(None, 'Error - could not plan the batch: ' +
+							 message)
+		for job in self.scheduler.jobs:
+			job.state = JobState.Failed
+		self.scheduler.pendingJobs = []
+
+		self.allFinished.emit()
+
+	def pause(self):
+		self.scheduler.pause()
+
+	def resume(self):
+		if self.planning:
+			self.scheduler.paused = False
+			return None
+
+		self.scheduler.resume()
+
+	def stop(self):
+		self.scheduler.stop()
+
+
+class AsyncEncodePipeline(QObject):
+	"""
+	EncodePipeline with the same interface, running an AsyncEncodeBatch on
+	an asyncio loop in a background thread.  Signals emitted from that
+	thread are queued to the receivers' thread by Qt.
+	"""
+
+	jobStarted = pyqtSignal(object)
+	jobFinished = pyqtSignal(object)
+	logMessage = pyqtSignal(object, str)
+	progressUpdated = pyqtSignal(object, str)
+	statsUpdated = pyqtSignal(object, object)
+	allFinished = pyqtSignal()
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, parent=None):
+		super().__init__(parent)
+
+		self.batch = self.createBatch(encodeConfig, optionsConfig, outputDir)
+		self.loop = None
+		self.thread = None
+		self.stopped = False
+
+	def createBatch(self, encodeConfig, optionsConfig, outputDir):
+		return AsyncEncodeBatch(encodeConfig, optionsConfig, outputDir,
+								self.report)
+
+	def addFile(self, inputFile, displayName=None):
+		return self.batch.addFile(inputFile, displayName)
+
+	def report(self, job, event, text):
+		if event == 'log':
+			self.logMessage.emit(job, text)
+		elif event == 'progress':
+			self.progressUpdated.emit(job, text)
+		elif event == 'stats':
+			self.statsUpdated.emit(job, ProgressEvent.fromDict(text))
+		elif event == 'started':
+			self.jobStarted.emit(job)
+		elif event == 'finished':
+			self.jobFinished.emit(job)
+
+	def jobs(self):
+		return self.batch.jobs
+
+	def runningJobs(self):
+		return self.batch.runningJobs()
+
+	def finishedJobs(self):
+		return self.batch.finishedJobs()
+
+	def failedJobs(self):
+		return self.batch.failedJobs()
+
+	def maxConcurrent(self):
+		return self.batch.maxConcurrent
+
+	def isRunning(self):
+		return self.thread is not None and self.thread.is_alive()
+
+	def runLoop(self):
+		asyncio.set_event_loop(self.loop)
+
+		try:
+			self.loop.run_until_complete(self.batch.run())
+		finally:
+			self.loop.close()
+
+		# Matches EncodeScheduler, a stopped batch does not report completion
+		if not self.stopped:
+			self.allFinished.emit()
+
+	"""
+	Batch control
+	"""
+
+	def start(self):
+		self.loop = newEventLoop()
+		self.thread = threading.Thread(target=self.runLoop)
+		self.thread.daemon = True
+		self.thread.start()
+
+	def callInLoop(self, method):
+		if self.isRunning():
+			self.loop.call_soon_threadsafe(method)
+
+	def pause(self):
+		self.callInLoop(self.batch.pause)
+
+	def resume(self):
+		self.callInLoop(self.batch.resume)
+
+	def stop(self):
+		self.stopped = True
+		self.callInLoop(self.batch.stop)
+
+
+class FarmPipeline(AsyncEncodePipeline):
+	"""
+	Coordinates a batch over the encode farm instead of encoding locally,
+	listening on FarmListen for agents started with 'GXSx264Cli.py agent'.
+	"""
+
+	def createBatch(self, encodeConfig, optionsConfig, outputDir):
+		return Coordinator(encodeConfig, optionsConfig, outputDir,
+						   optionsConfig.get('Main', 'FarmListen'), self.report)
+
+
+class ProcessPoolPipeline(QObject):
+	"""
+	EncodePipeline with the same interface, spreading the batch over worker
+	processes.  The jobs it hands out are JobStatus mirrors that are updated
+	from the workers' events.
+	"""
+
+	jobStarted = pyqtSignal(object)
+	jobFinished = pyqtSignal(object)
+	logMessage = pyqtSignal(object, str)
+	progressUpdated = pyqtSignal(object, str)
+	statsUpdated = pyqtSignal(object, object)
+	allFinished = pyqtSignal()
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, parent=None):
+		super().__init__(parent)
+
+		self.pool = WorkerPool(encodeConfig, optionsConfig, outputDir,
+							   optionsConfig.getint('Main', 'Workers',
+													fallback=1),
+							   self.report)
+
+	def addFile(self, inputFile, displayName=None):
+		if displayName is None:
+			displayName = os.path.basename(inputFile)
+
+		return self.pool.addFile(inputFile, displayName)
+
+	def report(self, job, event, text):
+		if event == 'log':
+			self.logMessage.emit(job, text)
+		elif event == 'progress':
+			self.progressUpdated.emit(job, text)
+		elif event == 'stats':
+			self.statsUpdated.emit(job, ProgressEvent.fromDict(text))
+		elif event == 'started':
+			self.jobStarted.emit(job)
+		elif event == 'finished':
+			self.jobFinished.emit(job)
+		elif event == 'done' and not self.pool.stopped:
+			self.allFinished.emit()
+
+	def jobs(self):
+		return self.pool.jobs
+
+	def runningJobs(self):
+		return [job for job in self.pool.jobs if job.isRunning()]
+
+	def finishedJobs(self):
+		return [job for job in self.pool.jobs
+				if job.state == JobState.Finished]
+
+	def failedJobs(self):
+		return [job for job in self.pool.jobs if job.state == JobState.Failed]
+
+	def maxConcurrent(self):
+		return self.pool.optionsConfig.getint('Main', 'ConcurrentJobs',
+											  fallback=1)
+
+	def isRunning(self):
+		return self.pool.isRunning()
+
+	"""
+	Batch control
+	"""
+
+	def start(self):
+		self.pool.start()
+
+	def pause(self):
+		self.pool.pause()
+
+	def resume(self):
+		self.pool.resume()
+
+	def stop(self):
+		self.pool.stop()
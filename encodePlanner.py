@@ -0,0 +1,323 @@
+"""
+Decides how many files are encoded at once and how many threads each x264
+gets, from the machine's cores, NUMA nodes and free memory and the
+profile's settings.  Without it every x264 is started with --threads set to
+all cores, which oversubscribes the CPU as soon as two jobs run.
+"""
+
+import ctypes
+import glob
+import math
+import os
+import re
+import sys
+
+import psutil
+
+from mediaProbe import readMediaInfoFiles
+
+# x264 preset defaults: preset -> (ref, bframes, rc-lookahead)
+PRESET_DEFAULTS = {
+	'ultrafast': (1, 0, 0),
+	'superfast': (1, 3, 0),
+	'veryfast': (1, 3, 10),
+	'faster': (2, 3, 20),
+	'fast': (2, 3, 30),
+	'medium': (3, 3, 40),
+	'slow': (5, 3, 50),
+	'slower': (8, 3, 60),
+	'veryslow': (16, 8, 60),
+	'placebo': (16, 16, 60),
+}
+
+# Share of the free memory the planned jobs may use
+MEMORY_BUDGET = 0.8
+
+
+def parseNodeList(text):
+	# Linux cpulist format, e.g. "0-7,16-23"
+	cpus = []
+	for part in text.strip().split(','):
+		if '-' in part:
+			first, last = part.split('-')
+			cpus.extend(range(int(first), int(last) + 1))
+		elif part:
+			cpus.append(int(part))
+
+	return cpus
+
+
+def numaNodes():
+	"""
+	Returns the logical CPUs of every NUMA node, a single node with all
+	CPUs where the layout can't be read.
+	"""
+
+	nodes = []
+
+	if sys.platform == 'win32':
+		try:
+			kernel32 = ctypes.windll.kernel32
+			highestNode = ctypes.c_ulong()
+			if kernel32.GetNumaHighestNodeNumber(ctypes.byref(highestNode)):
+				for node in range(highestNode.value + 1):
+					# Only covers the first processor group (64 CPUs)
+					mask = ctypes.c_ulonglong()
+					if kernel32.GetNumaNodeProcessorMask(
+							ctypes.c_ubyte(node), ctypes.byref(mask)):
+						nodes.append([cpu for cpu in range(64)
+									  if mask.value >> cpu & 1])
+		except (AttributeError, OSError):
+			nodes = []
+	else:
+		for nodePath in sorted(glob.glob('/sys/devices/system/node/node*'),
+							   key=lambda path: int(re.sub(r'\D', '', path))):
+			try:
+				with open(os.path.join(nodePath, 'cpulist')) as f:
+					nodes.append(parseNodeList(f.read()))
+			except (OSError, ValueError):
+				nodes = []
+				break
+
+	nodes = [cpus for cpus in nodes if cpus]
+	if not nodes:
+		nodes = [list(range(psutil.cpu_count() or 1))]
+
+	return nodes
+
+
+def x264Settings(cmdOutput):
+	# Reads the settings that decide an x264 instance's memory use from
+	# CommandLineOutput, falling back to the preset's defaults
+	def option(name):
+		match = re.search(r'(?:^|\s)--' + name + r'\s+(\S+)', cmdOutput)
+		return match.group(1) if match else None
+
+	preset = option('preset') or 'medium'
+	refs, bframes, lookahead = PRESET_DEFAULTS.get(preset,
+												   PRESET_DEFAULTS['medium'])
+
+	try:
+		refs = int(option('ref') or refs)
+		bframes = int(option('bframes') or bframes)
+		lookahead = int(option('rc-lookahead') or lookahead)
+	except ValueError:
+		pass
+
+	return {'preset': preset, 'refs': refs, 'bframes': bframes,
+			'lookahead': lookahead, 'highBitDepth': '10bit' in cmdOutput}
+
+
+def jobMemory(settings, threads, width=1920, height=1080):
+	# Rough x264 footprint: every buffered frame plus the lowres planes and
+	# motion data that come with it
+	bytesPerSample = 2 if settings['highBitDepth'] else 1
+	frameBytes = width * height * 1.5 * bytesPerSample
+	frames = (settings['lookahead'] + settings['bframes'] +
+			  settings['refs'] + 2 * threads + 10)
+
+	return int(frameBytes * frames * 2.5) + 64 * 1024 * 1024
+
+
+def threadCeiling(height):
+	# Frame threads stop helping once each has only a couple of macroblock
+	# rows to itself
+	return max(4, (height + 15) // 16 // 2)
+
+
+class EncodePlan:
+	def __init__(self, jobs, threads, lookaheadThreads, nodes, memory,
+				 reason):
+		self.jobs = jobs
+		self.threads = threads
+		self.lookaheadThreads = lookaheadThreads
+		self.nodes = nodes
+		self.memory = memory
+		self.reason = reason
+
+	def describe(self):
+		return ('Plan: ' + str(self.jobs) + ' simultaneous encode(s), ' +
+				str(self.threads) + ' x264 thread(s) and ' +
+				str(self.lookaheadThreads) + ' lookahead thread(s) each, ~' +
+				str(self.memory // (1024 * 1024)) + ' MiB per encode  (' +
+				self.reason + ')')
+
+
+def planEncodes(encodeConfig, optionsConfig, fileCount, frameSizes=()):
+	"""
+	ConcurrentJobs 0 lets the planner choose the number of simultaneous
+	encodes, ThreadsPerJob > 0 overrides the planned thread count.
+	"""
+
+	cpus = psutil.cpu_count() or 1
+	nodes = numaNodes()
+	available = psutil.virtual_memory().available
+
+	settings = x264Settings(encodeConfig.get('Misc', 'CommandLineOutput'))
+	segments = max(1, optionsConfig.getint('Main', 'VideoSegments',
+										   fallback=1))
+
+	width, height = 1920, 1080
+	if frameSizes:
+		width, height = max(frameSizes, key=lambda size: size[0] * size[1])
+
+	# x264's own default is 1.5 threads per logical CPU
+	threadBudget = int(cpus * 1.5)
+	ceiling = threadCeiling(height)
+
+	jobs = optionsConfig.getint('Main', 'ConcurrentJobs', fallback=1)
+	if jobs > 0:
+		reason = str(jobs) + ' set in options'
+	else:
+		jobs = max(1, math.ceil(threadBudget / (ceiling * segments)))
+		reason = (str(cpus) + ' CPUs, ' + str(len(nodes)) + ' NUMA node(s), ' +
+				  str(width) + 'x' + str(height) + ' ' + settings['preset'])
+
+		# Whole jobs per node, so each one can stay on its own node
+		if len(nodes) > 1 and jobs > 1:
+			jobs = math.ceil(jobs / len(nodes)) * len(nodes)
+
+		if fileCount:
+			jobs = min(jobs, fileCount)
+
+	fixedThreads = optionsConfig.getint('Main', 'ThreadsPerJob', fallback=0)
+
+	def plannedThreads(jobs):
+		if fixedThreads > 0:
+			return fixedThreads
+
+		threads = max(1, threadBudget // (jobs * segments))
+
+		# A job kept on one node only has that node's CPUs
+		if len(nodes) > 1 and jobs >= len(nodes):
+			nodeCpus = min(len(node) for node in nodes)
+			threads = min(threads, max(1, int(nodeCpus * 1.5)))
+
+		return min(threads, ceiling)
+
+	threads = plannedThreads(jobs)
+
+	# Per segment, as that is what each x264 process gets
+	memory = jobMemory(settings, threads, width, height) * segments
+	if optionsConfig.getint('Main', 'ConcurrentJobs', fallback=1) <= 0:
+		memoryJobs = max(1, int(available * MEMORY_BUDGET // memory))
+		if memoryJobs < jobs:
+			jobs = memoryJobs
+			threads = plannedThreads(jobs)
+			memory = jobMemory(settings, threads, width, height) * segments
+			reason += (', limited by ' + str(available // (1024 * 1024)) +
+					   ' MiB free memory')
+
+	# x264 uses threads / 6 lookahead threads by default
+	lookaheadThreads = optionsConfig.getint('Main', 'LookaheadThreads',
+											fallback=0)
+	if lookaheadThreads <= 0:
+		lookaheadThreads = max(1, threads // 6)
+
+	return EncodePlan(jobs, threads, lookaheadThreads, nodes, memory, reason)
+
+
+def planBatch(encodeConfig, optionsConfig, jobs):
+	# Plans for the files of a batch and hands each job its thread counts
+	media = readMediaInfoFiles([job.inputFile for job in jobs
+								if os.path.isfile(job.inputFile)])
+	frameSizes = [size for size in (info.frameSize()
+									for info in media.values()) if size]
+	plan = planEncodes(encodeConfig, optionsConfig, len(jobs), frameSizes)
+
+	for job in jobs:
+		job.threads = plan.threads
+		job.lookaheadThreads = plan.lookaheadThreads
+
+	return plan
+
+
+def formatCpus(cpus):
+	# [0, 1, 2, 3, 8] -> "0-3,8"
+	ranges = []
+	for cpu in sorted(cpus):
+		if ranges and cpu == ranges[-1][1] + 1:
+			ranges[-1][1] = cpu
+		else:
+			ranges.append([cpu, cpu])
+
+	return ','.join(str(first) if first == last else
+					str(first) + '-' + str(last) for first, last in ranges)
+
+
+def setAffinity(pid, cpus):
+	# cpu_affinity is missing on macOS, and the tool may already be gone
+	try:
+		psutil.Process(pid).cpu_affinity(cpus)
+	except (AttributeError, ValueError, psutil.Error):
+		pass
+
+
+class NodePinning:
+	"""
+	Hands every starting job the NUMA node with the fewest jobs on it, so
+	an encoder's threads and memory stay on one node.
+	"""
+
+	def __init__(self, nodes, nodeNumbers):
+		self.nodes = nodes
+		self.nodeNumbers = nodeNumbers
+		self.jobsOnNode = dict((number, 0) for number in nodeNumbers)
+		self.assigned = {}
+
+	def describe(self):
+		return ('CPU pinning: ' + ',  '.join(
+			'node ' + str(number) + ' = CPUs ' +
+			formatCpus(self.nodes[number]) for number in self.nodeNumbers))
+
+	def acquire(self, jobId):
+		number = min(self.nodeNumbers,
+					 key=lambda number: self.jobsOnNode[number])
+		self.jobsOnNode[number] += 1
+		self.assigned[jobId] = number
+
+		return number, self.nodes[number]
+
+	def release(self, jobId):
+		number = self.assigned.pop(jobId, None)
+		if number is not None:
+			self.jobsOnNode[number] -= 1
+
+
+def createPinning(optionsConfig):
+	# None unless PinToNodes is set and there is more than one node.
+	# PinNodes limits the pinning to some nodes, e.g. one worker's share.
+	if not optionsConfig.getboolean('Main', 'PinToNodes', fallback=False):
+		return None
+
+	nodes = numaNodes()
+	nodeNumbers = list(range(len(nodes)))
+
+	pinNodes = optionsConfig.get('Main', 'PinNodes', fallback='')
+	if pinNodes:
+		nodeNumbers = [number for number in parseNodeList(pinNodes)
+					   if number < len(nodes)] or nodeNumbers
+
+	if len(nodes) < 2:
+		return None
+
+	return NodePinning(nodes, nodeNumbers)
+
+
+def pinningMessage(optionsConfig, pinning):
+	if pinning is not None:
+		return pinning.describe()
+	elif optionsConfig.getboolean('Main', 'PinToNodes', fallback=False):
+		return 'CPU pinning: only one NUMA node found, not pinning'
+
+	return None
+
+
+def pinJob(pinning, job):
+	if pinning is None:
+		return None
+
+	number, cpus = pinning.acquire(job.jobId)
+	job.cpus = cpus
+	job.log('Pinned to NUMA node ' + str(number) + '  (CPUs ' +
+			formatCpus(cpus) + ')')
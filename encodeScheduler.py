@@ -0,0 +1,91 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from jobState import JobState
+
+
+class EncodeScheduler(QObject):
+	jobStarted = pyqtSignal(object)
+	jobFinished = pyqtSignal(object)
+	allFinished = pyqtSignal()
+
+	def __init__(self, maxConcurrent=1, parent=None):
+		super().__init__(parent)
+
+		self.maxConcurrent = max(1, maxConcurrent)
+		self.jobs = []
+		self.pendingJobs = []
+		self.paused = False
+		self.halted = False
+		self.completed = False
+
+	def addJob(self, job):
+		job.jobFinished.connect(self.jobDone)
+
+		self.jobs.append(job)
+		self.pendingJobs.append(job)
+
+	def setMaxConcurrent(self, maxConcurrent):
+		self.maxConcurrent = max(1, maxConcurrent)
+		self.startNextJobs()
+
+	def start(self):
+		self.paused = False
+		self.halted = False
+		self.completed = False
+		self.startNextJobs()
+
+	def startNextJobs(self):
+		if self.paused or self.halted:
+			return None
+
+		while (self.pendingJobs and
+			   len(self.runningJobs()) < self.maxConcurrent):
+			job = self.pendingJobs.pop(0)
+			self.jobStarted.emit(job)
+			job.start()
+
+		if (not self.pendingJobs and not self.runningJobs() and
+				not self.completed):
+			self.completed = True
+			self.allFinished.emit()
+
+	def jobDone(self, job):
+		self.jobFinished.emit(job)
+
+		if not self.halted:
+			self.startNextJobs()
+
+	def runningJobs(self):
+		return [job for job in self.jobs if job.isRunning()]
+
+	def finishedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Finished]
+
+	def failedJobs(self):
+		return [job for job in self.jobs if job.state == JobState.Failed]
+
+	def isRunning(self):
+		return bool(self.runningJobs())
+
+	"""
+	Job control
+	"""
+
+	def pause(self):
+		self.paused = True
+		for job in self.runningJobs():
+			job.pause()
+
+	def resume(self):
+		for job in self.runningJobs():
+			job.resume()
+
+		self.paused = False
+		self.startNextJobs()
+
+	def stop(self):
+		self.halted = True
+		self.pendingJobs = []
+
+		for job in self.runningJobs():
+			job.stop()
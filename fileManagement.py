@@ -1,13 +1,13 @@
-import ctypes
+import configparser
+import os
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QFileDialog, QPushButton, QListWidgetItem, QAbstractItemView, QTextBrowser)
 
+from mediaPrefetch import PREFETCH_THREADS, MediaPrefetcher
+from mediaProbe import readInform
 from myListWidget import MyListWidget
 
-ctypes.WinDLL('./tools/MediaInfo.dll')
-from MediaInfoDLL3 import *
-
 
 class FileManagement:
 	def setFileAdd(self):
@@ -22,7 +22,18 @@ class FileManagement:
 		self.fileList.setSelectionRectVisible(False)
 
 		self.fileList.model().rowsInserted.connect(self.itemsAdded)
+		self.fileList.model().rowsInserted.connect(self.prefetchMediaInfo)
 		self.fileList.clicked.connect(self.displayMediaInfo)
+		self.fileList.folderDropped.connect(self.addFolder)
+
+		config = configparser.ConfigParser()
+		config.read(os.path.normpath('./data/options.ini'))
+
+		self.prefetcher = MediaPrefetcher(config.getint(
+			'Main', 'PrefetchThreads', fallback=PREFETCH_THREADS))
+		self.prefetcher.probed.connect(self.mediaInfoProbed)
+		self.prefetcher.folderProbed.connect(self.folderProbed)
+		self.mediaInfoWaiting = None
 
 		self.addFileButton = QPushButton('Add', self)
 		self.addFileButton.clicked.connect(self.addFileDialog)
@@ -48,6 +59,34 @@ class FileManagement:
 			self.removeFileButton.setEnabled(True)
 			self.removeAllButton.setEnabled(True)
 
+	def addFolder(self, folder):
+		self.showMediaInfo()
+		self.mediaInfoWaiting = None
+		self.mediaInfoText.setPlainText('Reading folder ' + folder + '...')
+		self.prefetcher.prefetchFolder(folder)
+
+	def folderProbed(self, folder, videoFiles, skipped, failed):
+		for item in videoFiles:
+			itemToAdd = QListWidgetItem()
+			itemToAdd.setText(os.path.basename(item))
+			itemToAdd.setData(1001, item)
+			self.fileList.addItem(itemToAdd)
+
+		# Shown where the MediaInfo of a selected file would be
+		self.mediaInfoWaiting = None
+		self.mediaInfoText.setPlainText(
+			'Added ' + str(len(videoFiles)) + ' video file(s) from ' + folder)
+
+		if skipped:
+			self.mediaInfoText.append(
+				'Skipped ' + str(len(skipped)) + ' file(s) without video')
+
+		if failed:
+			self.mediaInfoText.append(
+				'Could not read ' + str(len(failed)) + ' file(s):')
+			for path in failed:
+				self.mediaInfoText.append(path)
+
 	def setFileRemove(self):
 		self.removeFileButton = QPushButton('Remove', self)
 		self.removeFileButton.clicked.connect(self.removeFiles)
@@ -62,6 +101,12 @@ class FileManagement:
 			self.removeFileButton.setEnabled(True)
 			self.removeAllButton.setEnabled(True)
 
+	def prefetchMediaInfo(self, parent, first, last):
+		inputFiles = [self.fileList.item(row).data(1001)
+					  for row in range(first, last + 1)]
+		self.prefetcher.prefetch([inputFile for inputFile in inputFiles
+								  if inputFile])
+
 	def removeFiles(self):
 		for item in self.fileList.selectedItems():
 			self.fileList.takeItem(self.fileList.row(item))
@@ -91,8 +136,20 @@ class FileManagement:
 		print(self.fileList.currentItem().text())
 		print(self.fileList.currentItem().data(1001))
 
-		MI = MediaInfo()
-		MI.Open(self.fileList.currentItem().data(1001))
+		inputFile = self.fileList.currentItem().data(1001)
+
+		# Shown once the background parse is done instead of parsing twice
+		if self.prefetcher.isPending(inputFile):
+			self.mediaInfoWaiting = inputFile
+			self.mediaInfoText.setPlainText(
+				'Reading MediaInfo of ' + self.fileList.currentItem().text() +
+				'...')
+			return None
+
+		self.mediaInfoWaiting = None
+		self.mediaInfoText.setPlainText(readInform(inputFile))
 
-		self.mediaInfoText.setPlainText(MI.Inform())
-		MI.Close()
+	def mediaInfoProbed(self, inputFile):
+		if inputFile == self.mediaInfoWaiting:
+			self.mediaInfoWaiting = None
+			self.mediaInfoText.setPlainText(readInform(inputFile))
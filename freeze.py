@@ -10,4 +10,5 @@ setup(
 	name="GXS x264 Frontend",
 	version="0.42",
 	description="x264, ffmpeg, neroAacEnc, mkvmerge frontend",
-	executables=[Executable("GXSx264Frontend.py", base=base)])
+	executables=[Executable("GXSx264Frontend.py", base=base),
+				 Executable("GXSx264Cli.py", base=None)])
@@ -0,0 +1,12 @@
+class JobState:
+	Waiting, Running, Paused, Finished, Failed, Stopped = list(range(6))
+
+
+STATE_NAMES = {
+	JobState.Waiting: 'waiting',
+	JobState.Running: 'running',
+	JobState.Paused: 'paused',
+	JobState.Finished: 'finished',
+	JobState.Failed: 'failed',
+	JobState.Stopped: 'stopped',
+}
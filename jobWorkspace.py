@@ -0,0 +1,45 @@
+import hashlib
+import os
+import re
+import shutil
+
+
+class JobWorkspace:
+	def __init__(self, inputFile, root='./temp'):
+		inputFile = os.path.abspath(inputFile)
+		name = os.path.splitext(os.path.basename(inputFile))[0]
+		name = re.sub(r'[^\w\-. ]', '_', name)[:40].strip()
+
+		# Keyed on the source path so a retried file finds its old workspace
+		key = hashlib.md5(inputFile.encode('utf-8')).hexdigest()[:8]
+
+		self.directory = os.path.normpath(root + '/' + name + '-' + key)
+		self.reused = False
+
+	def create(self):
+		if os.path.isdir(self.directory):
+			self.reused = True
+		else:
+			os.makedirs(self.directory)
+
+		return self.directory
+
+	def path(self, name):
+		return os.path.normpath(self.directory + '/' + name)
+
+	def exists(self):
+		return os.path.isdir(self.directory)
+
+	"""
+	Stage markers written once a stage's output is complete, so a retry
+	can skip work that already finished
+	"""
+
+	def markDone(self, stage):
+		open(self.path(stage + '.done'), 'w').close()
+
+	def isDone(self, stage):
+		return os.path.isfile(self.path(stage + '.done'))
+
+	def cleanup(self):
+		shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,129 @@
+import logging
+import logging.handlers
+import os
+import time
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+
+# Entries kept in memory by default, older ones are only in the log file
+LOG_LINES = 10000
+
+LOG_DIRECTORY = './data/logs'
+LOG_FILE_BYTES = 5 * 1024 * 1024
+LOG_FILE_COUNT = 5
+
+
+def openLogFile():
+	"""
+	Returns the logger behind the on-disk encode log, rotated at
+	LOG_FILE_BYTES with LOG_FILE_COUNT old files kept.
+	"""
+
+	logger = logging.getLogger('gxsx264.encode')
+	if logger.handlers:
+		return logger
+
+	if not os.path.isdir(os.path.normpath(LOG_DIRECTORY)):
+		os.makedirs(os.path.normpath(LOG_DIRECTORY))
+
+	handler = logging.handlers.RotatingFileHandler(
+		os.path.normpath(LOG_DIRECTORY + '/encode.log'),
+		maxBytes=LOG_FILE_BYTES, backupCount=LOG_FILE_COUNT, encoding='utf-8')
+	handler.setFormatter(logging.Formatter('[%(asctime)s]  %(message)s'))
+
+	logger.addHandler(handler)
+	logger.setLevel(logging.INFO)
+	logger.propagate = False
+
+	return logger
+
+
+class LogEntry:
+	__slots__ = ('time', 'jobId', 'text')
+
+	def __init__(self, time, jobId, text):
+		self.time = time
+		self.jobId = jobId
+		self.text = text
+
+
+class LogModel(QAbstractListModel):
+	"""
+	The output log as a ring buffer of LogEntries.  Appending is constant
+	time, the oldest entry is dropped once capacity is reached, and the
+	timestamp is only formatted for rows a view actually shows.  Every entry
+	is also written to the log file.
+	"""
+
+	def __init__(self, capacity=LOG_LINES, logFile=None, parent=None):
+		super().__init__(parent)
+
+		self.capacity = max(1, capacity)
+		self.logFile = logFile
+
+		self.entries = []
+		self.first = 0
+		self.count = 0
+
+	def append(self, jobId, text):
+		entry = LogEntry(time.time(), jobId, text)
+
+		if self.logFile is not None:
+			self.logFile.info(text)
+
+		if self.count == self.capacity:
+			self.beginRemoveRows(QModelIndex(), 0, 0)
+			self.first = (self.first + 1) % self.capacity
+			self.count -= 1
+			self.endRemoveRows()
+
+		self.beginInsertRows(QModelIndex(), self.count, self.count)
+		index = (self.first + self.count) % self.capacity
+		if index == len(self.entries):
+			self.entries.append(entry)
+		else:
+			self.entries[index] = entry
+		self.count += 1
+		self.endInsertRows()
+
+	def entry(self, row):
+		return self.entries[(self.first + row) % self.capacity]
+
+	def rowCount(self, parent=QModelIndex()):
+		if parent.isValid():
+			return 0
+
+		return self.count
+
+	def data(self, index, role=Qt.DisplayRole):
+		if not index.isValid() or index.row() >= self.count:
+			return None
+
+		if role == Qt.DisplayRole:
+			entry = self.entry(index.row())
+			return ('[' + time.strftime('%Y-%m-%d %H:%M:%S',
+										time.localtime(entry.time)) +
+					']  ' + entry.text)
+
+		return None
+
+
+class JobLogFilter(QSortFilterProxyModel):
+	"""
+	Shows only one job's entries of a LogModel, jobId None shows all.
+	"""
+
+	def __init__(self, parent=None):
+		super().__init__(parent)
+
+		self.jobId = None
+
+	def setJobId(self, jobId):
+		self.jobId = jobId
+		self.invalidateFilter()
+
+	def filterAcceptsRow(self, sourceRow, sourceParent):
+		if self.jobId is None:
+			return True
+
+		return self.sourceModel().entry(sourceRow).jobId == self.jobId
@@ -0,0 +1,98 @@
+"""
+On-disk cache of parsed MediaInfo results, so a source is only opened by
+MediaInfo once however often the file list and the pipeline look at it.
+Entries are keyed by path and only used while the file's size and
+modification time still match, the least recently used ones are evicted.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_FILE = './data/mediainfo.sqlite'
+CACHE_ENTRIES = 2000
+
+
+def fileKey(fileName):
+	# (path, size, mtime), or None for a file that can't be read
+	path = os.path.normcase(os.path.abspath(fileName))
+	try:
+		stat = os.stat(path)
+	except OSError:
+		return None
+
+	return path, stat.st_size, stat.st_mtime
+
+
+class MediaInfoCache:
+	def __init__(self, fileName=CACHE_FILE, capacity=CACHE_ENTRIES):
+		self.capacity = max(1, capacity)
+		self.lock = threading.Lock()
+
+		directory = os.path.dirname(os.path.normpath(fileName))
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+
+		# Shared by the GUI thread, executor threads and worker processes
+		self.connection = sqlite3.connect(os.path.normpath(fileName),
+										  timeout=10, check_same_thread=False)
+		with self.connection:
+			self.connection.execute(
+				'CREATE TABLE IF NOT EXISTS media (path TEXT PRIMARY KEY, '
+				'size INTEGER, mtime REAL, lastUsed REAL, info TEXT)')
+			self.connection.execute(
+				'CREATE INDEX IF NOT EXISTS media_lastUsed ON media (lastUsed)')
+
+	def get(self, fileName):
+		key = fileKey(fileName)
+		if key is None:
+			return None
+
+		path, size, mtime = key
+
+		with self.lock, self.connection:
+			row = self.connection.execute(
+				'SELECT size, mtime, info FROM media WHERE path = ?',
+				(path,)).fetchone()
+			if row is None:
+				return None
+
+			# A changed file invalidates its entry
+			if row[0] != size or row[1] != mtime:
+				self.connection.execute('DELETE FROM media WHERE path = ?',
+										(path,))
+				return None
+
+			self.connection.execute(
+				'UPDATE media SET lastUsed = ? WHERE path = ?',
+				(time.time(), path))
+
+		return json.loads(row[2])
+
+	def put(self, fileName, info):
+		key = fileKey(fileName)
+		if key is None:
+			return None
+
+		path, size, mtime = key
+
+		with self.lock, self.connection:
+			self.connection.execute(
+				'INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?)',
+				(path, size, mtime, time.time(), json.dumps(info)))
+			self.connection.execute(
+				'DELETE FROM media WHERE path NOT IN (SELECT path FROM media '
+				'ORDER BY lastUsed DESC LIMIT ?)', (self.capacity,))
+
+	def invalidate(self, fileName):
+		path = os.path.normcase(os.path.abspath(fileName))
+
+		with self.lock, self.connection:
+			self.connection.execute('DELETE FROM media WHERE path = ?',
+									(path,))
+
+	def clear(self):
+		with self.lock, self.connection:
+			self.connection.execute('DELETE FROM media')
@@ -0,0 +1,224 @@
+"""
+Compact MediaInfo metadata: one object per stream with only the fields the
+pipeline uses, built once per file and stored as JSON in the MediaInfo
+cache.
+"""
+
+import json
+
+# Bumped whenever the stored fields change, older cache entries are re-read
+MODEL_VERSION = 1
+
+
+def toInt(value):
+	try:
+		return int(float(value))
+	except (TypeError, ValueError):
+		return None
+
+
+def toFloat(value):
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return None
+
+
+def toSeconds(milliseconds):
+	value = toFloat(milliseconds)
+	return None if value is None else value / 1000
+
+
+def toFlag(value):
+	return value == 'Yes'
+
+
+def toText(value):
+	return value or None
+
+
+# MediaInfo's JSON output names a few fields differently from Get()
+JSON_NAMES = {'Channel(s)': 'Channels'}
+
+
+def jsonGetter(track):
+	def get(parameter):
+		value = track.get(JSON_NAMES.get(parameter, parameter), '')
+
+		# and gives durations in seconds instead of milliseconds
+		if parameter == 'Duration' and toFloat(value) is not None:
+			return str(toFloat(value) * 1000)
+
+		return value
+
+	return get
+
+
+class StreamInfo:
+	"""
+	Base of the stream classes.  FIELDS lists (attribute, MediaInfo
+	parameter, converter) and decides what is read and stored.
+	"""
+
+	__slots__ = ()
+	FIELDS = ()
+
+	def __init__(self, **values):
+		for name, parameter, convert in self.FIELDS:
+			setattr(self, name, values.get(name))
+
+	@classmethod
+	def fromMediaInfo(cls, get):
+		# get(parameter) -> the parameter's text for this stream
+		return cls(**dict((name, convert(get(parameter)))
+						  for name, parameter, convert in cls.FIELDS))
+
+	def toDict(self):
+		return dict((name, getattr(self, name))
+					for name, parameter, convert in self.FIELDS)
+
+	@classmethod
+	def fromDict(cls, values):
+		return cls(**values)
+
+
+class VideoStream(StreamInfo):
+	FIELDS = (
+		('codec', 'Format', toText),
+		('duration', 'Duration', toSeconds),
+		('frameCount', 'FrameCount', toInt),
+		('frameRate', 'FrameRate', toFloat),
+		('width', 'Width', toInt),
+		('height', 'Height', toInt),
+		('language', 'Language', toText),
+		('title', 'Title', toText),
+		('default', 'Default', toFlag),
+		('forced', 'Forced', toFlag),
+	)
+	__slots__ = tuple(name for name, parameter, convert in FIELDS)
+
+
+class AudioStream(StreamInfo):
+	FIELDS = (
+		('codec', 'Format', toText),
+		('duration', 'Duration', toSeconds),
+		('channels', 'Channel(s)', toInt),
+		('sampleRate', 'SamplingRate', toInt),
+		('language', 'Language', toText),
+		('title', 'Title', toText),
+		('default', 'Default', toFlag),
+		('forced', 'Forced', toFlag),
+	)
+	__slots__ = tuple(name for name, parameter, convert in FIELDS)
+
+
+class TextStream(StreamInfo):
+	FIELDS = (
+		('codec', 'Format', toText),
+		('language', 'Language', toText),
+		('title', 'Title', toText),
+		('default', 'Default', toFlag),
+		('forced', 'Forced', toFlag),
+	)
+	__slots__ = tuple(name for name, parameter, convert in FIELDS)
+
+
+class MediaFile:
+	"""
+	A file's streams plus MediaInfo's text report for display.
+	"""
+
+	__slots__ = ('duration', 'video', 'audio', 'text', 'inform')
+
+	def __init__(self, duration=None, video=(), audio=(), text=(), inform=''):
+		self.duration = duration
+		self.video = list(video)
+		self.audio = list(audio)
+		self.text = list(text)
+		self.inform = inform
+
+	def videoStream(self):
+		return self.video[0] if self.video else None
+
+	def frameCount(self):
+		video = self.videoStream()
+		return video.frameCount or 0 if video is not None else 0
+
+	def frameRate(self):
+		video = self.videoStream()
+		return video.frameRate or 0.0 if video is not None else 0.0
+
+	def frameSize(self):
+		video = self.videoStream()
+		if video is None or not (video.width and video.height):
+			return None
+
+		return video.width, video.height
+
+	def durationSeconds(self):
+		# The container's duration, or the video's frames
+		if self.duration:
+			return self.duration
+		elif self.frameCount() and self.frameRate():
+			return self.frameCount() / self.frameRate()
+
+		return None
+
+	def videoLanguage(self):
+		video = self.videoStream()
+		return video.language or '' if video is not None else ''
+
+	def audioLanguages(self, count):
+		# Audio streams in file order, which is also mkvmerge's track order
+		return [self.audio[i].language or '' if i < len(self.audio) else ''
+				for i in range(count)]
+
+	def toDict(self):
+		return {
+			'version': MODEL_VERSION,
+			'duration': self.duration,
+			'video': [stream.toDict() for stream in self.video],
+			'audio': [stream.toDict() for stream in self.audio],
+			'text': [stream.toDict() for stream in self.text],
+			'inform': self.inform,
+		}
+
+	@classmethod
+	def fromDict(cls, values):
+		# None for data stored by another version of the model
+		if values.get('version') != MODEL_VERSION:
+			return None
+
+		return cls(values['duration'],
+				   [VideoStream.fromDict(stream) for stream in values['video']],
+				   [AudioStream.fromDict(stream) for stream in values['audio']],
+				   [TextStream.fromDict(stream) for stream in values['text']],
+				   values['inform'])
+
+
+def mediaFromJson(report, inform=''):
+	"""
+	Builds a MediaFile from MediaInfo's JSON output of one file, None if
+	the report isn't JSON (MediaInfo before 18.03 only has text).
+	"""
+
+	try:
+		tracks = json.loads(report)['media']['track']
+	except (ValueError, KeyError, TypeError):
+		return None
+
+	streamClasses = {'Video': VideoStream, 'Audio': AudioStream,
+					 'Text': TextStream}
+	streams = dict((kind, []) for kind in streamClasses)
+	duration = None
+
+	for track in tracks:
+		kind = track.get('@type')
+		if kind == 'General':
+			duration = toSeconds(jsonGetter(track)('Duration'))
+		elif kind in streamClasses:
+			streams[kind].append(
+				streamClasses[kind].fromMediaInfo(jsonGetter(track)))
+
+	return MediaFile(duration, streams['Video'], streams['Audio'],
+					 streams['Text'], inform)
@@ -0,0 +1,137 @@
+import os
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from mediaProbe import readMediaInfoFiles, readMediaInfoList
+
+# Files parsed at once by default
+PREFETCH_THREADS = 4
+
+
+class ProbeSignals(QObject):
+	# QRunnable isn't a QObject, its results are queued to the GUI thread
+	# through this
+	probed = pyqtSignal(str)
+	folderProbed = pyqtSignal(str, object, object, object)
+
+
+def listFolder(folder):
+	return [os.path.join(directory, name)
+			for directory, subdirectories, names in os.walk(folder)
+			for name in names]
+
+
+class ProbeTask(QRunnable):
+	def __init__(self, inputFiles, signals):
+		super().__init__()
+
+		self.inputFiles = inputFiles
+		self.signals = signals
+
+	def run(self):
+		# One MediaInfo instance for the task's files, each is reported as
+		# soon as it's read
+		reported = set()
+
+		def probed(inputFile):
+			reported.add(inputFile)
+			self.signals.probed.emit(inputFile)
+
+		try:
+			readMediaInfoFiles(self.inputFiles, probed)
+		finally:
+			for inputFile in self.inputFiles:
+				if inputFile not in reported:
+					self.signals.probed.emit(inputFile)
+
+
+class FolderProbeTask(QRunnable):
+	def __init__(self, folder, signals):
+		super().__init__()
+
+		self.folder = folder
+		self.signals = signals
+
+	def run(self):
+		# The folder's files in one MediaInfoList pass, split into video
+		# files, other files and files MediaInfo couldn't read
+		videoFiles, skipped, failed = [], [], []
+		try:
+			media = readMediaInfoList([self.folder])
+			read = set(os.path.normcase(os.path.abspath(inputFile))
+					   for inputFile in media)
+
+			videoFiles = sorted(inputFile for inputFile in media
+								if media[inputFile].video)
+			skipped = sorted(inputFile for inputFile in media
+							 if not media[inputFile].video)
+			failed = sorted(
+				path for path in listFolder(self.folder)
+				if os.path.normcase(os.path.abspath(path)) not in read)
+		finally:
+			self.signals.folderProbed.emit(self.folder, videoFiles, skipped,
+										   failed)
+
+
+class MediaPrefetcher(QObject):
+	"""
+	Parses files with MediaInfo on a bounded thread pool as they are added,
+	filling the MediaInfo cache before anything asks for them.  probed is
+	emitted on the GUI thread once a file's result is in the cache, and
+	folderProbed once a dropped folder has been read in one pass.
+	"""
+
+	probed = pyqtSignal(str)
+	folderProbed = pyqtSignal(str, object, object, object)
+
+	def __init__(self, threads=PREFETCH_THREADS, parent=None):
+		super().__init__(parent)
+
+		self.pool = QThreadPool(self)
+		self.pool.setMaxThreadCount(max(1, threads))
+
+		self.pending = set()
+		self.done = set()
+
+		self.signals = ProbeSignals()
+		self.signals.probed.connect(self.finishedProbe)
+		self.signals.folderProbed.connect(self.finishedFolderProbe)
+
+	def prefetch(self, inputFiles):
+		# Files moved within the list are inserted again, only new ones are
+		# queued
+		newFiles = []
+		for inputFile in inputFiles:
+			if inputFile not in self.pending and inputFile not in self.done:
+				self.pending.add(inputFile)
+				newFiles.append(inputFile)
+
+		# Split over the threads, each task reusing its MediaInfo instance
+		tasks = min(len(newFiles), self.pool.maxThreadCount())
+		for i in range(tasks):
+			self.pool.start(ProbeTask(newFiles[i::tasks], self.signals))
+
+	def prefetchFolder(self, folder):
+		# folderProbed(folder, videoFiles, skipped, failed) is emitted once
+		# it's parsed
+		self.pool.start(FolderProbeTask(folder, self.signals))
+
+	def isPending(self, inputFile):
+		return inputFile in self.pending
+
+	def finishedProbe(self, inputFile):
+		self.pending.discard(inputFile)
+		self.done.add(inputFile)
+
+		self.probed.emit(inputFile)
+
+	def finishedFolderProbe(self, folder, videoFiles, skipped, failed):
+		# Already in the cache, adding them to the list doesn't parse again
+		self.done.update(videoFiles)
+
+		self.folderProbed.emit(folder, videoFiles, skipped, failed)
+
+	def stop(self):
+		# Drops the queued files, running parses are waited for on exit
+		self.pool.clear()
+		self.pending = set()
@@ -0,0 +1,245 @@
+import ctypes
+import os
+import sqlite3
+import threading
+
+from mediaCache import MediaInfoCache
+from mediaInfoModel import (AudioStream, MediaFile, TextStream, VideoStream,
+							mediaFromJson, toSeconds)
+
+# MediaInfo's ParseSpeed: headers only, then its default depth for the files
+# whose headers are missing the totals
+FAST_PARSE_SPEED = '0'
+DEEP_PARSE_SPEED = '0.5'
+
+sharedCache = None
+sharedCacheLock = threading.Lock()
+
+mediaInfoLibrary = None
+mediaInfoLibraryLock = threading.Lock()
+
+
+def loadMediaInfo():
+	"""
+	Loads the MediaInfo library on first use rather than on import, so the
+	CLI, worker processes and farm agents import on machines without it.
+	Returns the MediaInfoDLL3 module, None if the library can't be loaded.
+	"""
+
+	global mediaInfoLibrary
+
+	with mediaInfoLibraryLock:
+		if mediaInfoLibrary is None:
+			try:
+				# The bundled DLL, MediaInfoDLL3's windll.MediaInfo then
+				# finds it loaded.  Elsewhere it loads libmediainfo itself
+				if os.name == 'nt':
+					ctypes.WinDLL(os.path.normpath('./tools/MediaInfo.dll'))
+
+				import MediaInfoDLL3
+				mediaInfoLibrary = MediaInfoDLL3
+			except OSError:
+				mediaInfoLibrary = False
+
+	return mediaInfoLibrary or None
+
+
+def mediaCache():
+	# One cache per process, None if the cache file can't be opened
+	global sharedCache
+
+	with sharedCacheLock:
+		if sharedCache is None:
+			try:
+				sharedCache = MediaInfoCache()
+			except (OSError, sqlite3.Error):
+				sharedCache = False
+
+	return sharedCache or None
+
+
+def readStreams(get, count, streamKind, streamClass):
+	return [streamClass.fromMediaInfo(
+		lambda parameter, i=i: get(streamKind, i, parameter))
+		for i in range(count(streamKind))]
+
+
+def buildMediaFile(option, inform, get, count):
+	"""
+	Builds a MediaFile from an opened file, through MediaInfo's or a
+	MediaInfoList's methods for that file.  One JSON report is read
+	instead of a Get() per field, DLLs without JSON output are read field
+	by field.
+	"""
+
+	Stream = loadMediaInfo().Stream
+
+	option('Output', 'JSON')
+	report = inform()
+	option('Output', '')
+	text = inform()
+
+	media = mediaFromJson(report, text)
+	if media is None:
+		media = MediaFile(toSeconds(get(Stream.General, 0, 'Duration')),
+						  readStreams(get, count, Stream.Video, VideoStream),
+						  readStreams(get, count, Stream.Audio, AudioStream),
+						  readStreams(get, count, Stream.Text, TextStream),
+						  text)
+
+	return media
+
+
+def needsDeepParse(media):
+	# The progress and the segment plan need the frame totals and duration
+	video = media.videoStream()
+	if video is not None and not (video.frameCount and video.frameRate):
+		return True
+
+	return not media.durationSeconds()
+
+
+def parseMediaInfo(inputFile, MI=None,
+				   parseSpeeds=(FAST_PARSE_SPEED, DEEP_PARSE_SPEED)):
+	"""
+	Parses a file's headers and only parses deeper when they lack the
+	totals, None if MediaInfo can't open the file or isn't available.
+	"""
+
+	if MI is None:
+		library = loadMediaInfo()
+		if library is None:
+			return None
+
+		MI = library.MediaInfo()
+
+	for parseSpeed in parseSpeeds:
+		MI.Option('ParseSpeed', parseSpeed)
+		if not MI.Open(inputFile):
+			return None
+
+		media = buildMediaFile(MI.Option, MI.Inform, MI.Get, MI.Count_Get)
+		MI.Close()
+
+		if not needsDeepParse(media):
+			break
+
+	return media
+
+
+def storeMediaInfo(cache, inputFile, media):
+	if cache is not None:
+		try:
+			cache.put(inputFile, media.toDict())
+		except sqlite3.Error:
+			pass
+
+
+def cachedMediaInfo(cache, inputFile):
+	if cache is None:
+		return None
+
+	try:
+		info = cache.get(inputFile)
+	except sqlite3.Error:
+		return None
+
+	# Entries from another version of the model are parsed again
+	return MediaFile.fromDict(info) if info is not None else None
+
+
+def readMediaInfoFiles(inputFiles, onRead=None):
+	"""
+	Returns {inputFile: MediaFile}, from the cache while a file is
+	unchanged.  The other files are parsed by a single MediaInfo instance,
+	files it can't open give an empty MediaFile that isn't cached.
+	onRead(inputFile) is called as each file is done.
+	"""
+
+	cache = mediaCache()
+	MI = None
+
+	results = {}
+	for inputFile in inputFiles:
+		media = cachedMediaInfo(cache, inputFile)
+
+		if media is None:
+			if MI is None and loadMediaInfo() is not None:
+				MI = loadMediaInfo().MediaInfo()
+
+			media = parseMediaInfo(inputFile, MI)
+
+			if media is None:
+				media = MediaFile()
+			else:
+				storeMediaInfo(cache, inputFile, media)
+
+		results[inputFile] = media
+		if onRead is not None:
+			onRead(inputFile)
+
+	return results
+
+
+def readMediaInfoList(paths, recursive=True):
+	"""
+	Opens files and whole directories in a single MediaInfoList and returns
+	{inputFile: MediaFile} for every file in them MediaInfo could open,
+	caching the video files.  Directories are searched recursively unless
+	recursive is False, files whose headers lack the totals are parsed
+	again deeper.
+	"""
+
+	library = loadMediaInfo()
+	if library is None:
+		return {}
+
+	MIList = library.MediaInfoList()
+	MIList.Option('ParseSpeed', FAST_PARSE_SPEED)
+
+	FileOptions = library.FileOptions
+	options = FileOptions.Nothing if recursive else FileOptions.NoRecursive
+	for path in paths:
+		MIList.Open(os.path.normpath(path), options)
+
+	results = {}
+	for i in range(MIList.Count_Get_Files()):
+		inputFile = MIList.Get(i, library.Stream.General, 0, 'CompleteName')
+		if not inputFile:
+			continue
+
+		results[inputFile] = buildMediaFile(
+			MIList.Option,
+			lambda i=i: MIList.Inform(i),
+			lambda streamKind, number, parameter, i=i: MIList.Get(
+				i, streamKind, number, parameter),
+			lambda streamKind, i=i: MIList.Count_Get(i, streamKind))
+
+	MIList.Close()
+
+	# Only video files are worth a deeper parse and a place in the cache,
+	# folders also hold subtitles, images and the like
+	cache = mediaCache()
+	MI = None
+	for inputFile, media in results.items():
+		if not media.video:
+			continue
+
+		if needsDeepParse(media):
+			if MI is None:
+				MI = library.MediaInfo()
+
+			media = parseMediaInfo(inputFile, MI, (DEEP_PARSE_SPEED,)) or media
+			results[inputFile] = media
+
+		storeMediaInfo(cache, inputFile, media)
+
+	return results
+
+
+def readMediaInfo(inputFile):
+	return readMediaInfoFiles([inputFile])[inputFile]
+
+
+def readInform(inputFile):
+	return readMediaInfo(inputFile).inform
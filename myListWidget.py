@@ -1,13 +1,47 @@
 import os.path
 
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QPixmap, QIcon
-from PyQt5.QtWidgets import (QListWidget, QListWidgetItem, QMessageBox, QApplication)
+from PyQt5.QtWidgets import (QListWidget, QListWidgetItem, QMessageBox, QApplication,
+							 QStyle, QStyledItemDelegate, QStyleOptionProgressBar)
+
+# Item data role of an encoding file's progress, 0.0 - 1.0 or None
+PROGRESS_ROLE = 1002
+
+
+class ProgressDelegate(QStyledItemDelegate):
+	"""
+	Draws the progress of a file being encoded as a bar behind its name.
+	"""
+
+	def paint(self, painter, option, index):
+		progress = index.data(PROGRESS_ROLE)
+		if progress is None:
+			super(ProgressDelegate, self).paint(painter, option, index)
+			return None
+
+		bar = QStyleOptionProgressBar()
+		bar.rect = option.rect
+		bar.minimum = 0
+		bar.maximum = 1000
+		bar.progress = int(progress * 1000)
+		bar.text = (index.data(Qt.DisplayRole) + '  -  ' +
+					'%.1f' % (progress * 100) + '%')
+		bar.textVisible = True
+		bar.textAlignment = Qt.AlignLeft | Qt.AlignVCenter
+
+		QApplication.style().drawControl(QStyle.CE_ProgressBar, bar, painter)
 
 
 class MyListWidget(QListWidget):
+	# A dropped directory, its video files are added once it's parsed
+	folderDropped = pyqtSignal(str)
+
 	def __init__(self, parent):
 		super(MyListWidget, self).__init__(parent)
 
+		self.setItemDelegate(ProgressDelegate(self))
+
 	# self.setAcceptDrops(True)
 	# self.setDragDropMode(QAbstractItemView.InternalMove)
 
@@ -24,7 +58,10 @@ class MyListWidget(QListWidget):
 	def dropEvent(self, event):
 		if event.mimeData().hasUrls():
 			for url in event.mimeData().urls():
-				if url.toLocalFile().lower().endswith(
+				if os.path.isdir(url.toLocalFile()):
+					self.folderDropped.emit(url.toLocalFile())
+					event.acceptProposedAction()
+				elif url.toLocalFile().lower().endswith(
 						('.webm', '.mkv', '.flv', '.vob', '.ogv', '.ogg', '.drc',
 						 '.mng', '.avi ', ',.mov', '.qt', '.wmv', '.yuv', '.rm',
 						 '.rmvb', '.asf', '.mp4', '.m4p ', ',.m4v', '.mpg', '.mp2',
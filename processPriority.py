@@ -0,0 +1,134 @@
+"""
+CPU and I/O priority of the tools, set per pipeline stage so a long x264
+encode gives way to the desktop and to the short stages that finish a job.
+"""
+
+import sys
+
+import psutil
+
+PRIORITY_NAMES = ['idle', 'below normal', 'normal', 'above normal', 'high']
+IO_PRIORITY_NAMES = ['very low', 'low', 'normal', 'high']
+
+"""
+Stages with their own settings: stage -> (priority, I/O priority) defaults
+"""
+
+STAGE_DEFAULTS = {
+	'Video': ('below normal', 'low'),
+	'Audio': ('normal', 'normal'),
+	'Merge': ('normal', 'normal'),
+}
+
+# Tool kind -> stage, the short analysis tools go with merging
+KIND_STAGES = {
+	'video': 'Video',
+	'audio': 'Audio',
+	'merge': 'Merge',
+	'identify': 'Merge',
+	'probe': 'Merge',
+}
+
+# Unix nice values of the priority names
+NICE_VALUES = {
+	'idle': 19,
+	'below normal': 10,
+	'normal': 0,
+	'above normal': -5,
+	'high': -10,
+}
+
+# Windows priority classes of the priority names
+PRIORITY_CLASSES = {
+	'idle': 'IDLE_PRIORITY_CLASS',
+	'below normal': 'BELOW_NORMAL_PRIORITY_CLASS',
+	'normal': 'NORMAL_PRIORITY_CLASS',
+	'above normal': 'ABOVE_NORMAL_PRIORITY_CLASS',
+	'high': 'HIGH_PRIORITY_CLASS',
+}
+
+# Windows I/O priorities of the I/O priority names
+IO_PRIORITY_LEVELS = {
+	'very low': 'IOPRIO_VERYLOW',
+	'low': 'IOPRIO_LOW',
+	'normal': 'IOPRIO_NORMAL',
+	'high': 'IOPRIO_HIGH',
+}
+
+
+def stagePriorities(optionsConfig):
+	"""
+	Returns tool kind -> (priority, I/O priority) from the <Stage>Priority
+	and <Stage>IoPriority options, unknown names count as normal.
+	"""
+
+	stages = {}
+	for stage, (priority, ioPriority) in STAGE_DEFAULTS.items():
+		priority = optionsConfig.get('Main', stage + 'Priority',
+									 fallback=priority).strip().lower()
+		ioPriority = optionsConfig.get('Main', stage + 'IoPriority',
+									   fallback=ioPriority).strip().lower()
+
+		if priority not in PRIORITY_NAMES:
+			priority = 'normal'
+		if ioPriority not in IO_PRIORITY_NAMES:
+			ioPriority = 'normal'
+
+		stages[stage] = (priority, ioPriority)
+
+	return dict((kind, stages[stage]) for kind, stage in KIND_STAGES.items())
+
+
+def ioPriorityArgs(ioPriority):
+	# psutil.Process.ionice arguments, None where the platform has no I/O
+	# priorities
+	if sys.platform == 'win32':
+		level = getattr(psutil, IO_PRIORITY_LEVELS[ioPriority], None)
+		return None if level is None else (level,)
+
+	if not hasattr(psutil, 'IOPRIO_CLASS_BE'):
+		return None
+
+	# Linux has no class below idle or above best effort without root.  Idle
+	# only gets the disk when nothing else wants it, so 'low' stays in best
+	# effort at its lowest level
+	if ioPriority == 'very low':
+		return (psutil.IOPRIO_CLASS_IDLE,)
+	elif ioPriority == 'low':
+		return (psutil.IOPRIO_CLASS_BE, 7)
+	elif ioPriority == 'high':
+		return (psutil.IOPRIO_CLASS_BE, 0)
+
+	return (psutil.IOPRIO_CLASS_BE, 4)
+
+
+def setPriority(pid, priorities):
+	# priorities is (priority, I/O priority).  Raising the priority may need
+	# admin rights and the tool may already be gone, both are ignored.
+	if not priorities:
+		return None
+
+	priority, ioPriority = priorities
+
+	try:
+		process = psutil.Process(pid)
+	except psutil.Error:
+		return None
+
+	if sys.platform == 'win32':
+		nice = getattr(psutil, PRIORITY_CLASSES[priority], None)
+	else:
+		nice = NICE_VALUES[priority]
+
+	try:
+		if nice is not None:
+			process.nice(nice)
+	except (AttributeError, ValueError, psutil.Error):
+		pass
+
+	ioArgs = ioPriorityArgs(ioPriority)
+	try:
+		if ioArgs is not None:
+			process.ionice(*ioArgs)
+	except (AttributeError, ValueError, psutil.Error):
+		pass
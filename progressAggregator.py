@@ -0,0 +1,59 @@
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+# Default updates per second
+UPDATE_RATE = 10
+
+
+class ProgressAggregator(QObject):
+	"""
+	Sits between a pipeline's progress signals and a front end.  The tools'
+	output only replaces each job's newest text and stats, and a timer hands
+	those on at a fixed rate, so the cost of showing progress doesn't grow
+	with the number of jobs or how often the tools print.  Each tick emits
+	one {job: text} and one {job: stats} dict with the jobs that changed.
+	"""
+
+	progressUpdated = pyqtSignal(object)
+	statsUpdated = pyqtSignal(object)
+
+	def __init__(self, rate=UPDATE_RATE, parent=None):
+		super().__init__(parent)
+
+		self.texts = {}
+		self.stats = {}
+
+		self.timer = QTimer(self)
+		self.timer.setInterval(max(1, 1000 // max(1, rate)))
+		self.timer.timeout.connect(self.flush)
+
+	def start(self):
+		self.timer.start()
+
+	def stop(self):
+		self.timer.stop()
+		self.texts = {}
+		self.stats = {}
+
+	def updateProgress(self, job, text):
+		self.texts[job] = text
+
+	def updateStats(self, job, event):
+		self.stats[job] = event
+
+	def discard(self, job):
+		# A finished job's last progress would overwrite what follows it
+		self.texts.pop(job, None)
+		self.stats.pop(job, None)
+
+	def flush(self):
+		if not (self.texts or self.stats):
+			return None
+
+		texts, self.texts = self.texts, {}
+		stats, self.stats = self.stats, {}
+
+		if stats:
+			self.statsUpdated.emit(stats)
+
+		if texts:
+			self.progressUpdated.emit(texts)
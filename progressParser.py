@@ -0,0 +1,300 @@
+"""
+Turns the progress lines x264, ffmpeg and neroAacEnc print on stderr into
+ProgressEvents, and estimates how much of a job's video and of the whole
+batch is left.
+"""
+
+import codecs
+import re
+import time
+
+X264_FRAMES = re.compile(
+	r'(\d+)(?:/(\d+))?\s+frames[,:]\s+([\d.]+)\s+fps,\s+([\d.]+)\s+kb/s')
+X264_ETA = re.compile(r'eta\s+(\d+):(\d+):(\d+)')
+
+FFMPEG_FRAME = re.compile(r'frame=\s*(\d+)')
+FFMPEG_FPS = re.compile(r'fps=\s*([\d.]+)')
+FFMPEG_TIME = re.compile(r'time=\s*(\d+):(\d+):([\d.]+)')
+FFMPEG_BITRATE = re.compile(r'bitrate=\s*([\d.]+)kbits/s')
+FFMPEG_SPEED = re.compile(r'speed=\s*([\d.]+)x')
+
+NERO_AAC_SECONDS = re.compile(r'Processed\s+(\d+)\s+seconds')
+
+
+def formatDuration(seconds):
+	seconds = int(max(0, seconds))
+	return (str(seconds // 3600) + ':' + str(seconds // 60 % 60).zfill(2) +
+			':' + str(seconds % 60).zfill(2))
+
+
+class ProgressEvent:
+	"""
+	One progress reading of a tool.  Whatever the tool doesn't print is
+	None, frame counts are x264's and ffmpeg's, seconds the audio tools'.
+	"""
+
+	FIELDS = ('tool', 'frame', 'totalFrames', 'fps', 'bitrate', 'eta',
+			  'seconds', 'duration', 'speed')
+
+	def __init__(self, tool, frame=None, totalFrames=None, fps=None,
+				 bitrate=None, eta=None, seconds=None, duration=None,
+				 speed=None):
+		self.tool = tool
+		self.frame = frame
+		self.totalFrames = totalFrames
+		self.fps = fps
+		self.bitrate = bitrate
+		self.eta = eta
+		self.seconds = seconds
+		self.duration = duration
+		self.speed = speed
+
+	def fraction(self):
+		if self.frame is not None and self.totalFrames:
+			return min(1.0, self.frame / self.totalFrames)
+		elif self.seconds is not None and self.duration:
+			return min(1.0, self.seconds / self.duration)
+
+		return None
+
+	def estimatedEta(self):
+		# The tool's own estimate, or one from its speed
+		if self.eta is not None:
+			return self.eta
+		elif self.frame is not None and self.totalFrames and self.fps:
+			return max(0, self.totalFrames - self.frame) / self.fps
+		elif self.seconds is not None and self.duration and self.speed:
+			return max(0, self.duration - self.seconds) / self.speed
+
+		return None
+
+	def describe(self):
+		parts = []
+		if self.frame is not None:
+			frames = str(self.frame)
+			if self.totalFrames:
+				frames += '/' + str(self.totalFrames)
+			parts.append(frames + ' frames')
+		elif self.seconds is not None:
+			position = formatDuration(self.seconds)
+			if self.duration:
+				position += ' of ' + formatDuration(self.duration)
+			parts.append(position)
+
+		if self.fraction() is not None:
+			parts[-1] += ' (' + '%.1f' % (self.fraction() * 100) + '%)'
+		if self.fps is not None:
+			parts.append('%.2f' % self.fps + ' fps')
+		if self.speed is not None:
+			parts.append('%.1f' % self.speed + 'x')
+		if self.bitrate is not None:
+			parts.append('%.2f' % self.bitrate + ' kb/s')
+		if self.estimatedEta() is not None:
+			parts.append('ETA ' + formatDuration(self.estimatedEta()))
+
+		return ', '.join(parts)
+
+	def toDict(self):
+		return dict((name, getattr(self, name)) for name in self.FIELDS)
+
+	@classmethod
+	def fromDict(cls, values):
+		return cls(**dict((name, values.get(name)) for name in cls.FIELDS))
+
+
+"""
+Line parsers: line -> ProgressEvent, or None for other output
+"""
+
+
+def parseX264Line(line):
+	match = X264_FRAMES.search(line)
+	if match is None:
+		return None
+
+	event = ProgressEvent('x264', frame=int(match.group(1)),
+						  fps=float(match.group(3)),
+						  bitrate=float(match.group(4)))
+	if match.group(2):
+		event.totalFrames = int(match.group(2))
+
+	eta = X264_ETA.search(line, match.end())
+	if eta is not None:
+		event.eta = (int(eta.group(1)) * 3600 + int(eta.group(2)) * 60 +
+					 int(eta.group(3)))
+
+	return event
+
+
+def parseFfmpegLine(line):
+	# Negative times at the start of a stream don't match and are skipped
+	position = FFMPEG_TIME.search(line)
+	if position is None:
+		return None
+
+	event = ProgressEvent('ffmpeg', seconds=(
+		int(position.group(1)) * 3600 + int(position.group(2)) * 60 +
+		float(position.group(3))))
+
+	for pattern, name, convert in ((FFMPEG_FRAME, 'frame', int),
+								   (FFMPEG_FPS, 'fps', float),
+								   (FFMPEG_BITRATE, 'bitrate', float),
+								   (FFMPEG_SPEED, 'speed', float)):
+		match = pattern.search(line)
+		if match is not None:
+			setattr(event, name, convert(match.group(1)))
+
+	return event
+
+
+def parseNeroAacLine(line):
+	match = NERO_AAC_SECONDS.search(line)
+	if match is None:
+		return None
+
+	return ProgressEvent('neroAacEnc', seconds=int(match.group(1)))
+
+
+PARSERS = {
+	'x264': parseX264Line,
+	'ffmpeg': parseFfmpegLine,
+	'neroAacEnc': parseNeroAacLine,
+}
+
+
+class ProgressReader:
+	"""
+	Reads one tool's stderr as it arrives.  feed() takes only the newly read
+	bytes, keeps an unfinished line for the next call and returns the newest
+	progress among the finished lines.  lastLine is the newest line of any
+	kind, for output that isn't progress.
+	"""
+
+	def __init__(self, tool, totalFrames=None, duration=None):
+		self.parser = PARSERS[tool]
+		self.totalFrames = totalFrames
+		self.duration = duration
+
+		self.decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+		self.pending = ''
+		self.lastLine = ''
+
+	def feed(self, data):
+		# Progress lines end in \r, log lines in \n
+		lines = re.split('[\r\n]', self.pending + self.decoder.decode(data))
+		self.pending = lines.pop()
+
+		lines = [line.strip() for line in lines if line.strip()]
+		if lines:
+			self.lastLine = lines[-1]
+
+		# Only the newest progress matters, older lines aren't parsed
+		for line in reversed(lines):
+			event = self.parseLine(line)
+			if event is not None:
+				return event
+
+		return None
+
+	def parseLine(self, line):
+		event = self.parser(line)
+		if event is None:
+			return None
+
+		# Totals the tool doesn't know come from MediaInfo
+		if event.totalFrames is None and event.frame is not None:
+			event.totalFrames = self.totalFrames
+		if event.duration is None and event.seconds is not None:
+			event.duration = self.duration
+
+		return event
+
+
+class VideoProgress:
+	"""
+	Adds up the x264 processes of one file.  Each process reports under its
+	own key, a split encode's finished segments count with all their frames.
+	"""
+
+	def __init__(self, totalFrames=None):
+		self.totalFrames = totalFrames
+		self.doneFrames = 0
+		self.events = {}
+
+	def update(self, key, event):
+		self.events[key] = event
+		return self.event()
+
+	def finish(self, key, frames):
+		self.events.pop(key, None)
+		self.doneFrames += frames
+
+	def event(self):
+		events = list(self.events.values())
+
+		# A single process over the whole file has x264's own ETA
+		if (len(events) == 1 and not self.doneFrames and
+				events[0].totalFrames in (None, self.totalFrames)):
+			return events[0]
+
+		frame = self.doneFrames + sum(event.frame or 0 for event in events)
+		combined = ProgressEvent('x264', frame=frame,
+								 totalFrames=self.totalFrames or None,
+								 fps=sum(event.fps or 0 for event in events))
+
+		# Average bitrate weighted by the frames behind it
+		encoded = sum(event.frame or 0 for event in events)
+		if encoded:
+			combined.bitrate = sum((event.bitrate or 0) * (event.frame or 0)
+								   for event in events) / encoded
+
+		return combined
+
+
+class BatchProgress:
+	"""
+	Estimates the remaining time of a batch from the share of its files
+	done so far and the time that took.  Failed files count as done.
+	"""
+
+	def __init__(self, totalJobs):
+		self.totalJobs = totalJobs
+		self.started = None
+		self.finished = 0
+		self.fractions = {}
+
+	def jobStarted(self, jobId):
+		if self.started is None:
+			self.started = time.monotonic()
+
+		self.fractions[jobId] = 0.0
+
+	def update(self, jobId, fraction):
+		if jobId in self.fractions and fraction is not None:
+			self.fractions[jobId] = fraction
+
+	def jobFinished(self, jobId):
+		if self.fractions.pop(jobId, None) is not None:
+			self.finished += 1
+
+	def fraction(self):
+		if not self.totalJobs:
+			return 0.0
+
+		return min(1.0, (self.finished + sum(self.fractions.values())) /
+				   self.totalJobs)
+
+	def eta(self):
+		done = self.fraction()
+		if self.started is None or done <= 0:
+			return None
+
+		elapsed = time.monotonic() - self.started
+		return elapsed * (1 - done) / done
+
+	def describe(self):
+		text = 'Batch ' + '%.1f' % (self.fraction() * 100) + '%'
+		if self.eta() is not None:
+			text += ', ETA ' + formatDuration(self.eta())
+
+		return text
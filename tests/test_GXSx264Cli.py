@@ -0,0 +1,148 @@
+import glob
+import json
+import os
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+try:
+	import PyQt5
+except ImportError:
+	PyQt5 = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stand-ins for the Windows tools: x264 fails, mkvmerge finds no tracks
+TOOLS = {
+	'x264_64_tMod-10bit-all.exe': 'echo "x264 [error]: could not open input" >&2\n'
+								  'exit 1\n',
+	'mkvmerge64.exe': "echo \"File '$2': container: Matroska\"\n",
+}
+
+
+def isRunning(pid):
+	try:
+		os.kill(pid, 0)
+	except ProcessLookupError:
+		return False
+
+	# Killed but not reaped yet by whoever inherited it
+	try:
+		with open('/proc/' + str(pid) + '/stat') as f:
+			return f.read().split(')')[-1].split()[0] != 'Z'
+	except OSError:
+		return True
+
+
+@unittest.skipIf(PyQt5 is None or os.name == 'nt',
+				 'needs PyQt5 and a POSIX shell')
+class CliOutputTest(unittest.TestCase):
+	"""
+	stdout of 'GXSx264Cli.py encode' is read by scripts, every line has to
+	be one JSON event.  The CLI finds its tools next to itself, so it runs
+	from a copy with the stand-ins in its tools directory.
+	"""
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, self.directory)
+
+		for fileName in glob.glob(os.path.join(ROOT, '*.py')):
+			shutil.copy(fileName, self.directory)
+		shutil.copytree(os.path.join(ROOT, 'profiles'),
+						os.path.join(self.directory, 'profiles'))
+
+		os.makedirs(os.path.join(self.directory, 'tools'))
+		for name, script in TOOLS.items():
+			self.writeTool(name, script)
+
+		os.makedirs(os.path.join(self.directory, 'out'))
+		with open(os.path.join(self.directory, 'in.mkv'), 'wb') as f:
+			f.write(b'not a video')
+
+	def writeTool(self, name, script):
+		fileName = os.path.join(self.directory, 'tools', name)
+		with open(fileName, 'w') as f:
+			f.write('#!/bin/sh\n' + script)
+		os.chmod(fileName, os.stat(fileName).st_mode | stat.S_IEXEC)
+
+	def encodeCommand(self, runner, *options):
+		profile = os.path.splitext(sorted(os.listdir(
+			os.path.join(ROOT, 'profiles')))[0])[0]
+
+		return [sys.executable, os.path.join(self.directory, 'GXSx264Cli.py'),
+				'encode', '--profile', profile, '--out', 'out', '--runner',
+				runner] + list(options) + ['in.mkv']
+
+	def encodeEvents(self, runner):
+		env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+		result = subprocess.run(
+			self.encodeCommand(runner), cwd=self.directory, env=env,
+			stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+
+		lines = result.stdout.decode('utf-8').splitlines()
+		# Raises on anything that isn't a JSON event
+		return result.returncode, [json.loads(line) for line in lines]
+
+	def checkEvents(self, runner):
+		returnCode, events = self.encodeEvents(runner)
+
+		self.assertEqual(returnCode, 1)
+		self.assertEqual(events[-1]['event'], 'done')
+		self.assertEqual(events[-1]['failed'], 1)
+
+		# The tool command lines come through as log events
+		self.assertTrue(any(event['event'] == 'log' and
+							'x264_64_tMod-10bit-all.exe' in event['message']
+							for event in events))
+
+	def testQProcessRunner(self):
+		self.checkEvents('qprocess')
+
+	def testAsyncioRunner(self):
+		self.checkEvents('asyncio')
+
+	def checkInterrupt(self, runner, *options):
+		# x264 records its pid and runs until it is killed
+		pidFile = os.path.join(self.directory, 'x264.pid')
+		self.writeTool('x264_64_tMod-10bit-all.exe',
+					   'echo $$ > "' + pidFile + '"\nexec sleep 60\n')
+
+		env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+		process = subprocess.Popen(
+			self.encodeCommand(runner, *options), cwd=self.directory,
+			env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+		self.addCleanup(process.stdout.close)
+
+		deadline = time.monotonic() + 30
+		while not os.path.exists(pidFile) or not os.path.getsize(pidFile):
+			self.assertLess(time.monotonic(), deadline)
+			time.sleep(0.1)
+		with open(pidFile) as f:
+			pid = int(f.read())
+		# Gives up waiting for the pipeline after STOP_TIMEOUT
+		self.addCleanup(subprocess.call, ['kill', '-9', str(pid)],
+						stderr=subprocess.DEVNULL)
+
+		process.send_signal(signal.SIGINT)
+		self.assertEqual(process.wait(timeout=30), 130)
+
+		self.assertFalse(isRunning(pid))
+
+	def testQProcessInterrupt(self):
+		self.checkInterrupt('qprocess')
+
+	def testAsyncioInterrupt(self):
+		self.checkInterrupt('asyncio')
+
+	def testWorkerPoolInterrupt(self):
+		self.checkInterrupt('qprocess', '--workers', '2')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,135 @@
+import asyncio
+import configparser
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+try:
+	import asyncEncode
+	from asyncEncode import AsyncEncodeBatch
+	from asyncRunner import newEventLoop
+	from encodeCommands import encodedFileName
+	from jobState import JobState
+except ImportError:
+	# PyQt5 missing
+	AsyncEncodeBatch = None
+
+
+class Plan:
+	jobs = 1
+
+	def describe(self):
+		return 'Plan'
+
+
+@unittest.skipIf(AsyncEncodeBatch is None, 'needs PyQt5')
+class AsyncEncodeBatchTest(unittest.TestCase):
+
+	def setUp(self):
+		optionsConfig = configparser.ConfigParser()
+		optionsConfig['Main'] = {}
+
+		self.events = []
+		self.batch = AsyncEncodeBatch(
+			configparser.ConfigParser(), optionsConfig, '.',
+			lambda job, event, text: self.events.append((job, event)))
+		for name in ('a.mkv', 'b.mkv'):
+			self.batch.addFile('missing/' + name)
+
+		self.loop = newEventLoop()
+		asyncio.set_event_loop(self.loop)
+		self.addCleanup(self.loop.close)
+		self.addCleanup(asyncio.set_event_loop, None)
+
+	def startedJobs(self):
+		return [job.jobId for job, event in self.events if event == 'started']
+
+	def testStopWhilePlanning(self):
+		planning = threading.Event()
+		release = threading.Event()
+
+		def slowPlan(encodeConfig, optionsConfig, jobs):
+			planning.set()
+			release.wait(10)
+			return Plan()
+
+		async def stopWhilePlanning():
+			await self.loop.run_in_executor(None, planning.wait, 10)
+			self.batch.stop()
+			release.set()
+
+		with mock.patch.object(asyncEncode, 'planBatch', slowPlan):
+			self.loop.run_until_complete(asyncio.gather(
+				self.batch.run(), stopWhilePlanning()))
+
+		self.assertEqual(self.startedJobs(), [])
+		self.assertEqual([job.state for job in self.batch.jobs],
+						 [JobState.Stopped, JobState.Stopped])
+
+	def testPlanningFailure(self):
+		def failingPlan(encodeConfig, optionsConfig, jobs):
+			raise ValueError('bad option')
+
+		with mock.patch.object(asyncEncode, 'planBatch', failingPlan):
+			self.loop.run_until_complete(self.batch.run())
+
+		self.assertEqual(self.startedJobs(), [])
+		self.assertEqual([job.state for job in self.batch.jobs],
+						 [JobState.Failed, JobState.Failed])
+
+	def testCancelledJobIsSkipped(self):
+		self.batch.jobs[0].cancelled = True
+
+		with mock.patch.object(asyncEncode, 'planBatch',
+							   lambda *args: Plan()):
+			self.loop.run_until_complete(self.batch.run())
+
+		self.assertEqual(self.startedJobs(), [2])
+
+	def testSameNameFromAnotherFolder(self):
+		job = self.batch.addFile('other/a.mkv')
+
+		self.assertEqual(job.displayName, 'a (2).mkv')
+		self.assertNotEqual(encodedFileName('.', job.displayName),
+							encodedFileName('.', self.batch.jobs[0].displayName))
+
+
+@unittest.skipIf(AsyncEncodeBatch is None, 'needs PyQt5')
+class AsyncEncodeJobTest(unittest.TestCase):
+
+	def testUnexpectedErrorFailsJob(self):
+		handle, inputFile = tempfile.mkstemp(suffix='.mkv')
+		os.close(handle)
+		self.addCleanup(os.remove, inputFile)
+
+		optionsConfig = configparser.ConfigParser()
+		optionsConfig['Main'] = {}
+		events = []
+		batch = AsyncEncodeBatch(
+			configparser.ConfigParser(), optionsConfig, '.',
+			lambda job, event, text: events.append((event, text)))
+		job = batch.addFile(inputFile)
+
+		def brokenCache(inputFile):
+			raise sqlite3.OperationalError('database is locked')
+
+		loop = newEventLoop()
+		asyncio.set_event_loop(loop)
+		self.addCleanup(loop.close)
+		self.addCleanup(asyncio.set_event_loop, None)
+
+		with mock.patch.object(asyncEncode, 'planBatch',
+							   lambda *args: Plan()), \
+				mock.patch.object(asyncEncode, 'readMediaInfo', brokenCache):
+			loop.run_until_complete(batch.run())
+
+		self.assertEqual(job.state, JobState.Failed)
+		self.assertIn(('log', 'Error - database is locked'), events)
+		self.assertEqual(events[-1], ('finished', ''))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import sys
+import unittest
+
+from asyncRunner import ToolError, ToolRunner, newEventLoop
+
+
+def pythonCommand(code):
+	return '"' + sys.executable + '" -c "' + code + '"'
+
+
+class ToolRunnerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.loop = newEventLoop()
+		self.runner = ToolRunner()
+
+	def tearDown(self):
+		self.loop.close()
+
+	def runTool(self, *args, **kwargs):
+		return self.loop.run_until_complete(self.runner.run(*args, **kwargs))
+
+	def testCleanExit(self):
+		self.assertEqual(self.runTool(pythonCommand('print(1)'),
+								  captureOutput=True).strip(), '1')
+
+	def testFailedExit(self):
+		for exitCode in (1, 3, 255):
+			with self.assertRaises(ToolError) as context:
+				self.runTool(pythonCommand('import sys; sys.exit(' +
+									   str(exitCode) + ')'))
+
+			self.assertEqual(context.exception.exitCode, exitCode)
+
+	def testCrash(self):
+		with self.assertRaises(ToolError) as context:
+			self.runTool(pythonCommand('import os; os.abort()'))
+
+		self.assertLess(context.exception.exitCode, 0)
+
+	def testCommandGoesToLog(self):
+		cmd = pythonCommand('pass')
+		logged = []
+		stdout = io.StringIO()
+
+		with contextlib.redirect_stdout(stdout):
+			self.runTool(cmd, log=logged.append)
+
+		self.assertEqual(logged, [cmd])
+		self.assertEqual(stdout.getvalue(), '')
+
+	def testMaxExitCode(self):
+		# mkvmerge exits with 1 for warnings
+		self.runTool(pythonCommand('import sys; sys.exit(1)'), maxExitCode=1)
+
+
+if __name__ == '__main__':
+	unittest.main()
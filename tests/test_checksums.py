@@ -0,0 +1,116 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+from unittest import mock
+
+try:
+	from PyQt5.QtCore import Qt
+
+	import checksums
+except ImportError:
+	# PyQt5 missing
+	checksums = None
+
+
+class BrokenHash:
+	def update(self, data):
+		raise IOError('digest broke')
+
+	def hexdigest(self):
+		return ''
+
+
+@unittest.skipIf(checksums is None, 'needs PyQt5')
+class ChecksumsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.fileName = os.path.join(self.directory, 'a [Encoded].mkv')
+		self.data = os.urandom(50000)
+
+		with open(self.fileName, 'wb') as f:
+			f.write(self.data)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testDigests(self):
+		digests = checksums.computeChecksums(
+			self.fileName, ['crc32', 'md5', 'sha256'], blockSize=4096)
+
+		self.assertEqual(digests, {
+			'crc32': '%08X' % (zlib.crc32(self.data) & 0xFFFFFFFF),
+			'md5': hashlib.md5(self.data).hexdigest(),
+			'sha256': hashlib.sha256(self.data).hexdigest(),
+		})
+
+	def testSingleDigest(self):
+		self.assertEqual(
+			checksums.computeChecksums(self.fileName, ['md5'], 4096),
+			{'md5': hashlib.md5(self.data).hexdigest()})
+
+	def testDigestThreadErrorFails(self):
+		errors = []
+
+		def compute():
+			try:
+				checksums.computeChecksums(self.fileName, ['md5', 'broken'],
+										   blockSize=1024)
+			except IOError as e:
+				errors.append(e)
+
+		# In a thread, so a reader stuck on the failed digest's full queue
+		# fails the test instead of hanging it
+		with mock.patch.dict(checksums.ALGORITHMS,
+							 {'broken': (BrokenHash, '.broken')}):
+			thread = threading.Thread(target=compute)
+			thread.daemon = True
+			thread.start()
+			thread.join(10)
+
+		self.assertFalse(thread.is_alive())
+		self.assertEqual(len(errors), 1)
+
+	def testWorkerReportsDigestThreadError(self):
+		results = []
+		with mock.patch.dict(checksums.ALGORITHMS,
+							 {'broken': (BrokenHash, '.broken')}):
+			worker = checksums.ChecksumWorker(self.fileName,
+											  ['md5', 'broken'], 1024)
+			worker.checksumsFinished.connect(results.append,
+											 Qt.DirectConnection)
+			worker.checksumsFailed.connect(results.append,
+										   Qt.DirectConnection)
+			worker.start()
+			self.assertTrue(worker.wait(10000))
+
+		self.assertEqual(results, ['digest broke'])
+
+	def testProgressAbove2GiB(self):
+		worker = checksums.ChecksumWorker(self.fileName, ['md5'])
+		received = []
+		worker.progressUpdated.connect(
+			lambda done, total, rate: received.append((done, total)))
+
+		worker.progressUpdated.emit(3 * 1024 ** 3, 5 * 1024 ** 3, 1.0)
+
+		self.assertEqual(received, [(3 * 1024 ** 3, 5 * 1024 ** 3)])
+
+	def testSidecars(self):
+		sidecars = checksums.writeSidecars(
+			self.fileName, {'crc32': '0A1B2C3D', 'md5': 'ABCDEF'})
+
+		self.assertEqual(sidecars, [self.fileName + '.sfv',
+									self.fileName + '.md5'])
+		with open(sidecars[0], encoding='utf-8') as f:
+			self.assertEqual(f.read(), 'a [Encoded].mkv 0A1B2C3D\n')
+		with open(sidecars[1], encoding='utf-8') as f:
+			self.assertEqual(f.read(), 'abcdef *a [Encoded].mkv\n')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,167 @@
+import os
+import shutil
+import struct
+import tempfile
+import time
+import unittest
+import zlib
+
+try:
+	from PyQt5.QtCore import Qt
+
+	from crcEngine import (CRCWorker, TailCRCWorker, crc32Combine,
+						   findFirstCluster)
+except ImportError:
+	# PyQt5 missing
+	CRCWorker = None
+
+
+def element(elementId, payload):
+	# EBML element with an 8 byte size
+	return elementId + struct.pack('>Q', len(payload) | (1 << 56)) + payload
+
+
+def matroskaHeader(segmentInfo=b'info'):
+	# EBML header and the start of an unknown-size Segment holding an Info
+	return (element(b'\x1A\x45\xDF\xA3', b'\x42\x86\x81\x01') +
+			b'\x18\x53\x80\x67\x01\xFF\xFF\xFF\xFF\xFF\xFF\xFF' +
+			element(b'\x15\x49\xA9\x66', segmentInfo))
+
+
+def cluster(payload):
+	return element(b'\x1F\x43\xB6\x75', payload)
+
+
+@unittest.skipIf(CRCWorker is None, 'needs PyQt5')
+class CRCWorkerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def runWorker(self, worker):
+		# run() directly, so the signals are delivered before it returns
+		results = {'progress': [], 'finished': [], 'failed': []}
+		worker.progressUpdated.connect(
+			lambda done, total, rate: results['progress'].append((done, total)))
+		worker.crcFinished.connect(results['finished'].append)
+		worker.crcFailed.connect(results['failed'].append)
+
+		worker.run()
+		return results
+
+	def testCRC(self):
+		data = os.urandom(100000)
+		fileName = os.path.join(self.directory, 'a.mkv')
+		with open(fileName, 'wb') as f:
+			f.write(data)
+
+		results = self.runWorker(CRCWorker(fileName, blockSize=4096))
+
+		self.assertEqual(results['finished'],
+						 ['%08X' % (zlib.crc32(data) & 0xFFFFFFFF)])
+		self.assertEqual(results['progress'][-1], (100000, 100000))
+		self.assertEqual(results['failed'], [])
+
+	def testMissingFileFails(self):
+		results = self.runWorker(
+			CRCWorker(os.path.join(self.directory, 'missing.mkv')))
+
+		self.assertEqual(results['finished'], [])
+		self.assertEqual(len(results['failed']), 1)
+
+	def testProgressAbove2GiB(self):
+		worker = CRCWorker('unused')
+		received = []
+		worker.progressUpdated.connect(
+			lambda done, total, rate: received.append((done, total)))
+
+		worker.progressUpdated.emit(3 * 1024 ** 3, 5 * 1024 ** 3, 1.0)
+
+		self.assertEqual(received, [(3 * 1024 ** 3, 5 * 1024 ** 3)])
+
+
+@unittest.skipIf(CRCWorker is None, 'needs PyQt5')
+class CRC32CombineTest(unittest.TestCase):
+
+	def testMatchesWholeCRC(self):
+		for lengthA, lengthB in ((0, 10), (10, 0), (1, 1), (1000, 12345),
+								 (65536, 70001)):
+			a = os.urandom(lengthA)
+			b = os.urandom(lengthB)
+
+			self.assertEqual(
+				crc32Combine(zlib.crc32(a), zlib.crc32(b), len(b)),
+				zlib.crc32(a + b))
+
+
+@unittest.skipIf(CRCWorker is None, 'needs PyQt5')
+class FindFirstClusterTest(unittest.TestCase):
+
+	def testFindsCluster(self):
+		header = matroskaHeader()
+
+		self.assertEqual(findFirstCluster(header + cluster(b'frames')),
+						 len(header))
+
+	def testNeedsMoreData(self):
+		self.assertIsNone(findFirstCluster(matroskaHeader()))
+		self.assertIsNone(findFirstCluster(matroskaHeader()[:5]))
+
+	def testNotMatroska(self):
+		self.assertEqual(findFirstCluster(b'RIFF\x00\x00\x00\x00WAVE'), -1)
+
+
+@unittest.skipIf(CRCWorker is None, 'needs PyQt5')
+class TailCRCWorkerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.fileName = os.path.join(self.directory, 'a.mkv')
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testHeaderPatchedAfterClusters(self):
+		# Written like mkvmerge: clusters appended while the worker reads,
+		# then the header rewritten in place once they are all out
+		worker = TailCRCWorker(self.fileName, blockSize=1024,
+							   expectedSize=100000)
+		results = []
+		progress = []
+		worker.crcFinished.connect(results.append, Qt.DirectConnection)
+		worker.crcFailed.connect(results.append, Qt.DirectConnection)
+		worker.progressUpdated.connect(
+			lambda done, total, rate: progress.append((done, total)),
+			Qt.DirectConnection)
+
+		with open(self.fileName, 'wb') as f:
+			f.write(matroskaHeader(b'info'))
+			f.flush()
+			worker.start()
+
+			for i in range(3):
+				f.write(cluster(os.urandom(5000)))
+				f.flush()
+				time.sleep(0.15)
+
+			f.seek(0)
+			f.write(matroskaHeader(b'INFO'))
+
+		worker.writerFinished()
+		self.assertTrue(worker.wait(10000))
+
+		with open(self.fileName, 'rb') as f:
+			data = f.read()
+		expected = '%08X' % (zlib.crc32(data) & 0xFFFFFFFF)
+		self.assertEqual(results, [expected])
+
+		# Partway while mkvmerge writes, complete once it has finished
+		self.assertLess(progress[0][0], progress[0][1])
+		self.assertEqual(progress[-1], (len(data), len(data)))
+
+
+if __name__ == '__main__':
+	unittest.main()
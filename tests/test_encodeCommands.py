@@ -0,0 +1,107 @@
+import configparser
+import os
+import unittest
+from unittest import mock
+
+from encodeCommands import (mkvMergePath, parseAudioTracks, setThreads,
+							splitCommand, uniqueDisplayName)
+
+
+class SplitCommandTest(unittest.TestCase):
+
+	def testWhitespace(self):
+		self.assertEqual(splitCommand(' a  b\tc '), ['a', 'b', 'c'])
+
+	def testQuotedArgument(self):
+		self.assertEqual(
+			splitCommand('mkvmerge.exe -o "C:/out dir/a b.mkv" "in.mkv"'),
+			['mkvmerge.exe', '-o', 'C:/out dir/a b.mkv', 'in.mkv'])
+
+	def testQuotesInsideArgument(self):
+		self.assertEqual(splitCommand('--language "0:eng" x"y z"'),
+						 ['--language', '0:eng', 'xy z'])
+
+	def testTripleQuoteIsLiteral(self):
+		self.assertEqual(splitCommand('a """q""" b'), ['a', '"q"', 'b'])
+
+	def testUnterminatedQuote(self):
+		self.assertEqual(splitCommand('a "b c'), ['a', 'b c'])
+
+
+class MkvMergePathTest(unittest.TestCase):
+
+	def mkvMerge(self, architecture=None):
+		config = configparser.ConfigParser()
+		if architecture is not None:
+			config['System'] = {'Architecture': architecture}
+
+		return os.path.basename(mkvMergePath(config).strip())
+
+	def testArchitecture(self):
+		self.assertEqual(self.mkvMerge('32'), 'mkvmerge32.exe')
+		self.assertEqual(self.mkvMerge('64'), 'mkvmerge64.exe')
+
+	def testMissingOrInvalid(self):
+		self.assertEqual(self.mkvMerge(), 'mkvmerge64.exe')
+		self.assertEqual(self.mkvMerge('x86'), 'mkvmerge64.exe')
+
+
+class UniqueDisplayNameTest(unittest.TestCase):
+
+	def jobs(self, *displayNames):
+		return [mock.Mock(displayName=displayName)
+				for displayName in displayNames]
+
+	def testUnusedNameIsKept(self):
+		self.assertEqual(uniqueDisplayName('a.mkv', self.jobs('b.mkv')),
+						 'a.mkv')
+
+	def testSameNameGetsNumbered(self):
+		self.assertEqual(uniqueDisplayName('a.mkv', self.jobs('a.mkv')),
+						 'a (2).mkv')
+		self.assertEqual(
+			uniqueDisplayName('A.mkv', self.jobs('a.mkv', 'a (2).mkv')),
+			'A (3).mkv')
+
+
+class SetThreadsTest(unittest.TestCase):
+
+	def testReplacesProfileThreads(self):
+		self.assertEqual(
+			setThreads('x264.exe --preset slow --threads 8 '
+					   '--lookahead-threads 2 --crf 20', 4, 1),
+			'x264.exe --preset slow --threads 4 --lookahead-threads 1 '
+			'--crf 20')
+
+	def testDropsLookaheadThreadsWhenNotGiven(self):
+		self.assertEqual(
+			setThreads('x264.exe --threads 8 --lookahead-threads 2', 3),
+			'x264.exe --threads 3')
+
+	def testAddsThreadsAfterExecutable(self):
+		self.assertEqual(setThreads('x264.exe --preset slow', 4),
+						 'x264.exe --threads 4 --preset slow')
+
+	def testExecutableOnly(self):
+		self.assertEqual(setThreads('x264.exe', 2), 'x264.exe --threads 2')
+
+
+class ParseAudioTracksTest(unittest.TestCase):
+
+	def testAudioTrackIds(self):
+		output = ("File 'a.mkv': container: Matroska\n"
+				  'Track ID 0: video (MPEG-4p10/AVC/H.264)\n'
+				  'Track ID 1: audio (AAC)\n'
+				  'Track ID 2: subtitles (SubRip/SRT)\n'
+				  'Track ID 3: audio (FLAC)\n'
+				  'Chapters: 6 entries\n')
+
+		self.assertEqual(parseAudioTracks(output), ['1', '3'])
+
+	def testNoAudio(self):
+		self.assertEqual(parseAudioTracks('Track ID 0: video (AVC)\r\n'), [])
+		self.assertEqual(parseAudioTracks(''), [])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,84 @@
+import configparser
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+	from PyQt5.QtCore import QProcess
+
+	from encodeJob import EncodeJob
+	from jobState import JobState
+	from jobWorkspace import JobWorkspace
+except ImportError:
+	# PyQt5 missing
+	EncodeJob = None
+
+
+def pythonCommand(code):
+	return '"' + sys.executable + '" -c "' + code + '"'
+
+
+@unittest.skipIf(EncodeJob is None, 'needs PyQt5')
+class VideoExitTest(unittest.TestCase):
+	"""
+	finishedCurrentVideoEncode with x264 replaced by a Python process that
+	exits the same way
+	"""
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+		optionsConfig = configparser.ConfigParser()
+		optionsConfig['Main'] = {}
+		self.job = EncodeJob(1, self.directory + '/a.mkv', 'a.mkv',
+							 self.directory, configparser.ConfigParser(),
+							 optionsConfig)
+		self.job.workspace = JobWorkspace(self.job.inputFile,
+										  self.directory + '/temp')
+		self.job.workspace.create()
+
+		self.messages = []
+		self.job.logMessage.connect(
+			lambda job, text: self.messages.append(text))
+		self.job.finish = mock.Mock()
+		self.job.startMergeWhenReady = mock.Mock()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def finishVideo(self, code):
+		self.job.process.start(pythonCommand(code))
+		self.assertTrue(self.job.process.waitForFinished(10000))
+		self.job.finishedCurrentVideoEncode()
+
+	def testCleanExit(self):
+		self.finishVideo('pass')
+
+		self.assertTrue(self.job.workspace.isDone('video'))
+		self.assertTrue(self.job.videoDone)
+		self.job.finish.assert_not_called()
+
+	def testFailedExit(self):
+		for exitCode in (1, 3, 255):
+			self.finishVideo('import sys; sys.exit(' + str(exitCode) + ')')
+
+			self.assertFalse(self.job.workspace.isDone('video'))
+			self.assertFalse(self.job.videoDone)
+			self.job.finish.assert_called_with(JobState.Failed)
+			self.assertEqual(self.messages[-1],
+							 'Error - x264 failed with exit code ' +
+							 str(exitCode))
+
+	def testCrash(self):
+		self.finishVideo('import os; os.abort()')
+
+		self.assertEqual(self.job.process.exitStatus(), QProcess.CrashExit)
+		self.assertFalse(self.job.workspace.isDone('video'))
+		self.job.finish.assert_called_with(JobState.Failed)
+		self.assertEqual(self.messages[-1], 'Error - x264 crashed')
+
+
+if __name__ == '__main__':
+	unittest.main()
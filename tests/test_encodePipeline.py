@@ -0,0 +1,76 @@
+import configparser
+import unittest
+from unittest import mock
+
+try:
+	from PyQt5.QtCore import QCoreApplication, QEventLoop, QTimer
+
+	import encodePipeline
+	import workerPool
+	from jobState import JobState
+except ImportError:
+	# PyQt5 missing
+	encodePipeline = None
+
+
+def failingPlan(encodeConfig, optionsConfig, jobs):
+	raise ValueError('invalid literal for int()')
+
+
+def optionsConfig():
+	config = configparser.ConfigParser()
+	config['Main'] = {}
+	return config
+
+
+@unittest.skipIf(encodePipeline is None, 'needs PyQt5')
+class PlanningFailureTest(unittest.TestCase):
+
+	def setUp(self):
+		# Queued signals from the planning thread need an event loop
+		self.app = QCoreApplication.instance() or QCoreApplication([])
+
+		patcher = mock.patch.object(encodePipeline, 'planBatch', failingPlan)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def testEncodePipeline(self):
+		pipeline = encodePipeline.EncodePipeline(
+			configparser.ConfigParser(), optionsConfig(), '.')
+		pipeline.addFile('missing/a.mkv', 'a.mkv')
+		messages = []
+		pipeline.logMessage.connect(lambda job, text: messages.append(text))
+
+		loop = QEventLoop()
+		pipeline.allFinished.connect(loop.quit)
+		QTimer.singleShot(10000, loop.quit)
+		pipeline.start()
+		loop.exec_()
+
+		self.assertFalse(pipeline.isRunning())
+		self.assertEqual([job.state for job in pipeline.jobs()],
+						 [JobState.Failed])
+		self.assertEqual(messages, ['Error - could not plan the batch: '
+									'invalid literal for int()'])
+
+	def testWorkerPool(self):
+		events = []
+		pool = workerPool.WorkerPool(
+			configparser.ConfigParser(), optionsConfig(), '.', 2,
+			lambda job, event, text: events.append((event, text)))
+		pool.addFile('missing/a.mkv', 'a.mkv')
+
+		with mock.patch.object(workerPool, 'planBatch', failingPlan):
+			pool.start()
+			pool.reader.join(10)
+
+		self.assertFalse(pool.isRunning())
+		self.assertEqual(events, [
+			('log', 'Error - could not plan the batch: '
+					'invalid literal for int()'),
+			('done', '')])
+		self.assertEqual(pool.jobs[0].state, JobState.Failed)
+
+
+if __name__ == '__main__':
+	unittest.main()
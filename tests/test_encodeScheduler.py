@@ -0,0 +1,105 @@
+import unittest
+
+try:
+	from PyQt5.QtCore import QObject, pyqtSignal
+
+	from encodeScheduler import EncodeScheduler
+	from jobState import JobState
+except ImportError:
+	# PyQt5 missing
+	EncodeScheduler = None
+
+
+if EncodeScheduler is not None:
+	class FakeJob(QObject):
+		# Runs until the test finishes it
+		jobFinished = pyqtSignal(object)
+
+		def __init__(self, jobId):
+			super().__init__()
+
+			self.jobId = jobId
+			self.state = JobState.Waiting
+
+		def start(self):
+			self.state = JobState.Running
+
+		def pause(self):
+			self.state = JobState.Paused
+
+		def resume(self):
+			self.state = JobState.Running
+
+		def stop(self):
+			self.finish(JobState.Stopped)
+
+		def finish(self, state=None):
+			self.state = JobState.Finished if state is None else state
+			self.jobFinished.emit(self)
+
+		def isRunning(self):
+			return self.state in (JobState.Running, JobState.Paused)
+
+
+@unittest.skipIf(EncodeScheduler is None, 'needs PyQt5')
+class EncodeSchedulerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.scheduler = EncodeScheduler(2)
+		self.jobs = [FakeJob(i + 1) for i in range(5)]
+		for job in self.jobs:
+			self.scheduler.addJob(job)
+
+		self.finished = []
+		self.scheduler.allFinished.connect(lambda: self.finished.append(1))
+
+	def running(self):
+		return [job.jobId for job in self.scheduler.runningJobs()]
+
+	def testConcurrencyLimit(self):
+		self.scheduler.start()
+		self.assertEqual(self.running(), [1, 2])
+
+		self.jobs[0].finish()
+		self.assertEqual(self.running(), [2, 3])
+
+		self.jobs[2].finish(JobState.Failed)
+		self.jobs[1].finish()
+		self.assertEqual(self.running(), [4, 5])
+
+		self.jobs[3].finish()
+		self.jobs[4].finish()
+		self.assertEqual(self.finished, [1])
+		self.assertEqual(len(self.scheduler.finishedJobs()), 4)
+		self.assertEqual(self.scheduler.failedJobs(), [self.jobs[2]])
+
+	def testPauseHoldsBackNewJobs(self):
+		self.scheduler.start()
+		self.scheduler.pause()
+		self.assertEqual([job.state for job in self.jobs[:2]],
+						 [JobState.Paused, JobState.Paused])
+
+		self.jobs[0].finish()
+		self.assertEqual(self.running(), [2])
+
+		self.scheduler.resume()
+		self.assertEqual(self.running(), [2, 3])
+
+	def testStop(self):
+		self.scheduler.start()
+		self.scheduler.stop()
+
+		self.assertEqual(self.running(), [])
+		self.assertEqual([job.state for job in self.jobs],
+						 [JobState.Stopped] * 2 + [JobState.Waiting] * 3)
+		self.assertEqual(self.finished, [])
+
+	def testRaisingLimit(self):
+		self.scheduler.start()
+		self.scheduler.setMaxConcurrent(4)
+
+		self.assertEqual(self.running(), [1, 2, 3, 4])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+try:
+	from logModel import JobLogFilter, LogModel
+except ImportError:
+	# PyQt5 missing
+	LogModel = None
+
+
+class RecordingLogger:
+	def __init__(self):
+		self.lines = []
+
+	def info(self, text):
+		self.lines.append(text)
+
+
+@unittest.skipIf(LogModel is None, 'needs PyQt5')
+class LogModelTest(unittest.TestCase):
+
+	def texts(self, model):
+		return [model.entry(row).text for row in range(model.rowCount())]
+
+	def testBelowCapacity(self):
+		model = LogModel(capacity=5)
+		for i in range(3):
+			model.append(None, str(i))
+
+		self.assertEqual(self.texts(model), ['0', '1', '2'])
+
+	def testOldestDropped(self):
+		model = LogModel(capacity=3)
+		for i in range(8):
+			model.append(None, str(i))
+
+		self.assertEqual(model.rowCount(), 3)
+		self.assertEqual(self.texts(model), ['5', '6', '7'])
+		self.assertEqual(len(model.entries), 3)
+
+	def testRowSignals(self):
+		model = LogModel(capacity=2)
+		removed = []
+		inserted = []
+		model.rowsRemoved.connect(
+			lambda parent, first, last: removed.append((first, last)))
+		model.rowsInserted.connect(
+			lambda parent, first, last: inserted.append((first, last)))
+
+		for i in range(3):
+			model.append(None, str(i))
+
+		self.assertEqual(inserted, [(0, 0), (1, 1), (1, 1)])
+		self.assertEqual(removed, [(0, 0)])
+
+	def testDisplayText(self):
+		model = LogModel()
+		model.append(1, 'Video Encode Complete')
+
+		text = model.data(model.index(0))
+		self.assertRegex(text, r'^\[\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\]  '
+							   r'Video Encode Complete$')
+		self.assertIsNone(model.data(model.index(1)))
+		self.assertEqual(model.rowCount(model.index(0)), 0)
+
+	def testEveryEntryGoesToLogFile(self):
+		logFile = RecordingLogger()
+		model = LogModel(capacity=1, logFile=logFile)
+		model.append(None, 'a')
+		model.append(None, 'b')
+
+		self.assertEqual(logFile.lines, ['a', 'b'])
+
+	def testJobFilter(self):
+		model = LogModel(capacity=4)
+		for jobId, text in ((1, 'a'), (2, 'b'), (None, 'c'), (1, 'd'),
+							(2, 'e')):
+			model.append(jobId, text)
+
+		proxy = JobLogFilter()
+		proxy.setSourceModel(model)
+		self.assertEqual(proxy.rowCount(), 4)
+
+		proxy.setJobId(2)
+		self.assertEqual(
+			[model.entry(proxy.mapToSource(proxy.index(row, 0)).row()).text
+			 for row in range(proxy.rowCount())], ['b', 'e'])
+
+
+if __name__ == '__main__':
+	unittest.main()
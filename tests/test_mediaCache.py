@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import mediaCache
+from mediaCache import MediaInfoCache, fileKey
+
+
+class Clock:
+	# Distinct lastUsed values, time.time() can repeat within a test
+	def __init__(self):
+		self.now = 1000.0
+
+	def time(self):
+		self.now += 1
+		return self.now
+
+
+class MediaInfoCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		patcher = mock.patch.object(mediaCache, 'time', Clock())
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def source(self, name, data=b'video'):
+		fileName = os.path.join(self.directory, name)
+		with open(fileName, 'wb') as f:
+			f.write(data)
+
+		return fileName
+
+	def cache(self, capacity=10):
+		cache = MediaInfoCache(os.path.join(self.directory, 'data', 'cache.db'),
+							   capacity)
+		# Before tearDown, Windows can't remove an open database
+		self.addCleanup(cache.connection.close)
+		return cache
+
+	def testRoundTrip(self):
+		cache = self.cache()
+		fileName = self.source('a.mkv')
+		cache.put(fileName, {'version': 1, 'duration': 12.5})
+
+		self.assertEqual(cache.get(fileName), {'version': 1, 'duration': 12.5})
+		self.assertIsNone(cache.get(self.source('b.mkv')))
+
+	def testKeyedOnNormalizedPath(self):
+		cache = self.cache()
+		fileName = self.source('a.mkv')
+		cache.put(fileName, {'duration': 1})
+
+		other = os.path.join(self.directory, '.', 'sub', '..', 'a.mkv')
+		self.assertEqual(fileKey(other)[0], fileKey(fileName)[0])
+		self.assertEqual(cache.get(other), {'duration': 1})
+
+	def testChangedFileIsMissed(self):
+		cache = self.cache()
+		fileName = self.source('a.mkv')
+		cache.put(fileName, {'duration': 1})
+
+		self.source('a.mkv', b'a longer video')
+		self.assertIsNone(cache.get(fileName))
+
+		# and stays gone once the size matches again
+		self.source('a.mkv')
+		stat = os.stat(fileName)
+		os.utime(fileName, (stat.st_atime, stat.st_mtime + 10))
+		self.assertIsNone(cache.get(fileName))
+
+	def testMissingFile(self):
+		cache = self.cache()
+
+		self.assertIsNone(fileKey(os.path.join(self.directory, 'no.mkv')))
+		cache.put(os.path.join(self.directory, 'no.mkv'), {})
+		self.assertIsNone(cache.get(os.path.join(self.directory, 'no.mkv')))
+
+	def testLeastRecentlyUsedEvicted(self):
+		cache = self.cache(capacity=2)
+		a, b, c = (self.source(name) for name in ('a.mkv', 'b.mkv', 'c.mkv'))
+
+		cache.put(a, {'name': 'a'})
+		cache.put(b, {'name': 'b'})
+		# Reading a makes b the oldest
+		cache.get(a)
+		cache.put(c, {'name': 'c'})
+
+		self.assertEqual(cache.get(a), {'name': 'a'})
+		self.assertIsNone(cache.get(b))
+		self.assertEqual(cache.get(c), {'name': 'c'})
+
+	def testSharedBetweenInstances(self):
+		fileName = self.source('a.mkv')
+		self.cache().put(fileName, {'duration': 2})
+
+		self.assertEqual(self.cache().get(fileName), {'duration': 2})
+
+	def testInvalidateAndClear(self):
+		cache = self.cache()
+		a, b = self.source('a.mkv'), self.source('b.mkv')
+		cache.put(a, {})
+		cache.put(b, {})
+
+		cache.invalidate(a)
+		self.assertIsNone(cache.get(a))
+		self.assertEqual(cache.get(b), {})
+
+		cache.clear()
+		self.assertIsNone(cache.get(b))
+
+
+if __name__ == '__main__':
+	unittest.main()
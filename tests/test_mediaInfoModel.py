@@ -0,0 +1,120 @@
+import json
+import unittest
+
+from mediaInfoModel import (MODEL_VERSION, AudioStream, MediaFile, TextStream,
+							VideoStream, mediaFromJson)
+
+# MediaInfo's Output=JSON of an mkv, trimmed
+JSON_REPORT = json.dumps({'media': {'@ref': 'a.mkv', 'track': [
+	{'@type': 'General', 'Format': 'Matroska', 'Duration': '1420.500'},
+	{'@type': 'Video', 'Format': 'AVC', 'Duration': '1420.400',
+	 'FrameCount': '34056', 'FrameRate': '23.976', 'Width': '1920',
+	 'Height': '1080', 'Language': 'ja', 'Default': 'Yes', 'Forced': 'No'},
+	{'@type': 'Audio', 'Format': 'FLAC', 'Channels': '2',
+	 'SamplingRate': '48000', 'Language': 'ja', 'Default': 'Yes'},
+	{'@type': 'Audio', 'Format': 'AAC', 'Channels': '6',
+	 'SamplingRate': '48000', 'Language': 'en', 'Title': 'Commentary'},
+	{'@type': 'Text', 'Format': 'ASS', 'Language': 'en', 'Forced': 'Yes'},
+	{'@type': 'Menu'},
+]}})
+
+
+def sampleMedia():
+	return MediaFile(
+		1420.5,
+		[VideoStream(codec='AVC', duration=1420.4, frameCount=34056,
+					 frameRate=23.976, width=1920, height=1080,
+					 language='ja', default=True, forced=False)],
+		[AudioStream(codec='FLAC', channels=2, sampleRate=48000,
+					 language='ja', default=True, forced=False),
+		 AudioStream(codec='AAC', channels=6, sampleRate=48000,
+					 language='en', title='Commentary', default=False,
+					 forced=False)],
+		[TextStream(codec='ASS', language='en', forced=True, default=False)],
+		'General\nComplete name : a.mkv\n')
+
+
+class MediaFileTest(unittest.TestCase):
+
+	def testJsonRoundTrip(self):
+		media = sampleMedia()
+		restored = MediaFile.fromDict(json.loads(json.dumps(media.toDict())))
+
+		self.assertEqual(restored.toDict(), media.toDict())
+		self.assertEqual(restored.audio[1].title, 'Commentary')
+		self.assertIs(restored.text[0].forced, True)
+		self.assertEqual(restored.frameSize(), (1920, 1080))
+
+	def testOtherVersionIsDiscarded(self):
+		values = sampleMedia().toDict()
+		values['version'] = MODEL_VERSION + 1
+
+		self.assertIsNone(MediaFile.fromDict(values))
+		self.assertIsNone(MediaFile.fromDict({}))
+
+	def testFromMediaInfo(self):
+		parameters = {'Format': 'AVC', 'Duration': '1420400.000',
+					  'FrameCount': '34056', 'FrameRate': '23.976',
+					  'Width': '1920', 'Height': '1080', 'Default': 'Yes',
+					  'Forced': 'No'}
+		video = VideoStream.fromMediaInfo(lambda name: parameters.get(name, ''))
+
+		self.assertEqual((video.codec, video.duration, video.frameCount,
+						  video.width, video.language, video.default,
+						  video.forced),
+						 ('AVC', 1420.4, 34056, 1920, None, True, False))
+
+	def testHelpers(self):
+		media = sampleMedia()
+
+		self.assertEqual(media.frameCount(), 34056)
+		self.assertEqual(media.frameRate(), 23.976)
+		self.assertEqual(media.durationSeconds(), 1420.5)
+		self.assertEqual(media.videoLanguage(), 'ja')
+		self.assertEqual(media.audioLanguages(3), ['ja', 'en', ''])
+
+	def testNoVideo(self):
+		media = MediaFile()
+
+		self.assertEqual((media.frameCount(), media.frameRate(),
+						  media.frameSize(), media.durationSeconds(),
+						  media.videoLanguage()), (0, 0.0, None, None, ''))
+
+	def testDurationFromFrames(self):
+		media = MediaFile(None, [VideoStream(frameCount=2400, frameRate=24.0)])
+
+		self.assertEqual(media.durationSeconds(), 100.0)
+
+
+class MediaFromJsonTest(unittest.TestCase):
+
+	def testReport(self):
+		media = mediaFromJson(JSON_REPORT, sampleMedia().inform)
+
+		self.assertEqual(media.toDict(), sampleMedia().toDict())
+		self.assertEqual(media.duration, 1420.5)
+		self.assertEqual(media.video[0].duration, 1420.4)
+		self.assertEqual(media.frameCount(), 34056)
+		self.assertEqual(media.frameSize(), (1920, 1080))
+		self.assertEqual([stream.channels for stream in media.audio], [2, 6])
+		self.assertEqual(media.audioLanguages(2), ['ja', 'en'])
+		self.assertIs(media.text[0].forced, True)
+
+	def testSameModelAsGet(self):
+		# The JSON and Get() paths build the same streams
+		parameters = {'Format': 'FLAC', 'Channel(s)': '2',
+					  'SamplingRate': '48000', 'Language': 'ja',
+					  'Default': 'Yes'}
+		audio = AudioStream.fromMediaInfo(lambda name: parameters.get(name, ''))
+
+		self.assertEqual(mediaFromJson(JSON_REPORT).audio[0].toDict(),
+						 audio.toDict())
+
+	def testNotJson(self):
+		self.assertIsNone(mediaFromJson('General\nComplete name : a.mkv'))
+		self.assertIsNone(mediaFromJson(''))
+		self.assertIsNone(mediaFromJson('{"media": null}'))
+
+
+if __name__ == '__main__':
+	unittest.main()
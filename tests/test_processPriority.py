@@ -0,0 +1,56 @@
+import configparser
+import unittest
+from unittest import mock
+
+import psutil
+
+import processPriority
+from processPriority import ioPriorityArgs, stagePriorities
+
+
+class StagePrioritiesTest(unittest.TestCase):
+
+	def testDefaultsAndOptions(self):
+		optionsConfig = configparser.ConfigParser()
+		optionsConfig['Main'] = {'VideoPriority': ' Idle ',
+								 'AudioIoPriority': 'very low',
+								 'MergePriority': 'realtime'}
+		priorities = stagePriorities(optionsConfig)
+
+		self.assertEqual(priorities['video'], ('idle', 'low'))
+		self.assertEqual(priorities['audio'], ('normal', 'very low'))
+		# Unknown names count as normal
+		self.assertEqual(priorities['merge'], ('normal', 'normal'))
+		self.assertEqual(priorities['identify'], priorities['merge'])
+
+
+@unittest.skipIf(not hasattr(psutil, 'IOPRIO_CLASS_BE'),
+				 'needs Linux I/O priority classes')
+class LinuxIoPriorityTest(unittest.TestCase):
+
+	def setUp(self):
+		patcher = mock.patch.object(processPriority.sys, 'platform', 'linux')
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def testMapping(self):
+		self.assertEqual(ioPriorityArgs('very low'),
+						 (psutil.IOPRIO_CLASS_IDLE,))
+		# Idle would starve behind any other disk user
+		self.assertEqual(ioPriorityArgs('low'), (psutil.IOPRIO_CLASS_BE, 7))
+		self.assertEqual(ioPriorityArgs('normal'),
+						 (psutil.IOPRIO_CLASS_BE, 4))
+		self.assertEqual(ioPriorityArgs('high'), (psutil.IOPRIO_CLASS_BE, 0))
+
+	def testAppliesToProcess(self):
+		process = psutil.Process()
+		previous = process.ionice()
+		self.addCleanup(process.ionice, previous.ioclass, previous.value)
+
+		process.ionice(*ioPriorityArgs('low'))
+		self.assertEqual(tuple(process.ionice()),
+						 (psutil.IOPRIO_CLASS_BE, 7))
+
+
+if __name__ == '__main__':
+	unittest.main()
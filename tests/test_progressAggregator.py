@@ -0,0 +1,50 @@
+import unittest
+
+try:
+	from progressAggregator import ProgressAggregator
+except ImportError:
+	# PyQt5 missing
+	ProgressAggregator = None
+
+
+@unittest.skipIf(ProgressAggregator is None, 'needs PyQt5')
+class ProgressAggregatorTest(unittest.TestCase):
+
+	def setUp(self):
+		self.aggregator = ProgressAggregator()
+		self.texts = []
+		self.stats = []
+		self.aggregator.progressUpdated.connect(self.texts.append)
+		self.aggregator.statsUpdated.connect(self.stats.append)
+
+	def testOneUpdatePerTick(self):
+		for i in range(100):
+			self.aggregator.updateProgress(i % 10, 'text ' + str(i))
+			self.aggregator.updateStats(i % 10, i)
+		self.aggregator.flush()
+
+		# The newest of each job, in a single signal each
+		self.assertEqual(self.texts, [dict(
+			(job, 'text ' + str(90 + job)) for job in range(10))])
+		self.assertEqual(self.stats, [dict(
+			(job, 90 + job) for job in range(10))])
+
+	def testNothingNewNothingSent(self):
+		self.aggregator.updateProgress(1, 'a')
+		self.aggregator.flush()
+		self.aggregator.flush()
+
+		self.assertEqual(self.texts, [{1: 'a'}])
+		self.assertEqual(self.stats, [])
+
+	def testDiscardedJob(self):
+		self.aggregator.updateProgress(1, 'a')
+		self.aggregator.updateProgress(2, 'b')
+		self.aggregator.discard(1)
+		self.aggregator.flush()
+
+		self.assertEqual(self.texts, [{2: 'b'}])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+from progressParser import (ProgressEvent, ProgressReader, VideoProgress,
+							formatDuration, parseFfmpegLine, parseNeroAacLine,
+							parseX264Line)
+
+
+class LineParserTest(unittest.TestCase):
+
+	def testX264WithTotal(self):
+		event = parseX264Line('[12.5%] 1200/9600 frames, 23.45 fps, '
+							  '2512.37 kb/s, eta 0:05:58')
+
+		self.assertEqual((event.frame, event.totalFrames, event.fps,
+						  event.bitrate, event.eta),
+						 (1200, 9600, 23.45, 2512.37, 358))
+
+	def testX264WithoutTotal(self):
+		event = parseX264Line('1200 frames: 23.45 fps, 2512.37 kb/s')
+
+		self.assertEqual((event.frame, event.totalFrames, event.eta),
+						 (1200, None, None))
+
+	def testX264OtherOutput(self):
+		self.assertIsNone(parseX264Line('x264 [info]: profile High 10'))
+		self.assertIsNone(parseX264Line(''))
+
+	def testFfmpeg(self):
+		event = parseFfmpegLine('size=   10240kB time=01:02:03.50 '
+								'bitrate=1411.2kbits/s speed=35.2x')
+
+		self.assertEqual((event.seconds, event.bitrate, event.speed),
+						 (3723.5, 1411.2, 35.2))
+		self.assertIsNone(event.frame)
+
+	def testFfmpegVideo(self):
+		event = parseFfmpegLine('frame= 2400 fps=120 q=-0.0 size=N/A '
+								'time=00:01:40.10 bitrate=N/A speed=5.01x')
+
+		self.assertEqual((event.frame, event.fps, event.seconds,
+						  event.bitrate), (2400, 120.0, 100.1, None))
+
+	def testFfmpegNegativeTime(self):
+		self.assertIsNone(parseFfmpegLine('size=0kB time=-00:00:00.02 '
+										  'bitrate=N/A speed=N/A'))
+
+	def testNeroAac(self):
+		self.assertEqual(parseNeroAacLine('Processed 125 seconds...').seconds,
+						 125)
+		self.assertIsNone(parseNeroAacLine('Writing...'))
+
+
+class ProgressReaderTest(unittest.TestCase):
+
+	def testLineSplitAcrossReads(self):
+		reader = ProgressReader('x264', totalFrames=9600)
+
+		self.assertIsNone(reader.feed(b'100 frames, 20.00 fps, 30'))
+		event = reader.feed(b'00.00 kb/s\r')
+
+		self.assertEqual((event.frame, event.totalFrames, event.bitrate),
+						 (100, 9600, 3000.0))
+
+	def testNewestProgressOfARead(self):
+		reader = ProgressReader('x264')
+		event = reader.feed(b'100 frames, 20.00 fps, 3000.00 kb/s\r'
+							b'200 frames, 21.00 fps, 3100.00 kb/s\r'
+							b'x264 [warning]: something\n'
+							b'300 frames, 22.00')
+
+		self.assertEqual(event.frame, 200)
+		self.assertEqual(reader.lastLine, 'x264 [warning]: something')
+
+	def testCharacterSplitAcrossReads(self):
+		# A multi-byte character cut in two by the pipe
+		reader = ProgressReader('ffmpeg', duration=200.0)
+		text = 'Übergröße time=00:01:40.00 bitrate=1.0kbits/s\n'.encode()
+
+		self.assertIsNone(reader.feed(text[:1]))
+		event = reader.feed(text[1:])
+
+		self.assertEqual(event.fraction(), 0.5)
+		self.assertTrue(reader.lastLine.startswith('Übergröße'))
+
+
+class ProgressEventTest(unittest.TestCase):
+
+	def testEtaFromSpeed(self):
+		event = ProgressEvent('x264', frame=1000, totalFrames=3000, fps=20.0)
+
+		self.assertEqual(event.fraction(), 1000 / 3000)
+		self.assertEqual(event.estimatedEta(), 100.0)
+
+	def testDictRoundTrip(self):
+		event = ProgressEvent('ffmpeg', seconds=10.0, duration=40.0,
+							  speed=2.0)
+
+		self.assertEqual(ProgressEvent.fromDict(event.toDict()).toDict(),
+						 event.toDict())
+
+	def testFormatDuration(self):
+		self.assertEqual(formatDuration(3723.9), '1:02:03')
+		self.assertEqual(formatDuration(-5), '0:00:00')
+
+
+class VideoProgressTest(unittest.TestCase):
+
+	def testSegmentsAddUp(self):
+		progress = VideoProgress(totalFrames=3000)
+		progress.finish('segment1', 1000)
+		progress.update('segment2', ProgressEvent('x264', frame=500, fps=10.0,
+												  bitrate=2000.0))
+		event = progress.update('segment3', ProgressEvent(
+			'x264', frame=500, fps=12.0, bitrate=4000.0))
+
+		self.assertEqual((event.frame, event.totalFrames, event.fps,
+						  event.bitrate), (2000, 3000, 22.0, 3000.0))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from videoSegments import (MIN_SEGMENT_SECONDS, parseKeyframeTimes,
+						   planSegments)
+
+
+class PlanSegmentsTest(unittest.TestCase):
+
+	def assertCovers(self, plan, frameCount):
+		# Back to back from the first frame to the last
+		self.assertEqual(plan[0][0], 0)
+		for (start, frames), (nextStart, nextFrames) in zip(plan, plan[1:]):
+			self.assertEqual(start + frames, nextStart)
+		self.assertEqual(plan[-1][0] + plan[-1][1], frameCount)
+
+	def testEqualSplit(self):
+		plan = planSegments(24000, 24.0, 4)
+
+		self.assertEqual(plan, [(0, 6000), (6000, 6000), (12000, 6000),
+								(18000, 6000)])
+
+	def testBoundariesMoveToNearbyKeyframes(self):
+		plan = planSegments(24000, 24.0, 4, [250.5, 499.0, 760.0])
+
+		self.assertEqual([start for start, frames in plan],
+						 [0, 6012, 11976, 18240])
+		self.assertCovers(plan, 24000)
+
+	def testDistantKeyframesAreIgnored(self):
+		plan = planSegments(24000, 24.0, 4, [300.0])
+
+		self.assertEqual(plan[1][0], 6000)
+
+	def testShortVideoIsOneSegment(self):
+		self.assertEqual(planSegments(1000, 24.0, 4), [(0, 1000)])
+
+	def testMinimumSegmentLength(self):
+		plan = planSegments(24000, 24.0, 100)
+
+		self.assertEqual(len(plan), 24000 // (MIN_SEGMENT_SECONDS * 24))
+		self.assertCovers(plan, 24000)
+
+
+class ParseKeyframeTimesTest(unittest.TestCase):
+
+	def testShowinfoLines(self):
+		lines = ['[Parsed_showinfo_0 @ 0x55d0] n:   0 pts:      0 '
+				 'pts_time:0       pos: 1234',
+				 '[Parsed_showinfo_0 @ 0x55d0] n:   1 pts:  12012 '
+				 'pts_time:12.012  pos: 5678',
+				 'frame=    2 fps=0.0 q=-0.0 Lsize=N/A time=00:00:12.01']
+
+		self.assertEqual(parseKeyframeTimes(lines), [0.0, 12.012])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,190 @@
+from PyQt5.QtCore import QObject, QProcess, pyqtSignal
+
+from encodeCommands import (appendCommand, keyframeProbeCommand,
+							segmentVideoCommand)
+from progressParser import ProgressReader
+from videoSegments import parseKeyframeTimes, planSegments, segmentFileName
+
+
+class SegmentedVideoEncoder(QObject):
+	"""
+	Encodes the video of one file as several x264 processes over
+	keyframe-aligned frame ranges and appends the segments with mkvmerge.
+	Finished segments are marked in the workspace, so a retried job only
+	encodes the missing ones.
+	"""
+
+	logMessage = pyqtSignal(str)
+	progressUpdated = pyqtSignal(str)
+	statsUpdated = pyqtSignal(object)
+	encodeFinished = pyqtSignal(bool)
+
+	def __init__(self, startProcess, workspace, encodeConfig, inputFile,
+				 videoProgress, frameRate, segments, threads=None,
+				 lookaheadThreads=None, parent=None):
+		super().__init__(parent)
+
+		self.startProcess = startProcess
+		self.workspace = workspace
+		self.encodeConfig = encodeConfig
+		self.inputFile = inputFile
+		# The job's VideoProgress, its frame count is the whole file's
+		self.videoProgress = videoProgress
+		self.frameCount = videoProgress.totalFrames
+		self.frameRate = frameRate
+		self.segments = segments
+		self.threads = threads
+		self.lookaheadThreads = lookaheadThreads
+
+		self.halt = False
+		self.plan = []
+		self.pendingSegments = []
+		self.segmentProcesses = {}
+		self.segmentReaders = {}
+		self.keyframeOutput = ''
+
+		self.probeProcess = QProcess()
+		self.appendProcess = QProcess()
+
+	def start(self):
+		self.progressUpdated.emit('Finding keyframes...')
+
+		self.probeProcess.readyReadStandardError.connect(self.readKeyframes)
+		self.probeProcess.finished.connect(self.startSegments)
+		self.startProcess(self.probeProcess,
+						  keyframeProbeCommand(self.inputFile), 'probe')
+
+	def readKeyframes(self):
+		self.keyframeOutput += (bytes(self.probeProcess.readAllStandardError()).
+								decode(errors='ignore'))
+
+	def startSegments(self):
+		if self.halt:
+			return -1
+
+		# Without keyframes the segments are simply of equal length
+		keyframeTimes = parseKeyframeTimes(self.keyframeOutput.splitlines())
+		self.keyframeOutput = ''
+		self.probeProcess.close()
+
+		self.plan = planSegments(self.frameCount, self.frameRate,
+								 self.segments, keyframeTimes)
+		self.log('Encoding video in ' + str(len(self.plan)) + ' segments  -  ' +
+				 ', '.join(str(start) + '+' + str(frames)
+						   for start, frames in self.plan))
+
+		# Without a plan the profile's threads are shared by the segments
+		if self.threads is None:
+			self.threads = max(1, self.encodeConfig.getint(
+				'System', 'Threads', fallback=1) // len(self.plan))
+
+		for number in range(1, len(self.plan) + 1):
+			if self.workspace.isDone(self.segmentMarker(number)):
+				self.log('Segment ' + str(number) + ' already encoded')
+				self.videoProgress.finish(number, self.plan[number - 1][1])
+			else:
+				self.pendingSegments.append(number)
+
+		self.startNextSegments()
+
+	def startNextSegments(self):
+		if self.halt:
+			return -1
+
+		if not self.pendingSegments and not self.segmentProcesses:
+			self.startAppend()
+			return None
+
+		while self.pendingSegments:
+			number = self.pendingSegments.pop(0)
+			start, frames = self.plan[number - 1]
+
+			process = QProcess()
+			self.segmentReaders[number] = ProgressReader('x264', frames)
+			process.readyReadStandardError.connect(
+				lambda number=number: self.progressUpdate(number))
+			process.finished.connect(
+				lambda exitCode, exitStatus, number=number:
+				self.finishedSegment(number))
+			self.segmentProcesses[number] = process
+
+			self.startProcess(process, segmentVideoCommand(
+				self.encodeConfig, self.inputFile,
+				self.workspace.path(segmentFileName(number)), start, frames,
+				self.threads, self.lookaheadThreads), 'video')
+
+	def segmentMarker(self, number):
+		# Named after the frame range, a different split starts over
+		start, frames = self.plan[number - 1]
+		return 'segment-' + str(start) + '-' + str(frames)
+
+	def progressUpdate(self, number):
+		process = self.segmentProcesses[number]
+		event = self.segmentReaders[number].feed(
+			bytes(process.readAllStandardError()))
+
+		if event is not None:
+			self.statsUpdated.emit(self.videoProgress.update(number, event))
+
+	def finishedSegment(self, number):
+		if self.halt:
+			return -1
+
+		process = self.segmentProcesses.pop(number)
+		self.segmentReaders.pop(number, None)
+
+		if (process.exitStatus() != QProcess.NormalExit or
+				process.exitCode() != 0):
+			self.log('Segment ' + str(number) + ' failed with exit code ' +
+					 str(process.exitCode()))
+			self.finish(False)
+			return None
+
+		process.close()
+		self.workspace.markDone(self.segmentMarker(number))
+		self.videoProgress.finish(number, self.plan[number - 1][1])
+		self.startNextSegments()
+
+	def startAppend(self):
+		self.progressUpdated.emit('Joining video segments...')
+		self.log('Joining ' + str(len(self.plan)) + ' video segments...')
+
+		self.appendProcess.finished.connect(self.finishedAppend)
+		self.startProcess(self.appendProcess, appendCommand(
+			self.encodeConfig,
+			[self.workspace.path(segmentFileName(number))
+			 for number in range(1, len(self.plan) + 1)],
+			self.workspace.path('Output.mkv')), 'merge')
+
+	def finishedAppend(self):
+		if self.halt:
+			return -1
+
+		# mkvmerge returns 1 for warnings and 2 for errors
+		exitCode = self.appendProcess.exitCode()
+		if exitCode >= 2:
+			self.log('Joining the video segments failed with exit code ' +
+					 str(exitCode))
+			self.finish(False)
+		else:
+			self.finish(True)
+
+	def log(self, text):
+		self.logMessage.emit(text)
+
+	def finish(self, success):
+		self.halt = True
+		self.closeProcesses()
+		self.encodeFinished.emit(success)
+
+	def processes(self):
+		return ([self.probeProcess, self.appendProcess] +
+				list(self.segmentProcesses.values()))
+
+	def closeProcesses(self):
+		for process in self.processes():
+			process.close()
+
+	def stop(self):
+		self.halt = True
+		self.closeProcesses()
@@ -0,0 +1,55 @@
+import bisect
+import re
+
+MIN_SEGMENT_SECONDS = 30
+
+
+def parseKeyframeTimes(lines):
+	# [Parsed_showinfo_0 @ 0x...] n:   3 pts: 12012 pts_time:12.012 ...
+	times = []
+	for line in lines:
+		match = re.search(r'pts_time:\s*(-?[\d.]+)', line)
+		if match:
+			times.append(float(match.group(1)))
+
+	return times
+
+
+def planSegments(frameCount, frameRate, segments, keyframeTimes=()):
+	"""
+	Splits frameCount frames into up to segments (firstFrame, frames) pairs
+	of roughly equal length.  Boundaries move to the nearest source keyframe
+	when one is within an eighth of a segment, so cuts tend to fall on scene
+	changes.  Segments are kept at least MIN_SEGMENT_SECONDS long.
+	"""
+
+	minFrames = max(1, int(MIN_SEGMENT_SECONDS * frameRate))
+	segments = max(1, min(segments, frameCount // minFrames))
+	if segments == 1:
+		return [(0, frameCount)]
+
+	keyframes = sorted(set(int(round(time * frameRate))
+						   for time in keyframeTimes))
+	keyframes = [frame for frame in keyframes if 0 < frame < frameCount]
+	tolerance = frameCount // (segments * 8)
+
+	starts = [0]
+	for i in range(1, segments):
+		target = frameCount * i // segments
+
+		index = bisect.bisect_left(keyframes, target)
+		nearby = keyframes[max(0, index - 1):index + 1]
+		if nearby:
+			nearest = min(nearby, key=lambda frame: abs(frame - target))
+			if abs(nearest - target) <= tolerance:
+				target = nearest
+
+		if target - starts[-1] >= minFrames // 2:
+			starts.append(target)
+
+	ends = starts[1:] + [frameCount]
+	return [(start, end - start) for start, end in zip(starts, ends)]
+
+
+def segmentFileName(number):
+	return 'Output.segment' + str(number) + '.mkv'
@@ -0,0 +1,269 @@
+"""
+Worker processes for encoding.  Every worker owns a share of the batch and
+runs it end to end on its own asyncio loop, so checksums, MediaInfo parsing
+and command building for different files no longer share one GIL.  Workers
+report over a multiprocessing queue and take pause/resume/stop commands
+over a second one.
+"""
+
+import asyncio
+import configparser
+import multiprocessing
+import queue
+import threading
+
+from asyncEncode import AsyncEncodeBatch
+from asyncRunner import newEventLoop
+from encodeCommands import uniqueDisplayName
+from encodePlanner import planBatch
+from jobState import JobState
+
+
+def configToDict(config):
+	# ConfigParser objects don't pickle, plain dicts do
+	return dict((section, dict(config[section])) for section in
+				config.sections())
+
+
+def configFromDict(sections):
+	config = configparser.ConfigParser()
+	config.read_dict(sections)
+
+	return config
+
+
+def splitConcurrency(total, workers):
+	# Spread the simultaneous encodes over the workers, e.g. 5 over 2 -> 3, 2
+	return [total // workers + (1 if i < total % workers else 0)
+			for i in range(workers)]
+
+
+def pinNodes(nodes, workerId, workers):
+	# With more workers than nodes every worker stays on one node, otherwise
+	# the nodes are dealt out between the workers
+	if workers >= nodes:
+		return str(workerId % nodes)
+
+	return ','.join(str(node) for node in range(workerId, nodes, workers))
+
+
+class JobStatus:
+	"""
+	Mirror of a job running in a worker process, with the attributes front
+	ends read from EncodeJob.
+	"""
+
+	def __init__(self, jobId, inputFile, displayName, workerId):
+		self.jobId = jobId
+		self.inputFile = inputFile
+		self.displayName = displayName
+		self.workerId = workerId
+
+		self.state = JobState.Waiting
+		self.encodedFile = ''
+
+	def isRunning(self):
+		return self.state in (JobState.Running, JobState.Paused)
+
+
+def runWorker(workerId, jobs, encodeConfig, optionsConfig, outputDir,
+			  events, commands):
+	# events gets (workerId, jobId, event, text, state, encodedFile) tuples,
+	# and a final (workerId, None, 'done', '', None, '') when the share is done
+	def report(job, event, text):
+		if job is None:
+			events.put((workerId, None, event, text, None, ''))
+		else:
+			events.put((workerId, job.jobId, event, text, job.state,
+						job.encodedFile))
+
+	loop = newEventLoop()
+	asyncio.set_event_loop(loop)
+
+	batch = AsyncEncodeBatch(configFromDict(encodeConfig),
+							 configFromDict(optionsConfig), outputDir, report)
+	for jobId, inputFile, displayName in jobs:
+		batch.addFile(inputFile, displayName, jobId)
+
+	def readCommands():
+		while True:
+			command = commands.get()
+			if command is None:
+				break
+
+			try:
+				loop.call_soon_threadsafe(getattr(batch, command))
+			except RuntimeError:
+				# The loop has already finished
+				break
+
+	commandThread = threading.Thread(target=readCommands)
+	commandThread.daemon = True
+	commandThread.start()
+
+	try:
+		loop.run_until_complete(batch.run())
+	finally:
+		loop.close()
+		events.put((workerId, None, 'done', '', None, ''))
+
+
+class WorkerPool:
+	"""
+	Starts the worker processes and hands their events to report(job, event,
+	text) from a reader thread, with job being the JobStatus mirror.
+	"""
+
+	def __init__(self, encodeConfig, optionsConfig, outputDir, workers, report):
+		self.encodeConfig = encodeConfig
+		self.optionsConfig = optionsConfig
+		self.outputDir = outputDir
+		self.maxWorkers = max(1, workers)
+		self.report = report
+
+		self.jobs = []
+		self.processes = []
+		self.commandQueues = []
+		self.events = None
+		self.reader = None
+		self.stopped = False
+		self.paused = False
+		# Commands may arrive while the workers are still being started
+		self.lock = threading.RLock()
+
+	def addFile(self, inputFile, displayName):
+		displayName = uniqueDisplayName(displayName, self.jobs)
+		job = JobStatus(len(self.jobs) + 1, inputFile, displayName, None)
+		self.jobs.append(job)
+		return job
+
+	def start(self):
+		# Planning reads every file's MediaInfo, so it runs on the reader
+		# thread along with the rest of the batch instead of the caller's
+		self.reader = threading.Thread(target=self.run)
+		self.reader.daemon = True
+		self.reader.start()
+
+	def run(self):
+		# Planned once for the whole machine, the workers get fixed shares
+		try:
+			plan = planBatch(self.encodeConfig, self.optionsConfig, self.jobs)
+		except Exception as e:
+			# Without workers, readEvents fails every job and reports 'done'
+			self.report(None, 'log', 'Error - could not plan the batch: ' +
+						(str(e) or e.__class__.__name__))
+			plan = None
+		else:
+			self.report(None, 'log', plan.describe())
+
+		with self.lock:
+			if plan is not None and not self.stopped:
+				self.startWorkers(plan)
+
+		self.readEvents()
+
+	def startWorkers(self, plan):
+
+		workers = max(1, min(self.maxWorkers, plan.jobs, len(self.jobs)))
+		concurrency = splitConcurrency(plan.jobs, workers)
+
+		self.events = multiprocessing.Queue()
+		encodeConfig = configToDict(self.encodeConfig)
+
+		for workerId in range(workers):
+			shares = self.jobs[workerId::workers]
+			for job in shares:
+				job.workerId = workerId
+
+			optionsConfig = configToDict(self.optionsConfig)
+			optionsConfig['Main']['ConcurrentJobs'] = str(
+				max(1, concurrency[workerId]))
+			optionsConfig['Main']['ThreadsPerJob'] = str(plan.threads)
+			optionsConfig['Main']['LookaheadThreads'] = str(
+				plan.lookaheadThreads)
+			optionsConfig['Main']['PinNodes'] = pinNodes(
+				len(plan.nodes), workerId, workers)
+
+			commands = multiprocessing.Queue()
+			if self.paused:
+				commands.put('pause')
+
+			process = multiprocessing.Process(
+				target=runWorker,
+				args=(workerId, [(job.jobId, job.inputFile, job.displayName)
+								 for job in shares],
+					  encodeConfig, optionsConfig, self.outputDir,
+					  self.events, commands))
+			process.daemon = True
+			process.start()
+
+			self.processes.append(process)
+			self.commandQueues.append(commands)
+
+	def readEvents(self):
+		jobs = dict((job.jobId, job) for job in self.jobs)
+		running = len(self.processes)
+
+		while running:
+			try:
+				event = self.events.get(timeout=1)
+			except queue.Empty:
+				# A worker that was killed never sends 'done'
+				if not any(process.is_alive() for process in self.processes):
+					break
+				continue
+
+			workerId, jobId, event, text, state, encodedFile = event
+
+			if event == 'done':
+				running -= 1
+				continue
+
+			# The workers' own plan messages repeat the one above
+			if jobId is None:
+				continue
+
+			job = jobs[jobId]
+			job.state = state
+			job.encodedFile = encodedFile
+
+			self.report(job, event, text)
+
+		for process in self.processes:
+			process.join()
+
+		for job in self.jobs:
+			if job.state not in (JobState.Finished, JobState.Failed):
+				job.state = JobState.Stopped if self.stopped else JobState.Failed
+
+		for commands in self.commandQueues:
+			commands.put(None)
+
+		self.report(None, 'done', '')
+
+	def isRunning(self):
+		return self.reader is not None and self.reader.is_alive()
+
+	"""
+	Pool control
+	"""
+
+	def sendCommand(self, command):
+		with self.lock:
+			for commands in self.commandQueues:
+				commands.put(command)
+
+	def pause(self):
+		with self.lock:
+			self.paused = True
+			self.sendCommand('pause')
+
+	def resume(self):
+		with self.lock:
+			self.paused = False
+			self.sendCommand('resume')
+
+	def stop(self):
+		with self.lock:
+			self.stopped = True
+			self.sendCommand('stop')